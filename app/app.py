@@ -11,12 +11,24 @@ def create_app():
     app.config.from_object(Config)
     app.secret_key = 'GROUP_14'
 
-    from routes import auth, flights, orders, reports, managers
+    from routes import auth, flights, orders, reports, managers, api
     app.register_blueprint(auth.bp)
     app.register_blueprint(flights.bp)
     app.register_blueprint(orders.bp, url_prefix='/orders')
     app.register_blueprint(reports.bp, url_prefix='/reports')
     app.register_blueprint(managers.bp)
+    app.register_blueprint(api.bp, url_prefix='/api/v1')
+
+    from commands import register_commands
+    from utils.flight_status import init_status_engine
+    from utils.report_registry import init_report_registry
+    from utils.query_stats import init_query_stats
+    from utils.metrics import init_metrics
+    register_commands(app)
+    init_status_engine(app)
+    init_report_registry(app)
+    init_query_stats(app)
+    init_metrics(app)
 
     @app.route('/')
     def index():
@@ -0,0 +1,154 @@
+"""
+Command line tasks for FLYTAU
+Run from the app/ directory, e.g.:
+    flask --app main update-statuses
+    flask --app main migrate
+    flask --app main refresh-reports
+    flask --app main check-plans
+    flask --app main generate-data --planes 200 --months 12
+    DB_BACKEND=sqlite flask --app main reset-sqlite
+    flask --app main benchmark --users 20 --baseline benchmark-baseline.json
+"""
+import click
+
+def register_commands(app):
+    """Register CLI commands on the Flask app"""
+
+    @app.cli.command('update-statuses')
+    @click.option('--batch-size', default=None, type=int, help='Rows updated per transaction')
+    def update_statuses(batch_size):
+        """Land departed flights, complete their orders and clear expired seat holds (for cron)"""
+        from utils.flight_status import run_status_engine
+        result = run_status_engine(batch_size or app.config['STATUS_ENGINE_BATCH_SIZE'])
+        click.echo(f"Flights landed: {result['flights_landed']}, orders completed: {result['orders_completed']}, "
+                   f"seat holds expired: {result['holds_expired']}")
+
+    @app.cli.command('migrate')
+    def migrate():
+        """Apply pending db/migrations scripts to the database"""
+        from utils.migrations import run_migrations
+        applied = run_migrations()
+        if applied:
+            for version in applied:
+                click.echo(f"Applied {version}")
+        else:
+            click.echo("Database is up to date")
+
+    @app.cli.command('refresh-reports')
+    @click.option('--full', is_flag=True, help='Rebuild the report tables from scratch')
+    @click.option('--wait', type=int, default=0, help='Seconds to wait for a refresh that is already running')
+    def refresh_reports_command(full, wait):
+        """Update the materialized report tables (for cron)"""
+        from utils.report_tables import refresh_reports, RefreshInProgress
+        try:
+            result = refresh_reports(full=full, batch_size=app.config['REPORT_REFRESH_BATCH_SIZE'],
+                                     lag=app.config['REPORT_REFRESH_LAG'], wait=wait)
+        except RefreshInProgress as e:
+            raise SystemExit(str(e))
+        kind = 'Full' if result['full'] else 'Incremental'
+        click.echo(f"{kind} refresh: {result['flights']} flights, {result['order_months']} order months")
+
+    @app.cli.command('check-plans')
+    @click.option('--strict', is_flag=True, help='Require the expected index to be chosen, not just usable')
+    @click.option('--verbose', is_flag=True, help='Print the EXPLAIN rows of every query')
+    def check_plans_command(strict, verbose):
+        """EXPLAIN the hot queries and verify they can use their indexes"""
+        if app.config['DB_BACKEND'] == 'sqlite':
+            raise SystemExit("check-plans reads MySQL EXPLAIN output - run it against MySQL")
+        from utils.query_plans import check_plans
+        failed = 0
+        for check, ok, plan in check_plans(strict):
+            click.echo(f"{'OK  ' if ok else 'FAIL'} {check.name}")
+            if verbose or not ok:
+                for row in plan:
+                    click.echo(f"       {row.get('table')}: type={row.get('type')} "
+                               f"possible_keys={row.get('possible_keys')} key={row.get('key')}")
+            failed += not ok
+        if failed:
+            raise SystemExit(f"{failed} query plan(s) cannot use their index - apply the migrations "
+                             f"(flask --app main migrate) or fix the query")
+
+    @app.cli.command('generate-data')
+    @click.option('--planes', type=int, help='Fleet size (default 50)')
+    @click.option('--routes', type=int, help='Airport pairs served in both directions (default 40)')
+    @click.option('--months', type=int, help='Months of schedule (default 12)')
+    @click.option('--past-months', type=int, help='How many of those months are already flown (default 6)')
+    @click.option('--load-factor', type=float, help='Share of seats sold on departed flights (default 0.8)')
+    @click.option('--customers', type=int, help='Customers placing the orders (default 20000)')
+    @click.option('--pilots', type=int, help='Pilots (default 8 per plane)')
+    @click.option('--attendants', type=int, help='Flight attendants (default 16 per plane)')
+    @click.option('--cancel-rate', type=float, help='Share of flights canceled by the company (default 0.01)')
+    @click.option('--seed', type=int, help='Random seed, for a reproducible data set')
+    @click.option('--batch-size', default=1000, type=int, help='Rows per INSERT statement')
+    @click.option('--infile', is_flag=True, help='Load with LOAD DATA LOCAL INFILE (server needs local_infile=ON)')
+    def generate_data_command(planes, routes, months, past_months, load_factor, customers, pilots, attendants,
+                              cancel_rate, seed, batch_size, infile):
+        """Add a synthetic, production-sized data set to the database"""
+        if infile and app.config['DB_BACKEND'] == 'sqlite':
+            raise SystemExit("--infile needs MySQL - the SQLite backend loads with INSERT")
+        from utils.data_generator import default_options, generate_data
+        options = default_options(planes=planes, routes=routes, months=months, past_months=past_months,
+                                  load_factor=load_factor, customers=customers, pilots=pilots,
+                                  attendants=attendants, cancel_rate=cancel_rate, seed=seed)
+        counts = generate_data(options, use_infile=infile, batch_size=batch_size)
+        for table, count in counts.items():
+            click.echo(f"{table}: {count}")
+        click.echo("Run `flask --app main refresh-reports --full` to rebuild the report tables")
+
+    @app.cli.command('reset-sqlite')
+    @click.option('--no-seed', is_flag=True, help='Create the schema only, without db/seed.sql')
+    def reset_sqlite_command(no_seed):
+        """Recreate the SQLite stand-in database from db/schema.sql and db/seed.sql"""
+        if app.config['DB_BACKEND'] != 'sqlite':
+            raise SystemExit("Only for DB_BACKEND=sqlite")
+        from utils.sqlite_backend import reset_database
+        reset_database(app.config['SQLITE_PATH'], seed=not no_seed)
+        click.echo(f"Created {app.config['SQLITE_PATH']}")
+
+    @app.cli.command('benchmark')
+    @click.option('--users', type=int, help='Concurrent simulated users (default 10)')
+    @click.option('--iterations', type=int, help='Journeys per user (default 5)')
+    @click.option('--warmup', type=int, help='Unmeasured journeys per user first (default 1)')
+    @click.option('--manager-share', type=float, help='Share of users browsing the manager pages (default 0.2)')
+    @click.option('--manager-id', help='Manager account the manager users log in with')
+    @click.option('--manager-password', help='Password of that manager')
+    @click.option('--seed', type=int, help='Random seed, for repeatable journeys')
+    @click.option('--url', help='Base URL of a running server (default: in-process)')
+    @click.option('--output', default='benchmark.json', show_default=True, help='Results file (JSON)')
+    @click.option('--baseline', type=click.Path(exists=True), help='Earlier results to compare with')
+    @click.option('--tolerance', default=0.2, show_default=True, help='Allowed p95 slowdown against the baseline')
+    @click.option('--min-samples', type=int, help='Requests an endpoint needs before its p95 is compared (default 20)')
+    def benchmark_command(users, iterations, warmup, manager_share, manager_id, manager_password, seed, url,
+                          output, baseline, tolerance, min_samples):
+        """Load-test the booking funnel and manager pages; fail on regressions against a baseline"""
+        import json
+        from utils.benchmark import default_options, run_benchmark, compare_results, MIN_SAMPLES
+        options = default_options(users=users, iterations=iterations, warmup=warmup, manager_share=manager_share,
+                                  manager_id=manager_id, manager_password=manager_password, seed=seed)
+        results = run_benchmark(options, app=app, base_url=url)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+        click.echo(f"{'endpoint':<26}{'requests':>9}{'errors':>7}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                   f"{'p99 ms':>9}{'queries':>9}")
+        for endpoint, stats in results['endpoints'].items():
+            queries = stats['queries_per_request']
+            click.echo(f"{endpoint:<26}{stats['requests']:>9}{stats['errors']:>7}{stats['rps']:>9}"
+                       f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+                       f"{queries if queries is not None else '-':>9}")
+        click.echo(f"{results['requests']} requests in {results['seconds']}s ({results['rps']}/s), "
+                   f"bookings: {results['bookings']}; results in {output}")
+        for message in results['errors']:
+            click.echo(f"Error: {message}")
+
+        if baseline:
+            with open(baseline, encoding='utf-8') as f:
+                regressions, insufficient = compare_results(results, json.load(f), tolerance,
+                                                            MIN_SAMPLES if min_samples is None else min_samples)
+            for message in insufficient:
+                click.echo(f"Insufficient samples {message}")
+            for message in regressions:
+                click.echo(f"REGRESSION {message}")
+            if regressions:
+                raise SystemExit(f"{len(regressions)} regression(s) against {baseline}")
+            click.echo(f"No regressions against {baseline}")
@@ -2,6 +2,7 @@
 Configuration file for FLYTAU Flask application
 """
 import os
+import tempfile
 
 class Config:
     """Base configuration"""
@@ -13,7 +14,77 @@ class Config:
     DB_PASSWORD = os.environ.get('DB_PASSWORD') or '1234'
     DB_NAME = os.environ.get('DB_NAME') or 'flytau'
     DB_PORT = int(os.environ.get('DB_PORT') or 3306)
+
+    # Connection pool (one pool per worker process)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 10)  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)  # reconnect after this many seconds
     
+    # Flight status engine - runs in-process every N seconds (0 = disabled, use the
+    # `flask --app main update-statuses` command from cron instead)
+    STATUS_ENGINE_INTERVAL = int(os.environ.get('STATUS_ENGINE_INTERVAL') or 60)
+    STATUS_ENGINE_BATCH_SIZE = int(os.environ.get('STATUS_ENGINE_BATCH_SIZE') or 500)
+
+    # In-process caches (per worker) - entries expire after CACHE_TTL seconds
+    CACHE_TTL = int(os.environ.get('CACHE_TTL') or 300)
+    SEAT_LAYOUT_CACHE_SIZE = int(os.environ.get('SEAT_LAYOUT_CACHE_SIZE') or 256)
+    SEAT_INVENTORY_CACHE_SIZE = int(os.environ.get('SEAT_INVENTORY_CACHE_SIZE') or 4096)
+
+    # Flights per page on the flight board / manager flight list
+    FLIGHTS_PAGE_SIZE = int(os.environ.get('FLIGHTS_PAGE_SIZE') or 50)
+
+    # Connecting-flight search (in-memory route graph)
+    CONNECTION_MAX_STOPS = int(os.environ.get('CONNECTION_MAX_STOPS') or 2)
+    CONNECTION_MIN_LAYOVER_MINUTES = int(os.environ.get('CONNECTION_MIN_LAYOVER_MINUTES') or 60)
+    CONNECTION_MAX_LAYOVER_MINUTES = int(os.environ.get('CONNECTION_MAX_LAYOVER_MINUTES') or 720)
+    CONNECTION_SEARCH_DAYS = int(os.environ.get('CONNECTION_SEARCH_DAYS') or 7)  # without a date
+    CONNECTION_MAX_RESULTS = int(os.environ.get('CONNECTION_MAX_RESULTS') or 20)
+
+    # Fare calendar on the search page - cheapest fares for +/- N days around the date
+    FARE_CALENDAR_DAYS = int(os.environ.get('FARE_CALENDAR_DAYS') or 3)
+    FARE_CALENDAR_CACHE_SIZE = int(os.environ.get('FARE_CALENDAR_CACHE_SIZE') or 1024)
+    FARE_CALENDAR_TTL = int(os.environ.get('FARE_CALENDAR_TTL') or 60)  # seats left may lag this long
+
+    # Seats picked on the seat map are held for this many seconds
+    SEAT_HOLD_TTL = int(os.environ.get('SEAT_HOLD_TTL') or 600)
+
+    # Report tables - refreshed with `flask --app main refresh-reports`; the last
+    # REPORT_REFRESH_LAG seconds of changes are re-read on the next refresh
+    REPORT_REFRESH_BATCH_SIZE = int(os.environ.get('REPORT_REFRESH_BATCH_SIZE') or 500)
+    REPORT_REFRESH_LAG = int(os.environ.get('REPORT_REFRESH_LAG') or 60)
+
+    # Report exports stream this many rows per database round trip
+    EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE') or 1000)
+
+    # SQL instrumentation - statements slower than SLOW_QUERY_MS are logged (0 = off);
+    # requests running more than QUERY_COUNT_WARN statements are reported (0 = off),
+    # or fail with QUERY_COUNT_STRICT (for tests)
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS') or 200)
+    QUERY_COUNT_WARN = int(os.environ.get('QUERY_COUNT_WARN') or 0)
+    QUERY_COUNT_STRICT = os.environ.get('QUERY_COUNT_STRICT', 'False').lower() == 'true'
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'True').lower() == 'true'
+
+    # Prometheus metrics at /metrics (needs prometheus_client). Served only to clients
+    # from METRICS_ALLOWED_IPS (comma separated) or sending "Authorization: Bearer METRICS_TOKEN"
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    METRICS_ALLOWED_IPS = [ip.strip() for ip in (os.environ.get('METRICS_ALLOWED_IPS') or '127.0.0.1,::1').split(',')
+                           if ip.strip()]
+
+    # Crew page / assignment: minimum rest between two flights of a crew member, and how
+    # far back the availability index loads assignments
+    CREW_REST_HOURS = int(os.environ.get('CREW_REST_HOURS') or 12)
+    CREW_INDEX_HISTORY_DAYS = int(os.environ.get('CREW_INDEX_HISTORY_DAYS') or 7)
+
+    # Flights canceled per transaction by the bulk cancellation page
+    BULK_CANCEL_BATCH_SIZE = int(os.environ.get('BULK_CANCEL_BATCH_SIZE') or 50)
+
+    # Database backend - 'mysql', or 'sqlite' for an in-process stand-in
+    # (utils/sqlite_backend.py) created from db/schema.sql + db/seed.sql on first use
+    DB_BACKEND = (os.environ.get('DB_BACKEND') or 'mysql').lower()
+    SQLITE_PATH = os.environ.get('SQLITE_PATH') or os.path.join(tempfile.gettempdir(), 'flytau.sqlite3')
+    SQLITE_SEED = os.environ.get('SQLITE_SEED', 'True').lower() == 'true'
+
     # Session configuration
     SESSION_TYPE = os.environ.get('SESSION_TYPE') or 'filesystem'
     SESSION_PERMANENT = False
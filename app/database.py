@@ -2,51 +2,276 @@
 Database connection and helper functions
 """
 import os
+import threading
+import time
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, IntegrityError
 from contextlib import contextmanager
+from config import Config
+from utils.query_stats import record_query
 
-def get_db_connection():
+def get_connection_params():
+    """Connection parameters for the current environment"""
+    if os.getenv('PYTHONANYWHERE_DOMAIN'):
+        return {
+            'host': 'AmitHovav.mysql.pythonanywhere-services.com',
+            'user': 'AmitHovav',
+            'password': 'Group_14',
+            'database': 'AmitHovav$flytau',
+        }
+    return {
+        'host': Config.DB_HOST,
+        'user': Config.DB_USER,
+        'password': Config.DB_PASSWORD,
+        'database': Config.DB_NAME,
+        'port': Config.DB_PORT,
+    }
+
+def get_db_connection(**options):
+    if Config.DB_BACKEND == 'sqlite':
+        from utils.sqlite_backend import connect
+        return connect(Config.SQLITE_PATH, seed=Config.SQLITE_SEED)
     try:
-        if os.getenv('PYTHONANYWHERE_DOMAIN'):
-            connection = mysql.connector.connect(
-                host='AmitHovav.mysql.pythonanywhere-services.com',
-                user='AmitHovav',
-                password='Group_14',  
-                database='AmitHovav$flytau', 
-                autocommit=False
-            )
-        else:
-            connection = mysql.connector.connect(
-                host='localhost',
-                user='root',                
-                password='1234', 
-                database='flytau',
-                autocommit=False
-            )
+        connection = mysql.connector.connect(autocommit=False, **get_connection_params(), **options)
         return connection
 
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         raise
 
+class PoolTimeout(Error):
+    """Raised when no pooled connection became free within the timeout"""
+
+class ConnectionPool:
+    """
+    Fixed-size pool of MySQL connections.
+    Connections are created lazily, pinged before being handed out and
+    replaced once they are older than `recycle` seconds.
+    """
+
+    def __init__(self, size, timeout, recycle):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = []
+        self._created_at = {}  # id(connection) -> monotonic creation time
+        self._cond = threading.Condition()
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.recycled = 0
+
+    def _open(self):
+        connection = get_db_connection()
+        with self._cond:
+            self._created_at[id(connection)] = time.monotonic()
+            self.created += 1
+        return connection
+
+    def _discard(self, connection):
+        with self._cond:
+            self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _is_healthy(self, connection):
+        """Check age and liveness of an idle connection"""
+        created_at = self._created_at.get(id(connection), 0)
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self.recycled += 1
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def acquire(self):
+        """Borrow a connection, waiting up to `timeout` seconds for a free slot"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while not self._idle and self.checked_out >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(msg=f"No database connection available after {self.timeout}s")
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            connection = self._idle.pop() if self._idle else None
+            self.checked_out += 1
+
+        # Connect / health-check outside the lock
+        try:
+            if connection is not None and not self._is_healthy(connection):
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection = self._open()
+            return connection
+        except Exception:
+            with self._cond:
+                self.checked_out -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection, discard=False):
+        """Return a borrowed connection to the pool"""
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction
+                connection.rollback()
+            except Error:
+                discard = True
+        if discard:
+            self._discard(connection)
+        with self._cond:
+            self.checked_out -= 1
+            if not discard:
+                self._idle.append(connection)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'checked_out': self.checked_out,
+                'idle': len(self._idle),
+                'waiting': self.waiting,
+                'created': self.created,
+                'recycled': self.recycled,
+            }
+
+# One pool per worker process - connections must never be shared across fork()
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool():
+    """Get the connection pool of the current process"""
+    pid = os.getpid()
+    pool = _pools.get(pid)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(pid)
+            if pool is None:
+                _pools.clear()
+                pool = ConnectionPool(Config.DB_POOL_SIZE, Config.DB_POOL_TIMEOUT, Config.DB_POOL_RECYCLE)
+                _pools[pid] = pool
+    return pool
+
+def pool_stats():
+    """Connection pool counters of the current worker (for sizing the pool)"""
+    return get_pool().stats()
+
+class TimedCursor:
+    """Cursor wrapper that reports the run time of every statement (utils/query_stats.py)"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=()):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, seq_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
 @contextmanager
 def db_transaction(commit=False):
     """
     Context manager for database operations
     """
-    connection = get_db_connection()
-    db = connection.cursor(dictionary=True)
+    pool = get_pool()
+    connection = pool.acquire()
+    broken = False
+    try:
+        db = TimedCursor(connection.cursor(dictionary=True, buffered=True))
+    except Error:
+        pool.release(connection, discard=True)
+        raise
     try:
         yield db
         if commit:
             connection.commit()
     except Error as e:
-        connection.rollback()
+        try:
+            connection.rollback()
+        except Error:
+            broken = True
+        raise
+    finally:
+        try:
+            db.close()
+        except Error:
+            broken = True
+        pool.release(connection, discard=broken)
+
+# ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT - the transaction was rolled back and can be run again
+LOCK_CONFLICT_ERRNOS = (1213, 1205)
+
+def is_lock_conflict(error):
+    """True for a deadlock or lock wait timeout"""
+    return getattr(error, 'errno', None) in LOCK_CONFLICT_ERRNOS
+
+def insert_rows(db, table_and_columns, rows, batch_size=500):
+    """Insert many rows with multi-row INSERT statements of up to batch_size rows"""
+    if not rows:
+        return
+    row_placeholder = '(' + ', '.join(['%s'] * len(rows[0])) + ')'
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        values = ', '.join([row_placeholder] * len(batch))
+        params = tuple(value for row in batch for value in row)
+        db.execute(f"INSERT INTO {table_and_columns} VALUES {values}", params)
+
+def stream_query(query, params=None, fetch_size=1000):
+    """
+    Yield result rows one at a time from an unbuffered (server-side) cursor,
+    fetching `fetch_size` rows per round trip - memory use does not grow with
+    the result. The connection stays checked out until the generator finishes.
+    """
+    pool = get_pool()
+    connection = pool.acquire()
+    exhausted = False
+    broken = False
+    try:
+        db = TimedCursor(connection.cursor(dictionary=True))
+        try:
+            db.execute(query, params or ())
+            while True:
+                rows = db.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from rows
+            exhausted = True
+        finally:
+            try:
+                db.close()
+            except Error:
+                broken = True
+    except Error:
+        broken = True
         raise
     finally:
-        db.close()
-        connection.close()
+        # Stopped early - the rest of the result is still on the wire, drop the connection
+        pool.release(connection, discard=broken or not exhausted)
 
 def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=False):
     """
@@ -60,4 +285,4 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=F
         elif fetch_all:
             return db.fetchall()
         else:
-            return db.rowcount
\ No newline at end of file
+            return db.rowcount
@@ -0,0 +1,122 @@
+"""
+JSON API (v1)
+Search, flight board and seat map for the kiosk and mobile clients, over the
+same queries as the HTML pages. Every response carries an ETag built from
+the flights' change version (Flight.updated_at and the row count), so a
+client polling with If-None-Match gets an empty 304 Not Modified until
+something actually changed. There is no Last-Modified: a flight that leaves
+a result set (fills up, is canceled or departs) does not advance the newest
+updated_at of the rows still in it, and seat holds carry no timestamp.
+"""
+import hashlib
+from flask import Blueprint, request, jsonify, session, current_app
+from database import execute_query
+from utils.seat_map import get_seat_layout
+from utils.seat_inventory import get_seat_inventory
+from utils.seat_holds import active_holds
+from utils.pagination import fetch_flight_page, flight_filters, parse_date
+from utils.flight_queries import (FLIGHT_LIST_SELECT, BOOKABLE_CONDITIONS, search_conditions,
+                                  search_flights, flights_version)
+
+bp = Blueprint('api', __name__)
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+def conditional_json(etag, build):
+    """304 if the client's If-None-Match still matches, otherwise jsonify(build()) - both with the ETag"""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate before reusing it
+    response.cache_control.no_cache = True
+    return response
+
+def error(message, status):
+    return jsonify({'error': message}), status
+
+def flight_json(flight):
+    """Compact representation of a FLIGHT_LIST_SELECT row"""
+    return {
+        'id': flight['flight_id'],
+        'from': flight['origin_airport'],
+        'to': flight['destination_airport'],
+        'departure': flight['departure_datetime'].isoformat(timespec='minutes'),
+        'duration': float(flight['flight_duration']),
+        'status': flight['status'],
+        'plane': flight['plane_id'],
+        'price_economy': float(flight['price_economy']),
+        'price_business': float(flight['price_business']) if flight['price_business'] is not None else None,
+        'seats_left': max(flight['seats_total'] - flight['seats_booked'], 0),
+    }
+
+@bp.route('/flights/search')
+def search():
+    """Bookable flights by origin, destination and date (YYYY-MM-DD)"""
+    origin = request.args.get('origin', '').strip() or None
+    destination = request.args.get('destination', '').strip() or None
+    day = parse_date(request.args.get('date'))
+    if request.args.get('date') and not day:
+        return error('date must be YYYY-MM-DD', 400)
+
+    last_modified, count = flights_version(*search_conditions(origin, destination, day))
+    etag = make_etag('search', origin, destination, day, last_modified, count)
+    return conditional_json(etag, lambda: {
+        'flights': [flight_json(flight) for flight in search_flights(origin, destination, day)],
+    })
+
+@bp.route('/flights')
+def board():
+    """Flight board page - same filters and cursors as the HTML board"""
+    conditions, params, filters = flight_filters(request.args)
+    conditions = BOOKABLE_CONDITIONS + conditions
+    after, before = request.args.get('after'), request.args.get('before')
+
+    last_modified, count = flights_version(conditions, params)
+    etag = make_etag('board', sorted(filters.items()), after, before, last_modified, count)
+
+    def build():
+        page = fetch_flight_page(FLIGHT_LIST_SELECT, conditions, params,
+                                 current_app.config['FLIGHTS_PAGE_SIZE'], after=after, before=before)
+        return {'flights': [flight_json(flight) for flight in page.rows],
+                'next': page.next_cursor, 'prev': page.prev_cursor}
+    return conditional_json(etag, build)
+
+@bp.route('/flights/<int:flight_id>/seats')
+def seats(flight_id):
+    """Seat map of a flight: per class, the taken and held seats"""
+    flight = execute_query("""
+        SELECT flight_id, plane_id, status, departure_datetime,
+               price_economy, price_business, seats_booked, updated_at
+        FROM Flight WHERE flight_id = %s
+    """, (flight_id,), fetch_one=True)
+    if not flight:
+        return error('flight not found', 404)
+
+    # Holds change without touching the flight row, so they are part of the version.
+    # Bookings bump updated_at and seats_booked together, and get_seat_inventory checks the
+    # cached bitmap against that seats_booked, so the body matches the ETag.
+    holds = active_holds(flight_id)
+    token = session.get('seat_hold_token')
+    held_by_me = sorted(seat for seat, holder in holds.items() if holder == token)
+    held = sorted(seat for seat, holder in holds.items() if holder != token)
+    etag = make_etag('seats', flight_id, flight['updated_at'], held, held_by_me)
+
+    def build():
+        layout = get_seat_layout(flight['plane_id'])
+        inventory = get_seat_inventory(flight_id, flight['plane_id'], flight['seats_booked'])
+        prices = {'Economy': flight['price_economy'], 'Business': flight['price_business']}
+        classes = {}
+        for class_type, class_seats in layout.classes.items():
+            price = prices.get(class_type)
+            classes[class_type] = {
+                'price': float(price) if price is not None else None,
+                'seats': [seat.seat_number for seat in class_seats],
+                'taken': [seat.seat_number for seat in class_seats if inventory.is_taken(seat.index)],
+            }
+        return {'id': flight_id, 'status': flight['status'],
+                'departure': flight['departure_datetime'].isoformat(timespec='minutes'),
+                'classes': classes, 'held': held, 'held_by_me': held_by_me}
+    return conditional_json(etag, build)
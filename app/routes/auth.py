@@ -30,7 +30,7 @@ def register():
         try:
             with db_transaction(commit=True) as db:
                 # Check if customer already exists
-                check_query = "SELECT email FROM Customer WHERE LOWER(email) = %s"
+                check_query = "SELECT email FROM Customer WHERE email = %s"
                 db.execute(check_query, (email,))
                 if db.fetchone():
                     flash('כתובת המייל כבר קיימת במערכת', 'error')
@@ -2,120 +2,77 @@
 Flight routes
 Handles flight search, listing, and management
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from database import execute_query, db_transaction
 from utils.auth import is_logged_in, is_manager, get_current_manager_id
-from datetime import datetime, timedelta
+from utils.flight_status import EFFECTIVE_FLIGHT_STATUS_SQL
+from utils.seat_map import get_seat_layout
+from utils.seat_inventory import get_seat_inventory
+from utils.seat_holds import active_holds
+from utils.route_graph import find_connections, invalidate_route_graph
+from utils.fare_calendar import fare_calendar, invalidate_fare_calendars
+from utils.crew_availability import invalidate_crew_availability
+from utils.plane_index import get_plane_capabilities, NO_CAPABILITY
+from utils.pagination import fetch_flight_page, flight_filters, parse_date
+from utils.flight_queries import FLIGHT_LIST_SELECT, MANAGER_FLIGHT_SELECT, BOOKABLE_CONDITIONS, search_flights
+from utils.flight_cancellation import (CANCEL_NOTICE, cancel_flights, invalidate_flight_caches,
+                                       find_cancelable_flights, cancel_flights_in_batches)
+from datetime import datetime
 
 bp = Blueprint('flights', __name__)
 
-def update_expired_flights():
-    """Update status of flights that have passed to 'Landed' and their orders to 'Completed'"""
-    try:
-        # Update flights to 'Landed'
-        flight_query = """
-            UPDATE Flight
-            SET status = 'Landed'
-            WHERE status IN ('Active', 'Full')
-            AND departure_datetime < NOW()
-        """
-        execute_query(flight_query, commit=True)
-
-        # Update orders to 'Completed' for landed flights
-        order_query = """
-            UPDATE FlightOrder fo
-            JOIN Flight f ON fo.flight_id = f.flight_id
-            SET fo.order_status = 'Completed'
-            WHERE fo.order_status = 'Active'
-            AND f.status = 'Landed'
-        """
-        execute_query(order_query, commit=True)
-    except:
-        pass  # Ignore errors
+def get_airports():
+    """Get available airports for dropdowns"""
+    airports_query = """
+        SELECT DISTINCT origin_airport AS airport FROM FlightLine
+        UNION
+        SELECT DISTINCT destination_airport AS airport FROM FlightLine
+        ORDER BY airport
+    """
+    return execute_query(airports_query, fetch_all=True)
 
 @bp.route('/search', methods=['GET', 'POST'])
 def search():
     """Search flights by date, origin, and destination"""
-    update_expired_flights()
     if request.method == 'POST':
         origin = request.form.get('origin_airport')
         destination = request.form.get('destination_airport')
         departure_date = request.form.get('departure_date')
 
-        query = """
-            SELECT f.flight_id, f.origin_airport, f.destination_airport,
-                   f.departure_datetime, f.status, f.plane_id,
-                   p.manufacturer, p.size_category,
-                   fl.flight_duration
-            FROM Flight f
-            JOIN Plane p ON f.plane_id = p.plane_id
-            JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
-                              AND f.destination_airport = fl.destination_airport
-            WHERE f.status = 'Active'
-              AND f.departure_datetime > NOW()
-        """
-        params = []
-
-        if origin:
-            query += " AND f.origin_airport = %s"
-            params.append(origin)
+        day_start = parse_date(departure_date)
+        flights = search_flights(origin, destination, day_start)
 
-        if destination:
-            query += " AND f.destination_airport = %s"
-            params.append(destination)
-
-        if departure_date:
-            query += " AND DATE(f.departure_datetime) = %s"
-            params.append(departure_date)
-
-        query += " ORDER BY f.departure_datetime ASC"
-
-        flights = execute_query(query, tuple(params) if params else None, fetch_all=True)
+        # Itineraries with connections come from the in-memory route graph
+        connections = []
+        calendar = []
+        if origin and destination and origin != destination:
+            connections = find_connections(origin, destination, day_start)
+            # Cheapest fares on the days around the date - one grouped query
+            calendar = fare_calendar(origin, destination, day_start)
 
         # Get available airports for dropdown
-        airports_query = """
-            SELECT DISTINCT origin_airport AS airport FROM FlightLine
-            UNION
-            SELECT DISTINCT destination_airport AS airport FROM FlightLine
-            ORDER BY airport
-        """
-        airports = execute_query(airports_query, fetch_all=True)
+        airports = get_airports()
 
         return render_template('flights/search.html', flights=flights, airports=airports,
-                             origin=origin, destination=destination, departure_date=departure_date)
+                             origin=origin, destination=destination, departure_date=departure_date,
+                             connections=connections, calendar=calendar, selected_day=day_start)
 
     # GET request - show search form
-    airports_query = """
-        SELECT DISTINCT origin_airport AS airport FROM FlightLine
-        UNION
-        SELECT DISTINCT destination_airport AS airport FROM FlightLine
-        ORDER BY airport
-    """
-    airports = execute_query(airports_query, fetch_all=True)
+    airports = get_airports()
 
     return render_template('flights/search.html', airports=airports, flights=[])
 
 @bp.route('/board')
 def board():
     """Show all available flights (flight board)"""
-    update_expired_flights()
+    conditions, params, filters = flight_filters(request.args)
+    conditions = BOOKABLE_CONDITIONS + conditions
 
-    query = """
-        SELECT f.flight_id, f.origin_airport, f.destination_airport,
-               f.departure_datetime, f.status, f.plane_id,
-               p.manufacturer, p.size_category,
-               fl.flight_duration
-        FROM Flight f
-        JOIN Plane p ON f.plane_id = p.plane_id
-        JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
-                          AND f.destination_airport = fl.destination_airport
-        WHERE f.status = 'Active'
-          AND f.departure_datetime > NOW()
-        ORDER BY f.departure_datetime ASC
-    """
-    flights = execute_query(query, fetch_all=True)
+    page = fetch_flight_page(FLIGHT_LIST_SELECT, conditions, params, current_app.config['FLIGHTS_PAGE_SIZE'],
+                             after=request.args.get('after'), before=request.args.get('before'))
 
-    return render_template('flights/board.html', flights=flights)
+    return render_template('flights/board.html', flights=page.rows, page=page, filters=filters,
+                           airports=get_airports())
 
 @bp.route('/<int:flight_id>/seats', methods=['GET'])
 def seats(flight_id):
@@ -136,91 +93,49 @@ def seats(flight_id):
         flash('טיסה לא נמצאה', 'error')
         return redirect(url_for('flights.search'))
 
-    # Get all seats for the plane
-    seats_query = """
-        SELECT s.plane_id, s.class_type, s.seat_number,
-               pc.rows_count, pc.cols_count
-        FROM Seat s
-        JOIN PlaneClass pc ON s.plane_id = pc.plane_id AND s.class_type = pc.class_type
-        WHERE s.plane_id = %s
-        ORDER BY s.class_type, s.seat_number
-    """
-    all_seats = execute_query(seats_query, (flight['plane_id'],), fetch_all=True)
-
-    # Get occupied seats for this flight
-    occupied_query = """
-        SELECT t.plane_id, t.class_type, t.seat_number
-        FROM Ticket t
-        JOIN FlightOrder fo ON t.order_id = fo.order_id
-        WHERE fo.flight_id = %s
-          AND fo.order_status IN ('Active', 'Completed')
-          AND t.plane_id = %s
-    """
-    occupied_seats = execute_query(occupied_query, (flight_id, flight['plane_id']), fetch_all=True)
-
-    # Create a set of occupied seats for quick lookup
-    occupied_set = {(s['plane_id'], s['class_type'], s['seat_number'])
-                    for s in occupied_seats}
-
-    # Mark seats as available/occupied
-    for seat in all_seats:
-        seat_key = (seat['plane_id'], seat['class_type'], seat['seat_number'])
-        seat['available'] = seat_key not in occupied_set
-
-    # Group seats by class, filtering out Business for small planes
-    seats_by_class = {}
-    for seat in all_seats:
-        class_type = seat['class_type']
-        # Skip Business class for small planes
-        if class_type == 'Business' and flight['size_category'] == 'Small':
-            continue
-        if class_type not in seats_by_class:
-            seats_by_class[class_type] = []
-        seats_by_class[class_type].append(seat)
-
-    return render_template('flights/seats.html', flight=flight, seats_by_class=seats_by_class)
+    # Seat layout of the plane and occupied-seat bitmap of the flight (both cached)
+    layout = get_seat_layout(flight['plane_id'])
+    inventory = get_seat_inventory(flight_id, flight['plane_id'], flight['seats_booked'])
+
+    # Seats other customers are holding right now count as unavailable
+    holds = active_holds(flight_id)
+    hold_token = session.get('seat_hold_token')
+    held_by_others = {seat for seat, token in holds.items() if token != hold_token}
+    held_by_me = {seat for seat, token in holds.items() if token == hold_token}
+
+    return render_template('flights/seats.html', flight=flight, seats_by_class=layout.classes,
+                           inventory=inventory, held_by_others=held_by_others, held_by_me=held_by_me,
+                           hold_minutes=current_app.config['SEAT_HOLD_TTL'] // 60)
 
 @bp.route('/list')
 def list():
     """List all flights (for managers)"""
-    update_expired_flights()
     if not is_manager():
         flash('אין הרשאה לגשת לדף זה', 'error')
         return redirect(url_for('flights.search'))
 
     status_filter = request.args.get('status', '')
 
-    query = """
-        SELECT f.*, p.manufacturer, p.size_category,
-               m.first_name_hebrew, m.last_name_hebrew,
-               fl.flight_duration
-        FROM Flight f
-        JOIN Plane p ON f.plane_id = p.plane_id
-        JOIN Manager m ON f.manager_id = m.id_number
-        JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
-                          AND f.destination_airport = fl.destination_airport
-    """
-    params = []
+    conditions, params, filters = flight_filters(request.args)
 
     if status_filter:
-        query += " WHERE f.status = %s"
+        conditions.append(f"{EFFECTIVE_FLIGHT_STATUS_SQL} = %s")
         params.append(status_filter)
 
-    query += " ORDER BY f.departure_datetime DESC"
-
-    flights = execute_query(query, tuple(params) if params else None, fetch_all=True)
+    # Newest first
+    page = fetch_flight_page(MANAGER_FLIGHT_SELECT, conditions, params, current_app.config['FLIGHTS_PAGE_SIZE'],
+                             after=request.args.get('after'), before=request.args.get('before'),
+                             descending=True)
+    flights = page.rows
 
     # Check which planes have Business class for display
+    capabilities = get_plane_capabilities()
     for flight in flights:
-        business_check_query = """
-            SELECT COUNT(*) as has_business
-            FROM PlaneClass
-            WHERE plane_id = %s AND class_type = 'Business'
-        """
-        business_check = execute_query(business_check_query, (flight['plane_id'],), fetch_one=True)
-        flight['has_business'] = business_check and business_check['has_business'] > 0
+        flight['status'] = flight.pop('effective_status')
+        flight['has_business'] = 'Business' in capabilities.get(flight['plane_id'], NO_CAPABILITY).classes
 
-    return render_template('flights/list.html', flights=flights, current_status=status_filter)
+    return render_template('flights/list.html', flights=flights, current_status=status_filter,
+                           page=page, filters=filters, airports=get_airports())
 
 @bp.route('/create', methods=['GET', 'POST'])
 def create():
@@ -238,27 +153,22 @@ def create():
         price_economy = request.form.get('price_economy', 800)
         price_business = request.form.get('price_business', 1500)
 
-        # Check if plane has Business class
-        business_check_query = """
-            SELECT COUNT(*) as has_business
-            FROM PlaneClass
-            WHERE plane_id = %s AND class_type = 'Business'
-        """
-        business_check = execute_query(business_check_query, (plane_id,), fetch_one=True)
-        has_business = business_check and business_check['has_business'] > 0
-        
-        # Set price_business to NULL if plane doesn't have Business class
-        if not has_business:
-            price_business = None
-
         try:
+            # price_business is NULL if the plane has no Business class - read from PlaneClass in the
+            # INSERT, like seats_total (the cached plane index may miss a class added on another worker)
             query = """
                 INSERT INTO Flight (origin_airport, destination_airport, plane_id,
-                                   departure_datetime, manager_id, status, price_economy, price_business)
-                VALUES (%s, %s, %s, %s, %s, 'Active', %s, %s)
+                                   departure_datetime, manager_id, status, price_economy, price_business,
+                                   seats_total)
+                VALUES (%s, %s, %s, %s, %s, 'Active', %s,
+                        CASE WHEN EXISTS (SELECT 1 FROM PlaneClass
+                                          WHERE plane_id = %s AND class_type = 'Business') THEN %s END,
+                        (SELECT COALESCE(SUM(rows_count * cols_count), 0) FROM PlaneClass WHERE plane_id = %s))
             """
-            execute_query(query, (origin_airport, destination_airport, plane_id,
-                          departure_datetime, manager_id, price_economy, price_business), commit=True)
+            execute_query(query, (origin_airport, destination_airport, plane_id, departure_datetime, manager_id,
+                                  price_economy, plane_id, price_business, plane_id), commit=True)
+            invalidate_route_graph()
+            invalidate_fare_calendars()
             flash('טיסה נוצרה בהצלחה', 'success')
             return redirect(url_for('flights.list'))
 
@@ -275,13 +185,7 @@ def create():
     flightlines = execute_query(flightlines_query, fetch_all=True)
 
     # Get distinct airports for dropdowns
-    airports_query = """
-        SELECT DISTINCT origin_airport AS airport FROM FlightLine
-        UNION
-        SELECT DISTINCT destination_airport AS airport FROM FlightLine
-        ORDER BY airport
-    """
-    airports = execute_query(airports_query, fetch_all=True)
+    airports = get_airports()
 
     # Get planes
     planes_query = "SELECT plane_id, manufacturer, size_category FROM Plane ORDER BY plane_id"
@@ -308,45 +212,72 @@ def cancel(flight_id):
     departure_time = flight['departure_datetime']
     time_until_departure = departure_time - datetime.now()
 
-    if time_until_departure < timedelta(hours=72):
+    if time_until_departure < CANCEL_NOTICE:
         flash('לא ניתן לבטל טיסה פחות מ-72 שעות לפני מועד ההמראה', 'error')
         return redirect(url_for('flights.list'))
 
     try:
         with db_transaction(commit=True) as db:
-            # Update flight status
-            db.execute("UPDATE Flight SET status = 'Canceled' WHERE flight_id = %s", (flight_id,))
-
-            # Get all active orders for this flight to refund registered customers
-            db.execute("""
-                SELECT fo.customer_email, fo.total_payment
-                FROM FlightOrder fo
-                WHERE fo.flight_id = %s AND fo.order_status = 'Active'
-            """, (flight_id,))
-            orders_to_refund = db.fetchall()
-
-            # Add full refund to registered customers' balance
-            for order in orders_to_refund:
-                refund_amount = float(order['total_payment'])
-                db.execute("""
-                    UPDATE RegisteredCustomer
-                    SET balance = balance + %s
-                    WHERE email = %s
-                """, (refund_amount, order['customer_email']))
-
-            # Update all related orders to Canceled_By_Company with full refund (total_payment = 0)
-            db.execute("""
-                UPDATE FlightOrder
-                SET order_status = 'Canceled_By_Company', total_payment = 0
-                WHERE flight_id = %s AND order_status = 'Active'
-            """, (flight_id,))
+            # Flight, full refunds and orders in three set-based statements
+            cancel_flights(db, [flight_id])
 
+        invalidate_flight_caches([flight_id])
         flash('טיסה בוטלה בהצלחה. כל ההזמנות הפעילות קיבלו זיכוי מלא', 'success')
     except Exception as e:
         flash(f'שגיאה בביטול טיסה: {str(e)}', 'error')
 
     return redirect(url_for('flights.list'))
 
+@bp.route('/cancel-bulk', methods=['GET', 'POST'])
+def cancel_bulk():
+    """Cancel all flights of a grounded plane, or of a route in a date window (managers only)"""
+    if not is_manager():
+        flash('אין הרשאה לגשת לדף זה', 'error')
+        return redirect(url_for('flights.search'))
+
+    planes = execute_query("SELECT plane_id, manufacturer, size_category FROM Plane ORDER BY plane_id",
+                           fetch_all=True)
+    form = request.form if request.method == 'POST' else {}
+    scope = form.get('scope', 'plane')
+    plane_id = form.get('plane_id', type=int) if form else None
+    origin = form.get('origin_airport') or None
+    destination = form.get('destination_airport') or None
+    date_from = parse_date(form.get('date_from'))
+    date_to = parse_date(form.get('date_to'))
+
+    if request.method == 'GET':
+        return render_template('flights/cancel_bulk.html', planes=planes, airports=get_airports(), form=form)
+
+    if scope == 'plane' and not plane_id:
+        flash('יש לבחור מטוס', 'error')
+    elif scope == 'route' and not (origin and destination and date_from and date_to):
+        flash('יש לבחור מסלול וטווח תאריכים', 'error')
+    elif date_from and date_to and date_from > date_to:
+        flash('תאריך ההתחלה מאוחר מתאריך הסיום', 'error')
+    else:
+        if scope == 'plane':
+            flights, too_soon = find_cancelable_flights(plane_id=plane_id, date_from=date_from, date_to=date_to)
+        else:
+            flights, too_soon = find_cancelable_flights(origin=origin, destination=destination,
+                                                        date_from=date_from, date_to=date_to)
+
+        if not form.get('confirm'):
+            # First step - show what would be canceled
+            return render_template('flights/cancel_bulk.html', planes=planes, airports=get_airports(),
+                                   form=form, preview=flights, too_soon=too_soon)
+
+        result = cancel_flights_in_batches([flight['flight_id'] for flight in flights],
+                                           current_app.config['BULK_CANCEL_BATCH_SIZE'])
+        if result['error']:
+            flash(f"שגיאה בביטול טיסות: {result['error']} ({result['flights']} טיסות בוטלו לפני השגיאה)", 'error')
+        else:
+            flash(f"{result['flights']} טיסות בוטלו, {result['orders']} הזמנות קיבלו זיכוי מלא", 'success')
+        if result['skipped']:
+            flash(f"{result['skipped']} טיסות דולגו - הסטטוס או מועד ההמראה השתנו בינתיים", 'info')
+        return redirect(url_for('flights.list'))
+
+    return render_template('flights/cancel_bulk.html', planes=planes, airports=get_airports(), form=form)
+
 @bp.route('/<int:flight_id>/status', methods=['POST'])
 def update_status(flight_id):
     """Update flight status (managers only)"""
@@ -362,6 +293,9 @@ def update_status(flight_id):
     try:
         query = "UPDATE Flight SET status = %s WHERE flight_id = %s"
         execute_query(query, (new_status, flight_id), commit=True)
+        invalidate_route_graph()
+        invalidate_fare_calendars()
+        invalidate_crew_availability()
         flash('סטטוס טיסה עודכן בהצלחה', 'success')
     except Exception as e:
         flash(f'שגיאה בעדכון סטטוס: {str(e)}', 'error')
@@ -375,38 +309,26 @@ def edit_prices(flight_id):
         flash('אין הרשאה לגשת לדף זה', 'error')
         return redirect(url_for('flights.search'))
 
-    # Get flight details
-    flight_query = "SELECT * FROM Flight WHERE flight_id = %s"
+    # Get flight details, and whether its plane has Business class (live, not the cached plane index)
+    flight_query = """
+        SELECT f.*, EXISTS (SELECT 1 FROM PlaneClass pc
+                            WHERE pc.plane_id = f.plane_id AND pc.class_type = 'Business') AS has_business
+        FROM Flight f
+        WHERE f.flight_id = %s
+    """
     flight = execute_query(flight_query, (flight_id,), fetch_one=True)
 
     if not flight:
         flash('טיסה לא נמצאה', 'error')
         return redirect(url_for('flights.list'))
-    
-    # Check if plane has Business class
-    business_check_query = """
-        SELECT COUNT(*) as has_business
-        FROM PlaneClass
-        WHERE plane_id = %s AND class_type = 'Business'
-    """
-    business_check = execute_query(business_check_query, (flight['plane_id'],), fetch_one=True)
-    flight['has_business'] = business_check and business_check['has_business'] > 0
+    flight['has_business'] = bool(flight['has_business'])
 
     if request.method == 'POST':
         price_economy = request.form.get('price_economy')
         price_business = request.form.get('price_business')
         
-        # Check if plane has Business class
-        business_check_query = """
-            SELECT COUNT(*) as has_business
-            FROM PlaneClass
-            WHERE plane_id = %s AND class_type = 'Business'
-        """
-        business_check = execute_query(business_check_query, (flight['plane_id'],), fetch_one=True)
-        has_business = business_check and business_check['has_business'] > 0
-        
         # Set price_business to NULL if plane doesn't have Business class
-        if not has_business:
+        if not flight['has_business']:
             price_business = None
 
         try:
@@ -416,6 +338,7 @@ def edit_prices(flight_id):
                 WHERE flight_id = %s
             """
             execute_query(update_query, (price_economy, price_business, flight_id), commit=True)
+            invalidate_fare_calendars()
             flash('מחירים עודכנו בהצלחה', 'success')
             return redirect(url_for('flights.list'))
         except Exception as e:
@@ -2,9 +2,16 @@
 Manager routes
 Handles manager-only operations like crew assignment
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from database import execute_query, db_transaction
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
+from datetime import timedelta
+from database import execute_query, db_transaction, Error, IntegrityError, is_lock_conflict
 from utils.auth import is_manager, get_current_manager_id
+from utils.seat_map import invalidate_seat_layout
+from utils.plane_index import get_plane_capability, invalidate_plane_capabilities
+from utils.seat_layouts import LAYOUT_TEMPLATES, MAX_COLS, add_plane_class
+from utils.crew_assignments import is_long_haul, required_crew, check_crew, busy_crew, current_crew, save_crew
+from utils.crew_availability import (flight_window, eligible_crew, update_crew_availability,
+                                     invalidate_crew_availability)
 
 bp = Blueprint('managers', __name__)
 
@@ -30,9 +37,8 @@ def assign_crew(flight_id):
         return redirect(url_for('flights.list'))
 
     # Determine required crew based on flight duration
-    is_long_haul = flight['flight_duration'] > 6
-    required_pilots = 3 if is_long_haul else 2
-    required_fas = 6 if is_long_haul else 3
+    long_haul = is_long_haul(flight['flight_duration'])
+    required_pilots, required_fas = required_crew(flight['flight_duration'])
 
     if request.method == 'POST':
         pilot_ids = list(set(request.form.getlist('pilot_id')))
@@ -47,87 +53,61 @@ def assign_crew(flight_id):
             flash(f'נדרשים בדיוק {required_fas} דיילים לטיסה זו', 'error')
             return redirect(url_for('managers.assign_crew', flight_id=flight_id))
 
-        # If long haul, verify all crew is qualified
-        if is_long_haul:
-            for pilot_id in pilot_ids:
-                pilot_query = "SELECT is_long_haul_qualified FROM Pilot WHERE id_number = %s"
-                pilot = execute_query(pilot_query, (pilot_id,), fetch_one=True)
-                if not pilot or not pilot['is_long_haul_qualified']:
-                    flash(f'טייס {pilot_id} לא מוכשר לטיסות ארוכות', 'error')
-                    return redirect(url_for('managers.assign_crew', flight_id=flight_id))
-
-            for fa_id in fa_ids:
-                fa_query = "SELECT is_long_haul_qualified FROM FlightAttendant WHERE id_number = %s"
-                fa = execute_query(fa_query, (fa_id,), fetch_one=True)
-                if not fa or not fa['is_long_haul_qualified']:
-                    flash(f'דייל {fa_id} לא מוכשר לטיסות ארוכות', 'error')
-                    return redirect(url_for('managers.assign_crew', flight_id=flight_id))
-
+        crew = {'pilot': pilot_ids, 'attendant': fa_ids}
         try:
             with db_transaction(commit=True) as db:
-                # Delete existing assignments
-                db.execute("DELETE FROM FlightPilotAssignment WHERE flight_id = %s", (flight_id,))
-                db.execute("DELETE FROM FlightAttendantAssignment WHERE flight_id = %s", (flight_id,))
+                # Whole crew in one query - every member must exist, and be qualified for long haul
+                problems = check_crew(db, crew, long_haul)
+                if problems:
+                    role, id_number, problem = problems[0]
+                    member = 'טייס' if role == 'pilot' else 'דייל'
+                    if problem == 'unknown':
+                        flash(f'{member} {id_number} לא נמצא', 'error')
+                    else:
+                        flash(f'{member} {id_number} לא מוכשר לטיסות ארוכות', 'error')
+                    return redirect(url_for('managers.assign_crew', flight_id=flight_id))
 
-                # Insert pilot assignments
-                pilot_insert = "INSERT INTO FlightPilotAssignment (pilot_id, flight_id) VALUES (%s, %s)"
-                for pilot_id in pilot_ids:
-                    db.execute(pilot_insert, (pilot_id, flight_id))
+                # No one may fly two flights without the rest gap in between - checked against the
+                # database, not the cached index, with the overlapping assignments locked
+                start, end = flight_window(flight['departure_datetime'], flight['flight_duration'])
+                rest = timedelta(hours=current_app.config['CREW_REST_HOURS'])
+                conflicts = busy_crew(db, flight_id, start, end, rest, crew)
+                if conflicts:
+                    role, id_number = conflicts[0]
+                    member = 'טייס' if role == 'pilot' else 'דייל'
+                    flash(f'{member} {id_number} משובץ לטיסה אחרת בזמן זה '
+                          f'(נדרשות {current_app.config["CREW_REST_HOURS"]} שעות מנוחה בין טיסות)', 'error')
+                    return redirect(url_for('managers.assign_crew', flight_id=flight_id))
 
-                # Insert flight attendant assignments
-                fa_insert = "INSERT INTO FlightAttendantAssignment (flight_attendant_id, flight_id) VALUES (%s, %s)"
-                for fa_id in fa_ids:
-                    db.execute(fa_insert, (fa_id, flight_id))
+                # Only the added and removed members are written
+                changes = save_crew(db, flight_id, crew)
 
+            update_crew_availability(flight_id, flight['departure_datetime'], flight['flight_duration'], changes)
             flash('צוות שובץ בהצלחה', 'success')
             return redirect(url_for('flights.list'))
 
+        except IntegrityError:
+            flash('הצוות של טיסה זו עודכן במקביל, אנא נסה שוב', 'error')
+        except Error as e:
+            # Two saves locking the same crew members - one of them is rolled back
+            if is_lock_conflict(e):
+                flash('הצוות של טיסה זו עודכן במקביל, אנא נסה שוב', 'error')
+            else:
+                flash(f'שגיאה בשיבוץ צוות: {str(e)}', 'error')
         except Exception as e:
             flash(f'שגיאה בשיבוץ צוות: {str(e)}', 'error')
 
     # GET request - show form
-    # Get available pilots
-    if is_long_haul:
-        pilots_query = """
-            SELECT id_number, first_name_hebrew, last_name_hebrew
-            FROM Pilot
-            WHERE is_long_haul_qualified = TRUE
-            ORDER BY first_name_hebrew, last_name_hebrew
-        """
-    else:
-        pilots_query = """
-            SELECT id_number, first_name_hebrew, last_name_hebrew
-            FROM Pilot
-            ORDER BY first_name_hebrew, last_name_hebrew
-        """
-    pilots = execute_query(pilots_query, fetch_all=True)
-
-    # Get available flight attendants
-    if is_long_haul:
-        fas_query = """
-            SELECT id_number, first_name_hebrew, last_name_hebrew
-            FROM FlightAttendant
-            WHERE is_long_haul_qualified = TRUE
-            ORDER BY first_name_hebrew, last_name_hebrew
-        """
-    else:
-        fas_query = """
-            SELECT id_number, first_name_hebrew, last_name_hebrew
-            FROM FlightAttendant
-            ORDER BY first_name_hebrew, last_name_hebrew
-        """
-    flight_attendants = execute_query(fas_query, fetch_all=True)
+    # Only crew that is qualified and free (with the rest gap) for this flight, from the in-memory index
+    eligible = eligible_crew(flight)
+    pilots = eligible['pilot']
+    flight_attendants = eligible['attendant']
 
     # Get current assignments
-    current_pilots_query = """
-        SELECT pilot_id FROM FlightPilotAssignment WHERE flight_id = %s
-    """
-    current_pilots = [row['pilot_id'] for row in execute_query(current_pilots_query, (flight_id,), fetch_all=True)]
-
-    current_fas_query = """
-        SELECT flight_attendant_id FROM FlightAttendantAssignment WHERE flight_id = %s
-    """
-    current_fas = [row['flight_attendant_id'] for row in execute_query(current_fas_query, (flight_id,), fetch_all=True)]
+    with db_transaction() as db:
+        current = current_crew(db, flight_id)
+    current_pilots = sorted(current['pilot'])
+    current_fas = sorted(current['attendant'])
 
     return render_template('flights/crew.html',
                          flight=flight,
@@ -137,7 +117,8 @@ def assign_crew(flight_id):
                          required_fas=required_fas,
                          current_pilots=current_pilots,
                          current_fas=current_fas,
-                         is_long_haul=is_long_haul)
+                         is_long_haul=long_haul,
+                         rest_hours=current_app.config['CREW_REST_HOURS'])
 
 
 # ==================== PLANES MANAGEMENT ====================
@@ -198,6 +179,7 @@ def plane_add():
                 VALUES (%s, %s, %s, %s)
             """
             execute_query(insert_query, (plane_id, manufacturer, size_category, acquisition_date), commit=True)
+            invalidate_plane_capabilities()
             flash('מטוס נוסף בהצלחה', 'success')
             return redirect(url_for('managers.plane_classes', plane_id=plane_id))
 
@@ -242,6 +224,10 @@ def plane_classes(plane_id):
                 flash('מספר השורות והטורים חייב להיות חיובי', 'error')
                 return redirect(url_for('managers.plane_classes', plane_id=plane_id))
 
+            if cols_count > MAX_COLS:
+                flash(f'מספר הטורים המקסימלי הוא {MAX_COLS}', 'error')
+                return redirect(url_for('managers.plane_classes', plane_id=plane_id))
+
             # Check if class already exists
             check_query = "SELECT * FROM PlaneClass WHERE plane_id = %s AND class_type = %s"
             existing = execute_query(check_query, (plane_id, class_type), fetch_one=True)
@@ -250,26 +236,13 @@ def plane_classes(plane_id):
                 flash(f'מחלקה {class_type} כבר קיימת למטוס זה', 'error')
                 return redirect(url_for('managers.plane_classes', plane_id=plane_id))
 
-            # Insert PlaneClass
-            class_query = """
-                INSERT INTO PlaneClass (plane_id, class_type, rows_count, cols_count)
-                VALUES (%s, %s, %s, %s)
-            """
-            execute_query(class_query, (plane_id, class_type, rows_count, cols_count), commit=True)
-
-            # Generate seats automatically
-            # Column labels: A, B, C, D, E, F, etc.
-            import string
-            cols = list(string.ascii_uppercase[:cols_count])
-
+            # Insert the class and all of its seats in one transaction
             with db_transaction(commit=True) as db:
-                seat_insert = "INSERT INTO Seat (plane_id, class_type, seat_number) VALUES (%s, %s, %s)"
-                for row in range(1, rows_count + 1):
-                    for col in cols:
-                        seat_number = f"{row}{col}"
-                        db.execute(seat_insert, (plane_id, class_type, seat_number))
+                seats_created = add_plane_class(db, plane_id, class_type, rows_count, cols_count)
 
-            flash(f'מחלקה {class_type} נוספה בהצלחה עם {rows_count * cols_count} מושבים', 'success')
+            invalidate_seat_layout(plane_id)
+            invalidate_plane_capabilities()
+            flash(f'מחלקה {class_type} נוספה בהצלחה עם {seats_created} מושבים', 'success')
             return redirect(url_for('managers.plane_classes', plane_id=plane_id))
 
         except ValueError:
@@ -290,6 +263,64 @@ def plane_classes(plane_id):
 
     return render_template('managers/plane_classes.html', plane=plane, classes=classes)
 
+@bp.route('/manager/planes/layouts', methods=['GET', 'POST'])
+def layout_templates():
+    """Apply a seat layout template (class + seats) to many planes at once"""
+    if not is_manager():
+        flash('אין הרשאה לגשת לדף זה', 'error')
+        return redirect(url_for('flights.search'))
+
+    if request.method == 'POST':
+        template = LAYOUT_TEMPLATES.get(request.form.get('template'))
+        plane_ids = sorted({int(p) for p in request.form.getlist('plane_id') if p.isdigit()})
+
+        if not template or not plane_ids:
+            flash('יש לבחור תבנית ולפחות מטוס אחד', 'error')
+            return redirect(url_for('managers.layout_templates'))
+
+        placeholders = ', '.join(['%s'] * len(plane_ids))
+        planes_query = f"""
+            SELECT p.plane_id, p.size_category,
+                   SUM(CASE WHEN pc.class_type = %s THEN 1 ELSE 0 END) AS has_class
+            FROM Plane p
+            LEFT JOIN PlaneClass pc ON p.plane_id = pc.plane_id
+            WHERE p.plane_id IN ({placeholders})
+            GROUP BY p.plane_id, p.size_category
+        """
+        planes = execute_query(planes_query, (template.class_type, *plane_ids), fetch_all=True)
+
+        # Small planes can't have Business class, and a class can only be added once
+        eligible = [p['plane_id'] for p in planes
+                    if not p['has_class']
+                    and not (template.class_type == 'Business' and p['size_category'] == 'Small')]
+        skipped = len(plane_ids) - len(eligible)
+
+        if eligible:
+            try:
+                with db_transaction(commit=True) as db:
+                    for plane_id in eligible:
+                        add_plane_class(db, plane_id, template.class_type,
+                                        template.rows_count, template.cols_count)
+            except Exception as e:
+                flash(f'שגיאה בהחלת התבנית: {str(e)}', 'error')
+                return redirect(url_for('managers.layout_templates'))
+            finally:
+                for plane_id in eligible:
+                    invalidate_seat_layout(plane_id)
+                invalidate_plane_capabilities()
+
+        flash(f'התבנית {template.title} הוחלה על {len(eligible)} מטוסים'
+              + (f' ({skipped} דולגו)' if skipped else ''), 'success' if eligible else 'error')
+        return redirect(url_for('managers.planes_list'))
+
+    planes_query = "SELECT plane_id, manufacturer, size_category FROM Plane ORDER BY plane_id"
+    planes = execute_query(planes_query, fetch_all=True)
+    for plane in planes:
+        plane['classes'] = ', '.join(sorted(get_plane_capability(plane['plane_id']).classes))
+
+    return render_template('managers/layout_templates.html', planes=planes,
+                           templates=LAYOUT_TEMPLATES.values())
+
 
 # ==================== PILOTS MANAGEMENT ====================
 
@@ -353,6 +384,7 @@ def pilot_add():
             """
             execute_query(insert_query, (id_number, first_name_hebrew, last_name_hebrew, start_date,
                                         phone_number, city, street, house_number, is_long_haul_qualified), commit=True)
+            invalidate_crew_availability()
             flash('טייס נוסף בהצלחה', 'success')
             return redirect(url_for('managers.pilots_list'))
 
@@ -424,6 +456,7 @@ def attendant_add():
             """
             execute_query(insert_query, (id_number, first_name_hebrew, last_name_hebrew, start_date,
                                         phone_number, city, street, house_number, is_long_haul_qualified), commit=True)
+            invalidate_crew_availability()
             flash('דייל נוסף בהצלחה', 'success')
             return redirect(url_for('managers.attendants_list'))
 
@@ -2,14 +2,78 @@
 Order routes
 Handles order creation, listing, cancellation, and history
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from database import execute_query, db_transaction
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from database import execute_query, db_transaction, insert_rows, Error, IntegrityError, is_lock_conflict
 from utils.auth import is_logged_in, get_current_user_email, get_current_manager_id, is_manager
 from datetime import datetime, timedelta
-from routes.flights import update_expired_flights
+from utils.flight_status import EFFECTIVE_ORDER_STATUS_SQL, apply_effective_status
+from utils.seat_map import get_seat_layout
+from utils.seat_inventory import (get_seat_inventory, mark_seats_booked, mark_seats_released,
+                                  invalidate_seat_inventory)
+from utils.seat_holds import get_hold_token, hold_seats, release_seats, release_all_seats
+from utils.metrics import count_booking, count_seat_conflict
 
 bp = Blueprint('orders', __name__)
 
+class FlightUnavailable(Exception):
+    """The flight was canceled, filled up or departed after the booking page checked it"""
+
+class OrderNotActive(Exception):
+    """The order was canceled after the cancel page checked it"""
+
+def _is_order_number_conflict(error):
+    """The unique (customer_email, customer_order_number) index rejected the order"""
+    return isinstance(error, IntegrityError) and 'customer_order_number' in str(error)
+
+def _insert_order(flight_id, customer_email, guest_first_name, guest_last_name, seats_to_book, total_price):
+    """
+    Insert an order, its tickets and the flight's seat count in one transaction -
+    returns the order_id. Raises FlightUnavailable when the flight is no longer
+    Active or has too few seats left.
+    """
+    with db_transaction(commit=True) as db:
+        # Count the seats first: the guarded UPDATE locks the flight row, so a cancellation
+        # either waits for this order (and refunds it) or has already made the flight unbookable
+        db.execute("""
+            UPDATE Flight
+            SET status = CASE WHEN seats_booked + %s >= seats_total THEN 'Full' ELSE status END,
+                seats_booked = seats_booked + %s
+            WHERE flight_id = %s AND status = 'Active' AND seats_booked + %s <= seats_total
+        """, (len(seats_to_book), len(seats_to_book), flight_id, len(seats_to_book)))
+        if db.rowcount == 0:
+            raise FlightUnavailable(flight_id)
+
+        # For guests, create Customer record if doesn't exist
+        if guest_first_name and guest_last_name:
+            # Check if customer exists
+            check_customer = "SELECT email FROM Customer WHERE email = %s"
+            db.execute(check_customer, (customer_email,))
+            if not db.fetchone():
+                # Create new guest customer (not registered)
+                create_customer = """
+                    INSERT INTO Customer (email, first_name_english, last_name_english)
+                    VALUES (%s, %s, %s)
+                """
+                db.execute(create_customer, (customer_email, guest_first_name, guest_last_name))
+
+        # Create order - numbered after the customer's previous orders
+        order_query = """
+            INSERT INTO FlightOrder (customer_email, flight_id, order_date, order_status, total_payment,
+                                     customer_order_number)
+            SELECT %s, %s, %s, 'Active', %s, COALESCE(MAX(customer_order_number), 0) + 1
+            FROM FlightOrder
+            WHERE customer_email = %s
+        """
+        db.execute(order_query, (customer_email, flight_id, datetime.now(), total_price, customer_email))
+        order_id = db.lastrowid
+
+        # Create all tickets with one multi-row INSERT
+        insert_rows(db, "Ticket (flight_id, order_id, plane_id, class_type, seat_number, price)",
+                    [(flight_id, order_id, seat_plane_id, seat_class, seat_number, price)
+                     for seat_plane_id, seat_class, seat_number, price in seats_to_book])
+
+    return order_id
+
 @bp.route('/create', methods=['POST'])
 def create():
     """Create new order with tickets - supports both logged in users and guests"""
@@ -47,6 +111,7 @@ def create():
         FROM Flight f
         JOIN Plane p ON f.plane_id = p.plane_id
         WHERE f.flight_id = %s AND f.status IN ('Active', 'Full')
+          AND f.departure_datetime > NOW()
     """
     flight = execute_query(flight_query, (flight_id,), fetch_one=True)
 
@@ -59,104 +124,71 @@ def create():
         flash('שגיאה: מטוס לא תואם לטיסה', 'error')
         return redirect(url_for('flights.search'))
 
-    try:
-        with db_transaction(commit=True) as db:
-            # For guests, create Customer record if doesn't exist
-            if guest_first_name and guest_last_name:
-                # Check if customer exists
-                check_customer = "SELECT email FROM Customer WHERE LOWER(email) = %s"
-                db.execute(check_customer, (customer_email,))
-                if not db.fetchone():
-                    # Create new guest customer (not registered)
-                    create_customer = """
-                        INSERT INTO Customer (email, first_name_english, last_name_english)
-                        VALUES (%s, %s, %s)
-                    """
-                    db.execute(create_customer, (customer_email, guest_first_name, guest_last_name))
-            
-            # Check seat availability
-            occupied_query = """
-                SELECT t.plane_id, t.class_type, t.seat_number
-                FROM Ticket t
-                JOIN FlightOrder fo ON t.order_id = fo.order_id
-                WHERE fo.flight_id = %s
-                  AND fo.order_status IN ('Active', 'Completed')
-                  AND t.plane_id = %s
-            """
-            db.execute(occupied_query, (flight_id, plane_id))
-            occupied_seats = {(row['plane_id'], row['class_type'], row['seat_number'])
-                            for row in db.fetchall()}
-
-            # Parse selected seats and check availability
-            seats_to_book = []
-            total_price = 0
-            for seat_str in selected_seats:
-                parts = seat_str.split(',')
-                if len(parts) != 3:
-                    continue
-                seat_plane_id, seat_class, seat_number = int(parts[0]), parts[1], parts[2]
-
-                # Validate: Small planes don't have Business class
-                if seat_class == 'Business' and flight['size_category'] == 'Small':
-                    flash('מטוסים קטנים לא כוללים מחלקת עסקים', 'error')
-                    return redirect(url_for('flights.seats', flight_id=flight_id))
-
-                seat_key = (seat_plane_id, seat_class, seat_number)
-                if seat_key in occupied_seats:
-                    flash(f'מושב {seat_number} במחלקה {seat_class} כבר תפוס', 'error')
-                    return redirect(url_for('flights.seats', flight_id=flight_id))
-
-                # Calculate price from flight
-                if seat_class == 'Business':
-                    price = float(flight['price_business']) if flight['price_business'] else 0
-                else:
-                    price = float(flight['price_economy'])
-                seats_to_book.append((seat_plane_id, seat_class, seat_number, price))
-                total_price += price
-
-            if not seats_to_book:
-                flash('לא נבחרו מושבים', 'error')
-                return redirect(url_for('flights.seats', flight_id=flight_id))
-
-            # Create order
-            order_query = """
-                INSERT INTO FlightOrder (customer_email, flight_id, order_date, order_status, total_payment)
-                VALUES (%s, %s, %s, 'Active', %s)
-            """
-            db.execute(order_query, (customer_email, flight_id, datetime.now(), total_price))
-            order_id = db.lastrowid
+    # Check seat availability against the flight's seat inventory (no DB scan)
+    layout = get_seat_layout(plane_id)
+    inventory = get_seat_inventory(flight_id, plane_id, flight['seats_booked'])
+
+    # Parse selected seats and check availability
+    seats_to_book = []
+    total_price = 0
+    for seat_str in selected_seats:
+        parts = seat_str.split(',')
+        if len(parts) != 3:
+            continue
+        seat_plane_id, seat_class, seat_number = int(parts[0]), parts[1], parts[2]
+
+        # Validate: Small planes don't have Business class
+        if seat_class == 'Business' and flight['size_category'] == 'Small':
+            flash('מטוסים קטנים לא כוללים מחלקת עסקים', 'error')
+            return redirect(url_for('flights.seats', flight_id=flight_id))
 
-            # Create tickets
-            ticket_query = """
-                INSERT INTO Ticket (flight_id, order_id, plane_id, class_type, seat_number, price)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            for seat_plane_id, seat_class, seat_number, price in seats_to_book:
-                db.execute(ticket_query, (flight_id, order_id, seat_plane_id, seat_class, seat_number, price))
-
-            # Update flight status to Full if needed
-            capacity_query = """
-                SELECT SUM(rows_count * cols_count) AS total_seats
-                FROM PlaneClass
-                WHERE plane_id = %s
-            """
-            db.execute(capacity_query, (plane_id,))
-            total_capacity = db.fetchone()['total_seats']
-
-            booked_query = """
-                SELECT COUNT(*) AS booked_count
-                FROM Ticket t
-                JOIN FlightOrder fo ON t.order_id = fo.order_id
-                WHERE fo.flight_id = %s
-                  AND fo.order_status IN ('Active', 'Completed')
-                  AND t.plane_id = %s
-            """
-            db.execute(booked_query, (flight_id, plane_id))
-            booked_count = db.fetchone()['booked_count']
+        seat_index = layout.index_of.get((seat_class, seat_number))
+        if seat_plane_id != plane_id or seat_index is None:
+            flash(f'מושב {seat_number} לא קיים במחלקה {seat_class}', 'error')
+            return redirect(url_for('flights.seats', flight_id=flight_id))
+
+        if inventory.is_taken(seat_index):
+            count_booking('conflict')
+            count_seat_conflict('inventory')
+            flash(f'מושב {seat_number} במחלקה {seat_class} כבר תפוס', 'error')
+            return redirect(url_for('flights.seats', flight_id=flight_id))
+
+        # Calculate price from flight
+        if seat_class == 'Business':
+            price = float(flight['price_business']) if flight['price_business'] else 0
+        else:
+            price = float(flight['price_economy'])
+        seats_to_book.append((seat_plane_id, seat_class, seat_number, price))
+        total_price += price
+
+    if not seats_to_book:
+        flash('לא נבחרו מושבים', 'error')
+        return redirect(url_for('flights.seats', flight_id=flight_id))
+
+    # The seats must be held by this session (they normally already are from the seat map)
+    hold_token = get_hold_token(session)
+    conflicts = hold_seats(flight_id, [seat_number for _, _, seat_number, _ in seats_to_book], hold_token)
+    if conflicts:
+        count_booking('conflict')
+        count_seat_conflict('hold')
+        flash(f'המושבים {", ".join(conflicts)} שמורים כרגע על ידי לקוח אחר, אנא בחר מושב אחר', 'error')
+        return redirect(url_for('flights.seats', flight_id=flight_id))
 
-            if booked_count >= total_capacity:
-                update_query = "UPDATE Flight SET status = 'Full' WHERE flight_id = %s"
-                db.execute(update_query, (flight_id,))
+    try:
+        # Two orders of one customer at once can deadlock on, or both take, the next order number - retry once
+        for attempt in range(2):
+            try:
+                order_id = _insert_order(flight_id, customer_email, guest_first_name, guest_last_name,
+                                         seats_to_book, total_price)
+                break
+            except Error as e:
+                if attempt or not (is_lock_conflict(e) or _is_order_number_conflict(e)):
+                    raise
+
+        mark_seats_booked(flight_id, plane_id, [(seat_class, seat_number)
+                                                for _, seat_class, seat_number, _ in seats_to_book])
+        release_all_seats(flight_id, hold_token)
+        count_booking('success')
 
         # If guest, show confirmation page with order details
         if guest_first_name:
@@ -167,16 +199,62 @@ def create():
             flash(f'הזמנה נוצרה בהצלחה! מספר הזמנה: {order_id}', 'success')
             return redirect(url_for('orders.details', order_id=order_id))
 
+    except FlightUnavailable:
+        count_booking('failure')
+        flash('טיסה לא נמצאה או לא זמינה להזמנה', 'error')
+        return redirect(url_for('flights.search'))
+    except IntegrityError as e:
+        if _is_order_number_conflict(e):
+            count_booking('failure')
+            flash('שגיאה ביצירת הזמנה, אנא נסה שוב', 'error')
+            return redirect(url_for('flights.seats', flight_id=flight_id))
+        # Someone else booked one of the seats meanwhile - our cached inventory was stale
+        invalidate_seat_inventory(flight_id)
+        count_booking('conflict')
+        count_seat_conflict('insert')
+        flash('אחד המושבים שנבחרו הוזמן זה עתה על ידי לקוח אחר, אנא בחר מושב אחר', 'error')
+        return redirect(url_for('flights.seats', flight_id=flight_id))
     except Exception as e:
+        count_booking('failure')
         flash(f'שגיאה ביצירת הזמנה: {str(e)}', 'error')
         return redirect(url_for('flights.seats', flight_id=flight_id))
 
+@bp.route('/hold', methods=['POST'])
+def hold():
+    """Hold or release a seat picked on the seat map (AJAX)"""
+    if is_manager():
+        return jsonify({'held': False, 'message': 'מנהלים אינם רשאים להזמין כרטיסים'}), 403
+
+    flight_id = request.form.get('flight_id', type=int)
+    seat_number = request.form.get('seat_number', '')
+    release = request.form.get('action') == 'release'
+
+    flight = execute_query("""
+        SELECT plane_id, seats_booked FROM Flight
+        WHERE flight_id = %s AND status IN ('Active', 'Full')
+          AND departure_datetime > NOW()
+    """, (flight_id,), fetch_one=True)
+    if not flight:
+        return jsonify({'held': False, 'message': 'טיסה לא נמצאה או לא זמינה להזמנה'}), 404
+
+    seat_index = get_seat_layout(flight['plane_id']).index_of.get((request.form.get('class_type'), seat_number))
+    if seat_index is None:
+        return jsonify({'held': False, 'message': f'מושב {seat_number} לא קיים'}), 404
+
+    hold_token = get_hold_token(session)
+    if release:
+        release_seats(flight_id, [seat_number], hold_token)
+        return jsonify({'held': False})
+
+    if get_seat_inventory(flight_id, flight['plane_id'], flight['seats_booked']).is_taken(seat_index):
+        return jsonify({'held': False, 'message': f'מושב {seat_number} כבר תפוס'}), 409
+    if hold_seats(flight_id, [seat_number], hold_token):
+        return jsonify({'held': False, 'message': f'מושב {seat_number} שמור כרגע על ידי לקוח אחר'}), 409
+    return jsonify({'held': True})
+
 @bp.route('/')
 def list():
     """List ACTIVE orders for current user (upcoming flights)"""
-    # Update expired flights and their orders first
-    update_expired_flights()
-
     if not is_logged_in():
         flash('יש להתחבר כדי לראות הזמנות', 'error')
         return redirect(url_for('auth.login'))
@@ -187,7 +265,8 @@ def list():
         return redirect(url_for('auth.login'))
 
     # Only show Active orders, sorted by flight departure date (ascending - nearest first)
-    query = """
+    # Orders of departed flights count as Completed even before the status engine ran
+    query = f"""
         SELECT fo.*, f.origin_airport, f.destination_airport,
                f.departure_datetime, f.status AS flight_status,
                COUNT(t.order_id) AS ticket_count
@@ -196,23 +275,12 @@ def list():
         LEFT JOIN Ticket t ON fo.order_id = t.order_id
         WHERE fo.customer_email = %s
           AND fo.order_status = 'Active'
+          AND {EFFECTIVE_ORDER_STATUS_SQL} = 'Active'
         GROUP BY fo.order_id
         ORDER BY f.departure_datetime ASC
     """
     orders = execute_query(query, (customer_email,), fetch_all=True)
 
-    # Get order numbers based on all orders for this customer
-    all_orders_query = """
-        SELECT order_id FROM FlightOrder
-        WHERE customer_email = %s
-        ORDER BY order_date ASC
-    """
-    all_orders = execute_query(all_orders_query, (customer_email,), fetch_all=True)
-    order_id_to_number = {o['order_id']: idx + 1 for idx, o in enumerate(all_orders)}
-
-    for order in orders:
-        order['customer_order_number'] = order_id_to_number.get(order['order_id'], 0)
-
     return render_template('orders/list.html', orders=orders)
 
 @bp.route('/<int:order_id>')
@@ -237,17 +305,7 @@ def details(order_id):
     if not order:
         flash('הזמנה לא נמצאה', 'error')
         return redirect(url_for('orders.list'))
-
-    order_number_query = """
-        SELECT COUNT(*) + 1 AS customer_order_number
-        FROM FlightOrder
-        WHERE customer_email = %s 
-          AND (order_date < %s OR (order_date = %s AND order_id <= %s))
-    """
-    order_number_result = execute_query(order_number_query, 
-                                        (customer_email, order['order_date'], order['order_date'], order_id), 
-                                        fetch_one=True)
-    order['customer_order_number'] = order_number_result['customer_order_number'] if order_number_result else 1
+    apply_effective_status(order)
 
     tickets_query = """
         SELECT t.*
@@ -306,9 +364,12 @@ def cancel(order_id):
             update_query = """
                 UPDATE FlightOrder
                 SET order_status = 'Canceled_By_Client', total_payment = %s
-                WHERE order_id = %s
+                WHERE order_id = %s AND order_status = 'Active'
             """
             db.execute(update_query, (cancellation_fee, order_id))
+            if db.rowcount == 0:
+                # Canceled meanwhile (a second submit, or the flight was canceled) - no refund, seats untouched
+                raise OrderNotActive(order_id)
 
             # Add refund to registered customer's balance (if registered)
             db.execute("""
@@ -317,9 +378,27 @@ def cancel(order_id):
                 WHERE email = %s
             """, (refund_amount, customer_email))
 
+            # Seats of the canceled order become free again
+            db.execute("SELECT plane_id, class_type, seat_number FROM Ticket WHERE order_id = %s", (order_id,))
+            released_seats = db.fetchall()
+
+            db.execute("""
+                UPDATE Flight
+                SET status = CASE WHEN status = 'Full' THEN 'Active' ELSE status END,
+                    seats_booked = seats_booked - %s
+                WHERE flight_id = %s
+            """, (len(released_seats), order['flight_id']))
+
+        if released_seats:
+            mark_seats_released(order['flight_id'], released_seats[0]['plane_id'],
+                                [(s['class_type'], s['seat_number']) for s in released_seats])
+
         flash(f'הזמנה בוטלה. דמי ביטול: {cancellation_fee:.2f} ₪. זיכוי: {refund_amount:.2f} ₪', 'success')
         return redirect(url_for('orders.details', order_id=order_id))
 
+    except OrderNotActive:
+        flash('לא ניתן לבטל הזמנה שכבר בוטלה או הושלמה', 'error')
+        return redirect(url_for('orders.details', order_id=order_id))
     except Exception as e:
         flash(f'שגיאה בביטול הזמנה: {str(e)}', 'error')
         return redirect(url_for('orders.details', order_id=order_id))
@@ -348,13 +427,14 @@ def lookup():
             FROM FlightOrder fo
             JOIN Flight f ON fo.flight_id = f.flight_id
             JOIN Customer c ON fo.customer_email = c.email
-            WHERE fo.order_id = %s AND LOWER(fo.customer_email) = %s
+            WHERE fo.order_id = %s AND fo.customer_email = %s
         """
         order = execute_query(order_query, (order_id, email), fetch_one=True)
         
         if not order:
             flash('הזמנה לא נמצאה. אנא ודא שקוד ההזמנה וכתובת המייל נכונים', 'error')
             return render_template('orders/guest_view.html')
+        apply_effective_status(order)
         
         tickets_query = """
             SELECT t.*
@@ -396,7 +476,7 @@ def guest_cancel():
         SELECT fo.*, f.departure_datetime
         FROM FlightOrder fo
         JOIN Flight f ON fo.flight_id = f.flight_id
-        WHERE fo.order_id = %s AND LOWER(fo.customer_email) = %s
+        WHERE fo.order_id = %s AND fo.customer_email = %s
     """
     order = execute_query(order_query, (order_id, email), fetch_one=True)
     
@@ -426,9 +506,12 @@ def guest_cancel():
             update_query = """
                 UPDATE FlightOrder
                 SET order_status = 'Canceled_By_Client', total_payment = %s
-                WHERE order_id = %s
+                WHERE order_id = %s AND order_status = 'Active'
             """
             db.execute(update_query, (cancellation_fee, order_id))
+            if db.rowcount == 0:
+                # Canceled meanwhile (a second submit, or the flight was canceled) - no refund, seats untouched
+                raise OrderNotActive(order_id)
 
             # Add refund to registered customer's balance (if registered)
             db.execute("""
@@ -437,9 +520,27 @@ def guest_cancel():
                 WHERE email = %s
             """, (refund_amount, email))
 
+            # Seats of the canceled order become free again
+            db.execute("SELECT plane_id, class_type, seat_number FROM Ticket WHERE order_id = %s", (order_id,))
+            released_seats = db.fetchall()
+
+            db.execute("""
+                UPDATE Flight
+                SET status = CASE WHEN status = 'Full' THEN 'Active' ELSE status END,
+                    seats_booked = seats_booked - %s
+                WHERE flight_id = %s
+            """, (len(released_seats), order['flight_id']))
+
+        if released_seats:
+            mark_seats_released(order['flight_id'], released_seats[0]['plane_id'],
+                                [(s['class_type'], s['seat_number']) for s in released_seats])
+
         flash(f'הזמנה בוטלה בהצלחה. דמי ביטול: {cancellation_fee:.2f} ₪. זיכוי: {refund_amount:.2f} ₪', 'success')
         return redirect(url_for('orders.lookup'))
     
+    except OrderNotActive:
+        flash('לא ניתן לבטל הזמנה שכבר בוטלה או הושלמה', 'error')
+        return redirect(url_for('orders.lookup'))
     except Exception as e:
         flash(f'שגיאה בביטול הזמנה: {str(e)}', 'error')
         return redirect(url_for('orders.lookup'))
@@ -453,9 +554,6 @@ def guest_view():
 @bp.route('/history')
 def history():
     """Purchase history - past/closed orders (registered customers only)"""
-    # Update expired flights and their orders first
-    update_expired_flights()
-
     customer_email = get_current_user_email()
     if not customer_email:
         flash('יש להתחבר כדי לראות היסטוריה', 'error')
@@ -469,7 +567,7 @@ def history():
     status_filter = request.args.get('status', '')
 
     # Only show non-Active orders (Completed, Canceled_By_Client, Canceled_By_Company)
-    query = """
+    query = f"""
         SELECT fo.*, f.origin_airport, f.destination_airport,
                f.departure_datetime, f.status AS flight_status,
                COUNT(t.order_id) AS ticket_count
@@ -477,12 +575,12 @@ def history():
         JOIN Flight f ON fo.flight_id = f.flight_id
         LEFT JOIN Ticket t ON fo.order_id = t.order_id
         WHERE fo.customer_email = %s
-          AND fo.order_status IN ('Completed', 'Canceled_By_Client', 'Canceled_By_Company')
+          AND {EFFECTIVE_ORDER_STATUS_SQL} IN ('Completed', 'Canceled_By_Client', 'Canceled_By_Company')
     """
     params = [customer_email]
 
     if status_filter:
-        query += " AND fo.order_status = %s"
+        query += f" AND {EFFECTIVE_ORDER_STATUS_SQL} = %s"
         params.append(status_filter)
 
     # Sort by order_date descending (newest first)
@@ -490,16 +588,7 @@ def history():
 
     orders = execute_query(query, tuple(params), fetch_all=True)
 
-    # Get order numbers based on all orders for this customer
-    all_orders_query = """
-        SELECT order_id FROM FlightOrder
-        WHERE customer_email = %s
-        ORDER BY order_date ASC
-    """
-    all_orders = execute_query(all_orders_query, (customer_email,), fetch_all=True)
-    order_id_to_number = {o['order_id']: idx + 1 for idx, o in enumerate(all_orders)}
-
     for order in orders:
-        order['customer_order_number'] = order_id_to_number.get(order['order_id'], 0)
+        apply_effective_status(order)
 
     return render_template('orders/history.html', orders=orders, current_status=status_filter)
@@ -2,42 +2,47 @@
 Reports routes
 Handles management reports
 """
-from flask import Blueprint, render_template
-from database import execute_query
+import csv
+import io
+import itertools
+import json
+from flask import Blueprint, render_template, request, current_app, Response, stream_with_context
+from database import stream_query
 from utils.auth import is_manager
+from utils.report_tables import last_refresh, refresh_reports, RefreshInProgress
+from utils.report_registry import run_report, get_report
 from flask import flash, redirect, url_for
 
 bp = Blueprint('reports', __name__)
 
-def read_sql_file(filename):
-    """Read SQL file content"""
-    import os
-    # Go up from routes/ to app/ to project root, then to db/reports_sql/
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    app_dir = os.path.dirname(current_dir)
-    project_root = os.path.dirname(app_dir)
-    sql_path = os.path.join(project_root, 'db', 'reports_sql', filename)
-    
-    with open(sql_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        # Extract SQL query - remove comments
-        # Find the actual SELECT statement
-        lines = content.split('\n')
-        sql_lines = []
-        in_comment = False
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('/*'):
-                in_comment = True
-            if stripped.endswith('*/'):
-                in_comment = False
-                continue
-            if in_comment:
-                continue
-            if stripped.startswith('--') or not stripped:
-                continue
-            sql_lines.append(line)
-        return ' '.join(sql_lines).strip()
+def run_refresh():
+    return refresh_reports(batch_size=current_app.config['REPORT_REFRESH_BATCH_SIZE'],
+                           lag=current_app.config['REPORT_REFRESH_LAG'])
+
+def report_refreshed_at():
+    """When the report tables were last refreshed - None until the first refresh"""
+    refresh = last_refresh()
+    return refresh['refreshed_at'] if refresh else None
+
+@bp.route('/refresh', methods=['POST'])
+def refresh():
+    """Update the report tables now (managers only)"""
+    if not is_manager():
+        flash('אין הרשאה לבצע פעולה זו', 'error')
+        return redirect(url_for('flights.search'))
+
+    try:
+        result = run_refresh()
+        flash(f"הדוחות עודכנו ({result['flights']} טיסות, {result['order_months']} חודשי הזמנות)", 'success')
+    except RefreshInProgress:
+        flash('עדכון הדוחות כבר מתבצע כעת, נסה שוב בעוד מספר דקות', 'error')
+    except Exception as e:
+        flash(f'שגיאה בעדכון הדוחות: {str(e)}', 'error')
+
+    next_endpoint = request.form.get('next', '')
+    if next_endpoint.startswith('reports.'):
+        return redirect(url_for(next_endpoint))
+    return redirect(url_for('reports.index'))
 
 @bp.route('/')
 def index():
@@ -46,7 +51,8 @@ def index():
         flash('אין הרשאה לגשת לדף זה', 'error')
         return redirect(url_for('flights.search'))
     
-    return render_template('reports/index.html')
+    refresh = last_refresh()
+    return render_template('reports/index.html', refreshed_at=refresh['refreshed_at'] if refresh else None)
 
 @bp.route('/occupancy')
 def occupancy():
@@ -56,15 +62,16 @@ def occupancy():
         return redirect(url_for('flights.search'))
     
     try:
-        query = read_sql_file('report_1.sql')
-        result = execute_query(query, fetch_one=True)
+        refreshed_at = report_refreshed_at()
+        result = run_report('occupancy', fetch_one=True)
         
         if result:
             average_occupancy = result.get('average_system_occupancy', 0)
         else:
             average_occupancy = 0
         
-        return render_template('reports/occupancy.html', average_occupancy=average_occupancy)
+        return render_template('reports/occupancy.html', average_occupancy=average_occupancy,
+                               refreshed_at=refreshed_at)
     except Exception as e:
         flash(f'שגיאה בטעינת הדוח: {str(e)}', 'error')
         return redirect(url_for('reports.index'))
@@ -77,10 +84,10 @@ def revenue():
         return redirect(url_for('flights.search'))
     
     try:
-        query = read_sql_file('report_2.sql')
-        results = execute_query(query, fetch_all=True)
+        refreshed_at = report_refreshed_at()
+        results = run_report('revenue')
         
-        return render_template('reports/revenue.html', results=results)
+        return render_template('reports/revenue.html', results=results, refreshed_at=refreshed_at)
     except Exception as e:
         flash(f'שגיאה בטעינת הדוח: {str(e)}', 'error')
         return redirect(url_for('reports.index'))
@@ -93,10 +100,10 @@ def staff_hours():
         return redirect(url_for('flights.search'))
     
     try:
-        query = read_sql_file('report_3.sql')
-        results = execute_query(query, fetch_all=True)
+        refreshed_at = report_refreshed_at()
+        results = run_report('staff_hours')
         
-        return render_template('reports/staff_hours.html', results=results)
+        return render_template('reports/staff_hours.html', results=results, refreshed_at=refreshed_at)
     except Exception as e:
         flash(f'שגיאה בטעינת הדוח: {str(e)}', 'error')
         return redirect(url_for('reports.index'))
@@ -109,10 +116,10 @@ def cancellations():
         return redirect(url_for('flights.search'))
     
     try:
-        query = read_sql_file('report_4.sql')
-        results = execute_query(query, fetch_all=True)
+        refreshed_at = report_refreshed_at()
+        results = run_report('cancellations')
         
-        return render_template('reports/cancellations.html', results=results)
+        return render_template('reports/cancellations.html', results=results, refreshed_at=refreshed_at)
     except Exception as e:
         flash(f'שגיאה בטעינת הדוח: {str(e)}', 'error')
         return redirect(url_for('reports.index'))
@@ -125,14 +132,71 @@ def plane_activity():
         return redirect(url_for('flights.search'))
     
     try:
-        query = read_sql_file('report_5.sql')
-        results = execute_query(query, fetch_all=True)
+        refreshed_at = report_refreshed_at()
+        results = run_report('plane_activity')
         
-        return render_template('reports/plane_activity.html', results=results)
+        return render_template('reports/plane_activity.html', results=results, refreshed_at=refreshed_at)
     except Exception as e:
         flash(f'שגיאה בטעינת הדוח: {str(e)}', 'error')
         return redirect(url_for('reports.index'))
 
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+def csv_lines(columns, rows):
+    """Encode rows as CSV, one line at a time"""
+    if not columns:
+        # No columns declared in the report header - take them from the first row
+        first = next(rows, None)
+        columns = tuple(first) if first else ()
+        rows = itertools.chain([first], rows) if first else rows
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    # BOM so Excel shows the Hebrew names correctly
+    yield '\ufeff' + line(columns)
+    for row in rows:
+        yield line([row[column] for column in columns])
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str, ensure_ascii=False) + '\n'
+
+@bp.route('/<name>/export')
+def export(name):
+    """Stream a report's rows as CSV or NDJSON (managers only)"""
+    if not is_manager():
+        flash('אין הרשאה לגשת לדף זה', 'error')
+        return redirect(url_for('flights.search'))
+
+    export_format = request.args.get('format', 'csv')
+    try:
+        report = get_report(name)
+    except KeyError:
+        flash('דוח לא נמצא', 'error')
+        return redirect(url_for('reports.index'))
+    if export_format not in EXPORT_FORMATS or report.params:
+        flash('פורמט ייצוא לא נתמך', 'error')
+        return redirect(url_for('reports.index'))
+
+    rows = stream_query(report.sql, fetch_size=current_app.config['EXPORT_FETCH_SIZE'])
+    if export_format == 'csv':
+        lines = csv_lines(report.columns, rows)
+    else:
+        lines = ndjson_lines(rows)
+
+    return Response(stream_with_context(lines), mimetype=EXPORT_FORMATS[export_format],
+                    headers={'Content-Disposition': f'attachment; filename={report.name}.{export_format}'})
+
 @bp.route("/debug-session")
 def debug_session():
     from flask import session
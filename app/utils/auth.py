@@ -26,7 +26,7 @@ def login_customer(email):
     session['user_type'] = 'customer'
 
     # Get customer's first name to display in header
-    query = "SELECT first_name_english FROM Customer WHERE LOWER(email) = %s"
+    query = "SELECT first_name_english FROM Customer WHERE email = %s"
     customer = execute_query(query, (email.lower(),), fetch_one=True)
     if customer:
         session['user_name'] = customer['first_name_english']
@@ -53,7 +53,7 @@ def verify_customer(email, password):
     query = """
         SELECT email, account_password
         FROM RegisteredCustomer
-        WHERE LOWER(email) = %s
+        WHERE email = %s
     """
     user = execute_query(query, (email,), fetch_one=True)
 
@@ -0,0 +1,313 @@
+"""
+Load test for the booking funnel and the manager pages
+Simulated users run concurrently, each on its own session: customers walk
+search -> seat map -> booking -> order details, managers browse the flight
+list, crew page and reports. Runs in-process against the Flask app (any
+DB_BACKEND, e.g. the SQLite stand-in over generated data) or over HTTP against
+a running server.
+
+Per endpoint it reports p50/p95/p99 latency, requests/sec and SQL queries per
+request (from the Server-Timing header), writes the results as JSON and
+compares them with a stored baseline - a slower p95, more queries per request
+or new errors count as a regression.
+"""
+import http.cookiejar
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from datetime import datetime
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+SEAT_INPUT_RE = re.compile(r'<input[^>]*name="seats"[^>]*>', re.DOTALL)
+SEAT_VALUE_RE = re.compile(r'value="([^"]+)"')
+ORDER_URL_RE = re.compile(r'/orders/(\d+)$')
+
+MANAGER_PAGES = (
+    ('flights.list', '/list'),
+    ('reports.occupancy', '/reports/occupancy'),
+    ('reports.revenue', '/reports/revenue'),
+    ('reports.staff_hours', '/reports/staff-hours'),
+    ('reports.cancellations', '/reports/cancellations'),
+    ('reports.plane_activity', '/reports/plane-activity'),
+    ('managers.planes_list', '/manager/planes'),
+)
+# Bookable flights the customers pick from (read from the JSON flight board)
+TARGET_PAGES = 20
+# Tickets per booking, and how common each size is
+BOOKING_SIZES = (1, 2)
+BOOKING_SIZE_WEIGHTS = (70, 30)
+# p95 differences below this are noise, whatever the ratio
+MIN_REGRESSION_MS = 2.0
+# Requests an endpoint needs in both runs before its p95 and error rate are compared
+MIN_SAMPLES = 20
+
+BenchmarkOptions = namedtuple('BenchmarkOptions', [
+    'users', 'iterations', 'warmup', 'manager_share', 'manager_id', 'manager_password', 'seed'])
+
+def default_options(**overrides):
+    """BenchmarkOptions with defaults for a quick run"""
+    options = dict(users=10, iterations=5, warmup=1, manager_share=0.2, manager_id='100000001',
+                   manager_password='pass123', seed=None)
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return BenchmarkOptions(**options)
+
+Response = namedtuple('Response', ['status', 'headers', 'text'])
+
+class AppClient:
+    """Requests through the Flask test client (in-process)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return Response(response.status_code, response.headers, response.get_data(as_text=True))
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class HttpClient:
+    """Requests over HTTP to a running server, with its own cookie jar"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data, doseq=True).encode('utf-8') if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return Response(response.status, response.headers, response.read().decode('utf-8', 'replace'))
+        except urllib.error.HTTPError as e:
+            # Redirects and errors are results too
+            return Response(e.code, e.headers, e.read().decode('utf-8', 'replace'))
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+class Recorder:
+    """Latency, status and query count of every measured request, per endpoint"""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.enabled = False
+
+    def record(self, endpoint, elapsed, response, ok):
+        if not self.enabled:
+            return
+        match = QUERIES_RE.search(response.headers.get('Server-Timing') or '')
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(
+                (elapsed, ok, int(match.group(1)) if match else None))
+
+    def summary(self, wall_time):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+            queries = [count for _, _, count in samples if count is not None]
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'errors': sum(1 for _, ok, _ in samples if not ok),
+                'rps': round(len(samples) / wall_time, 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'max_ms': round(latencies[-1], 2),
+                'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        return endpoints
+
+class VirtualUser:
+    """One simulated customer or manager, with its own session"""
+
+    def __init__(self, number, role, client, recorder, targets, options, run_id):
+        self.number = number
+        self.role = role
+        self.client = client
+        self.recorder = recorder
+        self.targets = targets
+        self.options = options
+        self.rng = random.Random(f"{options.seed}-{number}" if options.seed is not None else None)
+        self.email = f"bench-{run_id}-{number}@benchmark.flytau"
+        self.bookings = {'success': 0, 'conflict': 0, 'failure': 0}
+
+    def call(self, endpoint, method, path, data=None, expect=(200,)):
+        started = time.perf_counter()
+        response = self.client.request(method, path, data)
+        self.recorder.record(endpoint, time.perf_counter() - started, response, response.status in expect)
+        return response
+
+    def login(self):
+        """Sign in before the run (not measured) - customers register a fresh account"""
+        if self.role == 'manager':
+            self.manager_login()
+        else:
+            self.register()
+
+    def journey(self):
+        if self.role == 'manager':
+            self.manager_journey()
+        else:
+            self.customer_journey()
+
+    def register(self):
+        self.client.request('POST', '/register', {
+            'email': self.email, 'first_name': 'Bench', 'last_name': f'User{self.number}',
+            'password': 'bench', 'birth_date': '1990-01-01', 'passport_number': f'B{self.number}'})
+        response = self.client.request('POST', '/login', {'email': self.email, 'password': 'bench'})
+        if response.status != 302:
+            raise RuntimeError(f"Customer login failed for {self.email}")
+
+    def manager_login(self):
+        response = self.client.request('POST', '/manager/login', {
+            'manager_id': self.options.manager_id, 'password': self.options.manager_password})
+        if response.status != 302:
+            raise RuntimeError(f"Manager login failed for {self.options.manager_id}")
+
+    def customer_journey(self):
+        """search -> seat map -> booking -> order details"""
+        flight = self.rng.choice(self.targets)
+        self.call('flights.search', 'POST', '/search', {
+            'origin_airport': flight['from'], 'destination_airport': flight['to'],
+            'departure_date': flight['departure'][:10]})
+
+        page = self.call('flights.seats', 'GET', f"/{flight['id']}/seats")
+        free = [SEAT_VALUE_RE.search(tag).group(1) for tag in SEAT_INPUT_RE.findall(page.text)
+                if ' disabled' not in tag]
+        if not free:
+            return
+        size = min(self.rng.choices(BOOKING_SIZES, BOOKING_SIZE_WEIGHTS)[0], len(free))
+        response = self.call('orders.create', 'POST', '/orders/create', {
+            'flight_id': flight['id'], 'plane_id': flight['plane'], 'seats': self.rng.sample(free, size)},
+            expect=(302,))
+
+        # Success redirects to the order, a taken seat back to the seat map
+        order = ORDER_URL_RE.search(response.headers.get('Location') or '')
+        if not order:
+            self.bookings['conflict' if response.status == 302 else 'failure'] += 1
+            return
+        self.bookings['success'] += 1
+        self.call('orders.details', 'GET', f"/orders/{order.group(1)}")
+
+    def manager_journey(self):
+        """Flight list, a crew page and the reports"""
+        for endpoint, path in MANAGER_PAGES:
+            self.call(endpoint, 'GET', path)
+        flight = self.rng.choice(self.targets)
+        self.call('managers.assign_crew', 'GET', f"/flights/{flight['id']}/crew")
+
+def load_targets(client):
+    """Bookable flights with free seats, from the JSON flight board"""
+    targets, path = [], '/api/v1/flights'
+    for _ in range(TARGET_PAGES):
+        response = client.request('GET', path)
+        if response.status != 200:
+            raise RuntimeError(f"GET {path} returned {response.status}")
+        page = json.loads(response.text)
+        targets.extend(flight for flight in page['flights'] if flight['seats_left'] > 0)
+        if not page.get('next'):
+            break
+        path = '/api/v1/flights?' + urllib.parse.urlencode({'after': page['next']})
+    return targets
+
+def run_benchmark(options, app=None, base_url=None):
+    """Run the load test and return the results (JSON-ready dict)"""
+    make_client = (lambda: HttpClient(base_url)) if base_url else (lambda: AppClient(app))
+    targets = load_targets(make_client())
+    if not targets:
+        raise RuntimeError("No bookable flights - generate data first (flask --app main generate-data)")
+
+    recorder = Recorder()
+    run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    managers = round(options.users * options.manager_share)
+    users = []
+    for number in range(options.users):
+        role = 'manager' if number < managers else 'customer'
+        user = VirtualUser(number, role, make_client(), recorder, targets, options, run_id)
+        user.login()
+        users.append(user)
+
+    for user in users:
+        for _ in range(options.warmup):
+            user.journey()
+
+    errors = []
+    start_barrier = threading.Barrier(len(users))
+
+    def run(user):
+        start_barrier.wait()
+        try:
+            for _ in range(options.iterations):
+                user.journey()
+        except Exception as e:
+            errors.append(f"user {user.number}: {e}")
+
+    threads = [threading.Thread(target=run, args=(user,), daemon=True) for user in users]
+    recorder.enabled = True
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    endpoints = recorder.summary(wall_time)
+    total = sum(stats['requests'] for stats in endpoints.values())
+    bookings = {key: sum(user.bookings[key] for user in users) for key in ('success', 'conflict', 'failure')}
+    return {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'target': base_url or f"in-process ({app.config.get('DB_BACKEND')})",
+        'options': options._asdict(),
+        'customers': options.users - managers,
+        'managers': managers,
+        'seconds': round(wall_time, 2),
+        'requests': total,
+        'rps': round(total / wall_time, 2),
+        'bookings': bookings,
+        'errors': errors,
+        'endpoints': endpoints,
+    }
+
+def compare_results(results, baseline, tolerance=0.2, min_samples=MIN_SAMPLES):
+    """
+    Compare `results` with `baseline` - returns (regressions, insufficient), both
+    lists of messages. The p95 and error rate of an endpoint with fewer than
+    `min_samples` requests in either run are noise, so that endpoint is listed as
+    insufficient instead; queries per request are compared regardless.
+    """
+    regressions = []
+    insufficient = []
+    for endpoint, before in baseline.get('endpoints', {}).items():
+        after = results['endpoints'].get(endpoint)
+        if after is None:
+            continue
+        if (before['queries_per_request'] is not None and after['queries_per_request'] is not None
+                and after['queries_per_request'] > before['queries_per_request'] + 0.5):
+            regressions.append(f"{endpoint}: queries/request {before['queries_per_request']} -> "
+                               f"{after['queries_per_request']}")
+        if min(before['requests'], after['requests']) < min_samples:
+            insufficient.append(f"{endpoint}: {before['requests']} -> {after['requests']} requests "
+                                f"(p95 and errors need {min_samples})")
+            continue
+        if (after['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                and after['p95_ms'] - before['p95_ms'] > MIN_REGRESSION_MS):
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']} -> {after['p95_ms']} ms")
+        if after['errors'] / max(after['requests'], 1) > before['errors'] / max(before['requests'], 1) + 0.01:
+            regressions.append(f"{endpoint}: errors {before['errors']}/{before['requests']} -> "
+                               f"{after['errors']}/{after['requests']}")
+    return regressions, insufficient
@@ -0,0 +1,72 @@
+"""
+In-process caches
+Small thread-safe LRU caches for data that rarely changes (plane layouts etc.).
+Every worker process keeps its own copy, so entries also expire after `ttl`
+seconds to bound how long another worker's invalidation can go unnoticed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_caches = {}
+
+class LRUCache:
+    """Least-recently-used cache with optional per-entry time to live"""
+
+    def __init__(self, name, maxsize=128, ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        _caches[name] = self
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, calling loader() and caching its result on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses}
+
+def cache_stats():
+    """Hit/miss counters of all caches in this process"""
+    return {name: cache.stats() for name, cache in _caches.items()}
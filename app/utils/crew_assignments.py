@@ -0,0 +1,120 @@
+"""
+Crew assignments
+Validates and saves the crew of a flight in a fixed number of statements: one
+query checks every chosen pilot and attendant (exists, long-haul qualified),
+one per role locks their assignments that overlap the flight, one reads the
+current assignments, and only the difference is written - one DELETE and one
+multi-row INSERT per role at most. Re-saving an unchanged crew writes nothing.
+"""
+from database import insert_rows
+
+LONG_HAUL_HOURS = 6
+# Crew per flight: (pilots, flight attendants)
+SHORT_HAUL_CREW = (2, 3)
+LONG_HAUL_CREW = (3, 6)
+
+# role -> (crew table, assignment table, assignment column)
+CREW_ROLES = {
+    'pilot': ('Pilot', 'FlightPilotAssignment', 'pilot_id'),
+    'attendant': ('FlightAttendant', 'FlightAttendantAssignment', 'flight_attendant_id'),
+}
+
+def is_long_haul(flight_duration):
+    return flight_duration > LONG_HAUL_HOURS
+
+def required_crew(flight_duration):
+    """(pilots, flight attendants) a flight of this duration needs"""
+    return LONG_HAUL_CREW if is_long_haul(flight_duration) else SHORT_HAUL_CREW
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+def check_crew(db, crew, long_haul):
+    """
+    Check {role: [id_number, ...]} with one query - returns (role, id_number, problem)
+    for every member that is 'unknown' or 'not_qualified' for a long-haul flight.
+    """
+    parts, params = [], []
+    for role, ids in crew.items():
+        if ids:
+            table = CREW_ROLES[role][0]
+            parts.append(f"SELECT '{role}' AS role, id_number, is_long_haul_qualified "
+                         f"FROM {table} WHERE id_number IN ({_placeholders(ids)})")
+            params.extend(ids)
+    if not parts:
+        return []
+    db.execute(' UNION ALL '.join(parts), tuple(params))
+    qualified = {(row['role'], row['id_number']): row['is_long_haul_qualified'] for row in db.fetchall()}
+
+    problems = []
+    for role, ids in crew.items():
+        for id_number in ids:
+            if (role, id_number) not in qualified:
+                problems.append((role, id_number, 'unknown'))
+            elif long_haul and not qualified[(role, id_number)]:
+                problems.append((role, id_number, 'not_qualified'))
+    return problems
+
+def busy_crew(db, flight_id, start, end, rest, crew):
+    """
+    (role, id_number) of the chosen {role: [id_number, ...]} assigned to another
+    non-canceled flight in [start - rest, end + rest). Locks those assignment
+    rows, so run it in the transaction that saves the crew.
+    """
+    conflicts = []
+    for role, ids in crew.items():
+        if not ids:
+            continue
+        _, assignment_table, column = CREW_ROLES[role]
+        db.execute(f"""
+            SELECT a.{column} AS id_number
+            FROM {assignment_table} a
+            JOIN Flight f ON a.flight_id = f.flight_id
+            JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                              AND f.destination_airport = fl.destination_airport
+            WHERE a.{column} IN ({_placeholders(ids)}) AND a.flight_id <> %s
+              AND f.status <> 'Canceled'
+              AND f.departure_datetime < %s
+              AND TIMESTAMPADD(SECOND, fl.flight_duration * 3600, f.departure_datetime) > %s
+            FOR UPDATE
+        """, (*ids, flight_id, end + rest, start - rest))
+        busy = {row['id_number'] for row in db.fetchall()}
+        conflicts.extend((role, id_number) for id_number in ids if id_number in busy)
+    return conflicts
+
+def current_crew(db, flight_id):
+    """{role: set of id_numbers} assigned to a flight, with one query"""
+    db.execute("""
+        SELECT 'pilot' AS role, pilot_id AS id_number
+        FROM FlightPilotAssignment WHERE flight_id = %s
+        UNION ALL
+        SELECT 'attendant' AS role, flight_attendant_id AS id_number
+        FROM FlightAttendantAssignment WHERE flight_id = %s
+    """, (flight_id, flight_id))
+    crew = {role: set() for role in CREW_ROLES}
+    for row in db.fetchall():
+        crew[row['role']].add(row['id_number'])
+    return crew
+
+def save_crew(db, flight_id, crew):
+    """
+    Make {role: [id_number, ...]} the crew of a flight, writing only what
+    changed. Returns {role: (added, removed)}.
+    """
+    current = current_crew(db, flight_id)
+    changes = {}
+    for role, ids in crew.items():
+        _, assignment_table, column = CREW_ROLES[role]
+        removed = sorted(current[role] - set(ids))
+        added = sorted(set(ids) - current[role])
+        if removed:
+            db.execute(f"DELETE FROM {assignment_table} WHERE flight_id = %s AND {column} IN ({_placeholders(removed)})",
+                       (flight_id, *removed))
+        if added:
+            insert_rows(db, f"{assignment_table} ({column}, flight_id)", [(id_number, flight_id) for id_number in added])
+        changes[role] = (added, removed)
+
+    if any(added or removed for added, removed in changes.values()):
+        # Crew hours report picks the flight up on its next refresh
+        db.execute("UPDATE Flight SET updated_at = CURRENT_TIMESTAMP(6) WHERE flight_id = %s", (flight_id,))
+    return changes
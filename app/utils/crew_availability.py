@@ -0,0 +1,145 @@
+"""
+Crew availability index
+Keeps the assignments of every pilot and attendant in memory as time
+intervals (departure -> departure + flight_duration), one start-sorted list
+per role. "Who is free and qualified for this window, with a rest gap" is a
+binary search for the assignments that could reach into the window plus a
+set difference over the crew - no SQL per candidate.
+
+Built with two queries (crew members, assignments of non-canceled flights
+since CREW_INDEX_HISTORY_DAYS ago), updated in place when a crew is saved and
+rebuilt after flights are canceled or crew members are added.
+"""
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, timedelta
+from config import Config
+from database import execute_query
+from utils.cache import LRUCache
+from utils.crew_assignments import CREW_ROLES, is_long_haul
+
+CrewMember = namedtuple('CrewMember', 'id_number first_name_hebrew last_name_hebrew is_long_haul_qualified')
+Assignment = namedtuple('Assignment', 'start end id_number flight_id')
+
+_indexes = LRUCache('crew_availability', maxsize=1, ttl=Config.CACHE_TTL)
+
+def flight_window(departure_datetime, flight_duration):
+    """(start, end) of a flight"""
+    return departure_datetime, departure_datetime + timedelta(hours=float(flight_duration))
+
+class CrewAvailability:
+    """Crew members and their assignment intervals, per role"""
+
+    def __init__(self, members, assignments, horizon):
+        self.members = {role: [] for role in CREW_ROLES}
+        for member in members:
+            self.members[member['role']].append(
+                CrewMember(member['id_number'], member['first_name_hebrew'], member['last_name_hebrew'],
+                           bool(member['is_long_haul_qualified'])))
+        self.assignments = {role: [] for role in CREW_ROLES}
+        self.longest = timedelta(0)
+        for row in assignments:
+            start, end = flight_window(row['departure_datetime'], row['flight_duration'])
+            self.assignments[row['role']].append(Assignment(start, end, row['id_number'], row['flight_id']))
+            self.longest = max(self.longest, end - start)
+        for intervals in self.assignments.values():
+            intervals.sort()
+        self.starts = {role: [a.start for a in intervals] for role, intervals in self.assignments.items()}
+        # Assignments before this were not loaded
+        self.horizon = horizon
+        self._lock = threading.Lock()
+
+    def busy(self, role, start, end, rest, flight_id=None):
+        """id_numbers with another flight in [start - rest, end + rest)"""
+        if start - rest - self.longest < self.horizon:
+            # Older than the loaded history - availability unknown
+            return set()
+        with self._lock:
+            starts, intervals = self.starts[role], self.assignments[role]
+            # Only assignments starting up to one flight length before the window can reach into it
+            first = bisect_left(starts, start - rest - self.longest)
+            last = bisect_left(starts, end + rest, first)
+            return {a.id_number for a in intervals[first:last]
+                    if a.end + rest > start and a.flight_id != flight_id}
+
+    def eligible(self, role, start, end, long_haul, rest, flight_id=None):
+        """Crew members of a role that are qualified and free for the window"""
+        members = self.members[role]
+        if long_haul:
+            members = [member for member in members if member.is_long_haul_qualified]
+        busy = self.busy(role, start, end, rest, flight_id)
+        return [member for member in members if member.id_number not in busy]
+
+    def update(self, flight_id, start, end, changes):
+        """Apply a saved crew diff - changes is {role: (added, removed)} from save_crew"""
+        with self._lock:
+            self.longest = max(self.longest, end - start)
+            for role, (added, removed) in changes.items():
+                starts, intervals = self.starts[role], self.assignments[role]
+                for id_number in removed:
+                    i = bisect_left(starts, start)
+                    while i < len(intervals) and intervals[i].start == start:
+                        if intervals[i].id_number == id_number and intervals[i].flight_id == flight_id:
+                            del intervals[i]
+                            del starts[i]
+                            break
+                        i += 1
+                for id_number in added:
+                    assignment = Assignment(start, end, id_number, flight_id)
+                    i = bisect_left(intervals, assignment)
+                    intervals.insert(i, assignment)
+                    starts.insert(i, start)
+
+def _load_index():
+    members = execute_query("""
+        SELECT 'pilot' AS role, id_number, first_name_hebrew, last_name_hebrew, is_long_haul_qualified
+        FROM Pilot
+        UNION ALL
+        SELECT 'attendant' AS role, id_number, first_name_hebrew, last_name_hebrew, is_long_haul_qualified
+        FROM FlightAttendant
+        ORDER BY role, first_name_hebrew, last_name_hebrew
+    """, fetch_all=True)
+    horizon = datetime.now() - timedelta(days=Config.CREW_INDEX_HISTORY_DAYS)
+    assignments = execute_query("""
+        SELECT 'pilot' AS role, a.pilot_id AS id_number, f.flight_id, f.departure_datetime, fl.flight_duration
+        FROM FlightPilotAssignment a
+        JOIN Flight f ON a.flight_id = f.flight_id
+        JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                          AND f.destination_airport = fl.destination_airport
+        WHERE f.status <> 'Canceled' AND f.departure_datetime >= %s
+        UNION ALL
+        SELECT 'attendant' AS role, a.flight_attendant_id AS id_number, f.flight_id, f.departure_datetime,
+               fl.flight_duration
+        FROM FlightAttendantAssignment a
+        JOIN Flight f ON a.flight_id = f.flight_id
+        JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                          AND f.destination_airport = fl.destination_airport
+        WHERE f.status <> 'Canceled' AND f.departure_datetime >= %s
+    """, (horizon, horizon), fetch_all=True)
+    return CrewAvailability(members, assignments, horizon)
+
+def get_crew_availability():
+    """The crew availability index of this process (cached)"""
+    return _indexes.get_or_load('index', _load_index)
+
+def update_crew_availability(flight_id, departure_datetime, flight_duration, changes):
+    """Record a saved crew in the cached index (if loaded) - the next load reads it from the database anyway"""
+    index = _indexes.get('index')
+    if index is not None:
+        index.update(flight_id, *flight_window(departure_datetime, flight_duration), changes)
+
+def invalidate_crew_availability():
+    """Rebuild the index on next use - call after flights are canceled or crew members added"""
+    _indexes.invalidate('index')
+
+def eligible_crew(flight):
+    """
+    {role: [CrewMember]} free and qualified for a flight (a row with flight_id,
+    departure_datetime and flight_duration), keeping CREW_REST_HOURS between flights.
+    """
+    start, end = flight_window(flight['departure_datetime'], flight['flight_duration'])
+    rest = timedelta(hours=Config.CREW_REST_HOURS)
+    index = get_crew_availability()
+    long_haul = is_long_haul(flight['flight_duration'])
+    return {role: index.eligible(role, start, end, long_haul, rest, flight['flight_id']) for role in CREW_ROLES}
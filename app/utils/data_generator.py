@@ -0,0 +1,476 @@
+"""
+Synthetic data generator
+Fills the database with a production-sized, schema-consistent data set:
+a fleet with full seat maps, a network of flight lines, months of flights
+flown by each plane in sequence (never overlapping, always leaving from where
+it landed), crew assigned with a rest gap between flights, and orders/tickets
+at a given load factor. Rows are loaded with multi-row INSERTs, or with
+LOAD DATA LOCAL INFILE for the largest volumes.
+
+Generated rows get ids after the existing ones, so it can run on top of the
+seed data. Run `flask --app main refresh-reports --full` afterwards.
+"""
+import heapq
+import os
+import random
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from database import get_db_connection
+from utils.seat_layouts import generate_seat_numbers
+from utils.crew_assignments import LONG_HAUL_HOURS, SHORT_HAUL_CREW, LONG_HAUL_CREW
+
+# Columns per table, in the order the tables are loaded (parents first)
+TABLE_COLUMNS = {
+    'Pilot': ('id_number', 'first_name_hebrew', 'last_name_hebrew', 'start_date', 'phone_number',
+              'city', 'street', 'house_number', 'is_long_haul_qualified'),
+    'FlightAttendant': ('id_number', 'first_name_hebrew', 'last_name_hebrew', 'start_date', 'phone_number',
+                        'city', 'street', 'house_number', 'is_long_haul_qualified'),
+    'FlightLine': ('origin_airport', 'destination_airport', 'flight_duration'),
+    'Plane': ('plane_id', 'manufacturer', 'size_category', 'acquisition_date'),
+    'PlaneClass': ('plane_id', 'class_type', 'rows_count', 'cols_count'),
+    'Seat': ('plane_id', 'class_type', 'seat_number'),
+    'Customer': ('email', 'first_name_english', 'last_name_english'),
+    'CustomerPhone': ('email', 'phone_number'),
+    'RegisteredCustomer': ('email', 'registration_date', 'birth_date', 'passport_number',
+                           'account_password', 'balance'),
+    'Flight': ('flight_id', 'origin_airport', 'destination_airport', 'plane_id', 'departure_datetime',
+               'manager_id', 'status', 'price_economy', 'price_business', 'seats_total', 'seats_booked'),
+    'FlightOrder': ('order_id', 'customer_email', 'flight_id', 'order_date', 'order_status', 'total_payment'),
+    'Ticket': ('flight_id', 'order_id', 'plane_id', 'class_type', 'seat_number', 'price'),
+    'FlightPilotAssignment': ('pilot_id', 'flight_id'),
+    'FlightAttendantAssignment': ('flight_attendant_id', 'flight_id'),
+}
+
+AIRPORTS = ('TLV', 'ETM', 'JFK', 'LHR', 'CDG', 'FRA', 'AMS', 'FCO', 'MAD', 'BCN', 'ATH', 'IST',
+            'VIE', 'ZRH', 'MUC', 'PRG', 'BUD', 'WAW', 'LCA', 'DXB', 'BKK', 'HKT', 'DEL', 'BOM',
+            'NRT', 'ICN', 'PEK', 'SIN', 'SYD', 'LAX', 'SFO', 'ORD', 'MIA', 'YYZ', 'EWR', 'BOS',
+            'LIS', 'CPH', 'ARN', 'OSL', 'DUB', 'BRU', 'MXP', 'NCE', 'SOF', 'OTP', 'KBP', 'TBS',
+            'CAI', 'ADD', 'JNB', 'GRU', 'EZE', 'MEX', 'AUH', 'DOH', 'HND', 'MNL', 'KUL', 'MEL')
+
+MANUFACTURERS = ('Boeing', 'Airbus', 'Dassault')
+HEBREW_FIRST = ('דני', 'רון', 'יעל', 'נועה', 'עומר', 'שירה', 'מיכל', 'אור', 'תמר', 'איתי', 'גל', 'עדי')
+HEBREW_LAST = ('כהן', 'לוי', 'מזרחי', 'פרץ', 'ביטון', 'דהן', 'אברהם', 'פרידמן', 'שפירא', 'גולן')
+ENGLISH_FIRST = ('Alice', 'Bob', 'Charlie', 'Dana', 'Eli', 'Fiona', 'Guy', 'Hila', 'Ido', 'Lior', 'Maya', 'Noam')
+ENGLISH_LAST = ('Cohen', 'Levi', 'Smith', 'Brown', 'Miller', 'Davis', 'Katz', 'Shapiro', 'Golan', 'Weiss')
+CITIES = ('Tel Aviv', 'Haifa', 'Jerusalem', 'Beer Sheva', 'Eilat', 'Netanya', 'Rishon LeZion')
+
+# Tickets per order, and how common each order size is
+ORDER_SIZES = (1, 2, 3, 4)
+ORDER_SIZE_WEIGHTS = (50, 30, 12, 8)
+BOOKING_HORIZON_DAYS = 120
+CUSTOMER_DOMAIN = 'synthetic.flytau'
+
+GeneratorOptions = namedtuple('GeneratorOptions', [
+    'planes', 'routes', 'months', 'past_months', 'load_factor', 'customers', 'pilots', 'attendants',
+    'cancel_rate', 'client_cancel_rate', 'rest_hours', 'seed'])
+
+def default_options(**overrides):
+    """GeneratorOptions with defaults for a mid-sized airline"""
+    options = dict(planes=50, routes=40, months=12, past_months=6, load_factor=0.8, customers=20000,
+                   pilots=None, attendants=None, cancel_rate=0.01, client_cancel_rate=0.03,
+                   rest_hours=12, seed=None)
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    # Enough crew for every plane to fly about twice a day
+    options['pilots'] = options['pilots'] or options['planes'] * 8
+    options['attendants'] = options['attendants'] or options['planes'] * 16
+    return GeneratorOptions(**options)
+
+def sql_value(value):
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+class InsertLoader:
+    """Buffers rows per table and writes them with multi-row INSERTs of `batch_size` rows"""
+
+    def __init__(self, connection, batch_size=1000):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLE_COLUMNS}
+        self.counts = dict.fromkeys(TABLE_COLUMNS, 0)
+
+    def add(self, table, row):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            # Parents of the buffered rows go first
+            self.flush()
+
+    def flush(self):
+        for table, rows in self.buffers.items():
+            if not rows:
+                continue
+            columns = TABLE_COLUMNS[table]
+            row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+            self.cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_placeholder] * len(rows))}",
+                tuple(value for row in rows for value in row))
+            self.counts[table] += len(rows)
+            rows.clear()
+        self.connection.commit()
+
+    def finish(self):
+        self.flush()
+
+class InfileLoader(InsertLoader):
+    """Writes rows to one tab separated file per table and loads them with LOAD DATA LOCAL INFILE"""
+
+    def __init__(self, connection, batch_size=1000):
+        super().__init__(connection, batch_size)
+        self.directory = tempfile.mkdtemp(prefix='flytau-data-')
+        self.files = {table: open(os.path.join(self.directory, f'{table}.tsv'), 'w', encoding='utf-8')
+                      for table in TABLE_COLUMNS}
+
+    def add(self, table, row):
+        self.files[table].write('\t'.join(sql_value(value) for value in row) + '\n')
+        self.counts[table] += 1
+
+    def finish(self):
+        for table, f in self.files.items():
+            f.close()
+            if self.counts[table]:
+                self.cursor.execute(f"""
+                    LOAD DATA LOCAL INFILE '{f.name}' INTO TABLE {table}
+                    CHARACTER SET utf8mb4
+                    FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'
+                    ({', '.join(TABLE_COLUMNS[table])})
+                """)
+                self.connection.commit()
+            os.remove(f.name)
+        os.rmdir(self.directory)
+
+class DataGenerator:
+    """Generates the rows and hands them to a loader"""
+
+    def __init__(self, connection, loader, options, now=None):
+        self.connection = connection
+        self.loader = loader
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.now = (now or datetime.now()).replace(second=0, microsecond=0)
+        self.cursor = connection.cursor()
+
+    def scalar(self, query, params=()):
+        self.cursor.execute(query, params)
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def next_number(self, table, column, prefix):
+        """Next free 9 digit id starting with `prefix`"""
+        last = self.scalar(f"SELECT MAX({column}) FROM {table} WHERE {column} LIKE %s AND LENGTH({column}) = 9",
+                           (prefix + '%',))
+        return int(last) + 1 if last else int(prefix + '0' * 8)
+
+    # --- Static data ---------------------------------------------------------
+
+    def person(self):
+        pick = self.random.choice
+        return (pick(HEBREW_FIRST), pick(HEBREW_LAST),
+                (self.now - timedelta(days=self.random.randint(200, 5000))).date(),
+                f"05{self.random.randint(0, 9)}-{self.random.randint(1000000, 9999999)}",
+                pick(CITIES), 'Herzl', str(self.random.randint(1, 120)))
+
+    def generate_crew(self, table, prefix, count):
+        """Crew members, half of them long-haul qualified. Returns (qualified ids, other ids)"""
+        first = self.next_number(table, 'id_number', prefix)
+        qualified, other = [], []
+        for number in range(first, first + count):
+            id_number = str(number)
+            is_qualified = self.random.random() < 0.5
+            self.loader.add(table, (id_number,) + self.person() + (is_qualified,))
+            (qualified if is_qualified else other).append(id_number)
+        return qualified, other
+
+    def generate_lines(self):
+        """Flight lines in both directions, connected through a spanning tree. {origin: [(destination, hours)]}"""
+        airports = list(AIRPORTS[:min(len(AIRPORTS), self.options.routes + 1)])
+        pairs = set()
+        for i in range(1, len(airports)):
+            pairs.add(frozenset((airports[i], self.random.choice(airports[:i]))))
+        attempts = 0
+        while len(pairs) < self.options.routes and attempts < self.options.routes * 20:
+            pairs.add(frozenset(self.random.sample(airports, 2)))
+            attempts += 1
+
+        self.cursor.execute("SELECT origin_airport, destination_airport, flight_duration FROM FlightLine")
+        existing = {(origin, destination): duration for origin, destination, duration in self.cursor.fetchall()}
+
+        lines = {}
+        for pair in pairs:
+            a, b = sorted(pair)
+            hours = round(self.random.uniform(1, 14) * 4) / 4
+            # The way back takes a little longer or shorter, but stays on the same side of long-haul
+            back = min(max(hours + self.random.choice((-0.5, -0.25, 0, 0.25, 0.5)), 1), 14)
+            if (hours > LONG_HAUL_HOURS) != (back > LONG_HAUL_HOURS):
+                back = hours
+            for origin, destination, duration in ((a, b, hours), (b, a, back)):
+                if (origin, destination) in existing:
+                    duration = existing[(origin, destination)]
+                else:
+                    self.loader.add('FlightLine', (origin, destination, Decimal(str(duration))))
+                lines.setdefault(origin, []).append((destination, float(duration)))
+        return lines
+
+    def generate_planes(self):
+        """Planes with their classes and seats. Returns [(plane_id, size, {class_type: [seat numbers]})]"""
+        first = (self.scalar("SELECT MAX(plane_id) FROM Plane") or 0) + 1
+        planes = []
+        for plane_id in range(first, first + self.options.planes):
+            size = 'Large' if self.random.random() < 0.6 else 'Small'
+            self.loader.add('Plane', (plane_id, self.random.choice(MANUFACTURERS), size,
+                                      (self.now - timedelta(days=self.random.randint(100, 7000))).date()))
+            if size == 'Large':
+                layout = {'Business': (self.random.randint(4, 6), 4), 'Economy': (self.random.randint(26, 32), 6)}
+            else:
+                layout = {'Economy': (self.random.randint(16, 20), 4)}
+            seats = {}
+            for class_type, (rows_count, cols_count) in layout.items():
+                self.loader.add('PlaneClass', (plane_id, class_type, rows_count, cols_count))
+                seats[class_type] = generate_seat_numbers(rows_count, cols_count)
+                for seat_number in seats[class_type]:
+                    self.loader.add('Seat', (plane_id, class_type, seat_number))
+            planes.append((plane_id, size, seats))
+        return planes
+
+    def generate_customers(self):
+        """Customers (30% registered). Returns (emails, set of registered emails)"""
+        first = self.scalar("SELECT COUNT(*) FROM Customer WHERE email LIKE %s", ('%@' + CUSTOMER_DOMAIN,)) or 0
+        emails, registered = [], set()
+        for number in range(first + 1, first + self.options.customers + 1):
+            email = f"customer{number}@{CUSTOMER_DOMAIN}"
+            self.loader.add('Customer', (email, self.random.choice(ENGLISH_FIRST), self.random.choice(ENGLISH_LAST)))
+            self.loader.add('CustomerPhone', (email, f"05{self.random.randint(0, 9)}-{self.random.randint(1000000, 9999999)}"))
+            if self.random.random() < 0.3:
+                registration = (self.now - timedelta(days=self.random.randint(1, 1500))).date()
+                birth = (self.now - timedelta(days=self.random.randint(18 * 365, 80 * 365))).date()
+                self.loader.add('RegisteredCustomer', (email, registration, birth, f"P{number}", 'pass123', 0))
+                registered.add(email)
+            emails.append(email)
+        return emails, registered
+
+    # --- Schedule --------------------------------------------------------------
+
+    def generate_schedule(self, planes, lines):
+        """
+        Every plane flies a chain of flights from a random base: each leaves from
+        where the previous one landed, after 2-10 hours on the ground. Small planes
+        only fly short-haul. Returns [(departure, origin, destination, hours, plane)]
+        sorted by departure.
+        """
+        start = self.now - timedelta(days=round(self.options.past_months * 30.4))
+        end = start + timedelta(days=round(self.options.months * 30.4))
+        short_haul = {origin: [line for line in routes if line[1] <= LONG_HAUL_HOURS]
+                      for origin, routes in lines.items()}
+        short_bases = [origin for origin, routes in short_haul.items() if routes]
+
+        schedule = []
+        for plane in planes:
+            size = plane[1]
+            routes_from = lines if size == 'Large' else short_haul
+            if not (short_bases if size == 'Small' else lines):
+                continue
+            airport = self.random.choice(short_bases if size == 'Small' else list(lines))
+            departure = start + timedelta(minutes=self.random.randrange(0, 24 * 60, 5))
+            while departure < end and routes_from.get(airport):
+                destination, hours = self.random.choice(routes_from[airport])
+                schedule.append((departure, airport, destination, hours, plane))
+                landing = departure + timedelta(hours=hours)
+                ground = timedelta(minutes=self.random.randrange(120, 600, 5))
+                departure = landing + ground
+                departure -= timedelta(minutes=departure.minute % 5)
+                airport = destination
+        schedule.sort(key=lambda flight: flight[0])
+        return schedule
+
+    def sold_fraction(self, departure):
+        """Share of the seats sold by now - full load factor once the booking window is over"""
+        load = min(max(self.random.gauss(self.options.load_factor, 0.08), 0), 1)
+        days_ahead = (departure - self.now).total_seconds() / 86400
+        if days_ahead <= 0:
+            return load
+        return load * min(max(1 - days_ahead / BOOKING_HORIZON_DAYS, 0.05), 1)
+
+    def order_date(self, departure):
+        latest = min(departure - timedelta(hours=1), self.now)
+        earliest = departure - timedelta(days=BOOKING_HORIZON_DAYS)
+        if latest <= earliest:
+            return latest
+        seconds = (latest - earliest).total_seconds()
+        return (earliest + timedelta(seconds=self.random.uniform(0, seconds))).replace(microsecond=0)
+
+    # --- Flights, orders, tickets, crew ---------------------------------------
+
+    def generate(self):
+        """Generate and load everything. Returns the row counts per table"""
+        started = time.monotonic()
+        managers = [row[0] for row in self.query_all("SELECT id_number FROM Manager")]
+        if not managers:
+            raise ValueError("No managers in the database - load db/seed.sql first")
+
+        pilots = self.generate_crew('Pilot', '7', self.options.pilots)
+        attendants = self.generate_crew('FlightAttendant', '8', self.options.attendants)
+        lines = self.generate_lines()
+        planes = self.generate_planes()
+        emails, registered = self.generate_customers()
+        schedule = self.generate_schedule(planes, lines)
+
+        flight_id = (self.scalar("SELECT MAX(flight_id) FROM Flight") or 0) + 1
+        order_id = (self.scalar("SELECT MAX(order_id) FROM FlightOrder") or 0) + 1
+        first_order_id = order_id
+        crew = CrewRoster(pilots, attendants, timedelta(hours=self.options.rest_hours))
+        refunds = {}
+
+        for departure, origin, destination, hours, (plane_id, size, seats) in schedule:
+            long_haul = hours > LONG_HAUL_HOURS
+            canceled = self.random.random() < self.options.cancel_rate
+            landed = departure < self.now
+
+            price_economy = Decimal(round(120 + hours * self.random.uniform(60, 90)))
+            price_business = price_economy * 3 if 'Business' in seats else None
+            prices = {'Economy': price_economy, 'Business': price_business}
+            seats_total = sum(len(numbers) for numbers in seats.values())
+
+            orders = []
+            # Classes number their rows from 1, but a seat number is sold once per flight (Ticket UNIQUE)
+            sold_numbers = set()
+            for class_type, numbers in seats.items():
+                sold = round(len(numbers) * self.sold_fraction(departure) * (0.8 if class_type == 'Business' else 1))
+                free = [number for number in numbers if number not in sold_numbers]
+                taken = self.random.sample(free, min(sold, len(free)))
+                sold_numbers.update(taken)
+                while taken:
+                    size_of_order = min(self.random.choices(ORDER_SIZES, ORDER_SIZE_WEIGHTS)[0], len(taken))
+                    orders.append((class_type, taken[:size_of_order]))
+                    taken = taken[size_of_order:]
+
+            seats_booked = 0
+            flight_orders = []
+            for class_type, order_seats in orders:
+                email = self.random.choice(emails)
+                total = prices[class_type] * len(order_seats)
+                if canceled:
+                    status, payment = 'Canceled_By_Company', Decimal('0.00')
+                    refunds[email] = refunds.get(email, 0) + total
+                elif self.random.random() < self.options.client_cancel_rate:
+                    status, payment = 'Canceled_By_Client', (total * Decimal('0.05')).quantize(Decimal('0.01'))
+                    refunds[email] = refunds.get(email, 0) + total - payment
+                else:
+                    status, payment = ('Completed' if landed else 'Active'), total
+                    seats_booked += len(order_seats)
+                flight_orders.append((order_id, email, self.order_date(departure), status, payment,
+                                      class_type, order_seats))
+                order_id += 1
+
+            if canceled:
+                status = 'Canceled'
+            elif landed:
+                status = 'Landed'
+            else:
+                status = 'Full' if seats_booked >= seats_total else 'Active'
+            self.loader.add('Flight', (flight_id, origin, destination, plane_id, departure,
+                                       self.random.choice(managers), status, price_economy, price_business,
+                                       seats_total, seats_booked))
+
+            for number, email, ordered_at, order_status, payment, class_type, order_seats in flight_orders:
+                self.loader.add('FlightOrder', (number, email, flight_id, ordered_at, order_status, payment))
+                for seat_number in order_seats:
+                    self.loader.add('Ticket', (flight_id, number, plane_id, class_type, seat_number,
+                                               prices[class_type]))
+
+            if not canceled:
+                crew_size = LONG_HAUL_CREW if long_haul else SHORT_HAUL_CREW
+                assigned = crew.assign(departure, departure + timedelta(hours=hours), long_haul, crew_size)
+                if assigned:
+                    for pilot_id in assigned[0]:
+                        self.loader.add('FlightPilotAssignment', (pilot_id, flight_id))
+                    for attendant_id in assigned[1]:
+                        self.loader.add('FlightAttendantAssignment', (attendant_id, flight_id))
+            flight_id += 1
+
+        self.loader.finish()
+        self.finish(first_order_id, {email: amount for email, amount in refunds.items() if email in registered})
+
+        counts = dict(self.loader.counts)
+        counts['crew_unassigned_flights'] = crew.unassigned
+        counts['seconds'] = round(time.monotonic() - started, 1)
+        return counts
+
+    def query_all(self, query, params=()):
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+
+    def finish(self, first_order_id, refunds):
+        """Per-customer order numbers and refund balances of the generated orders"""
+        self.cursor.execute("""
+            UPDATE FlightOrder fo
+            JOIN (
+                SELECT order_id,
+                       ROW_NUMBER() OVER (PARTITION BY customer_email ORDER BY order_date, order_id) AS order_number
+                FROM FlightOrder
+                WHERE order_id >= %s
+            ) numbered ON fo.order_id = numbered.order_id
+            SET fo.customer_order_number = numbered.order_number
+        """, (first_order_id,))
+        if refunds:
+            self.cursor.executemany("UPDATE RegisteredCustomer SET balance = balance + %s WHERE email = %s",
+                                    [(amount, email) for email, amount in refunds.items()])
+        self.connection.commit()
+
+class CrewRoster:
+    """
+    Free crew members by the time they are available again (a heap per role and
+    qualification). Flights must be assigned in departure order.
+    """
+
+    def __init__(self, pilots, attendants, rest):
+        self.rest = rest
+        self.unassigned = 0
+        # [role][qualified] -> heap of (available_at, id_number)
+        self.heaps = [[[(datetime.min, member) for member in group] for group in (role[1], role[0])]
+                      for role in (pilots, attendants)]
+        for role in self.heaps:
+            for heap in role:
+                heapq.heapify(heap)
+
+    def take(self, role, count, departure, long_haul):
+        heaps = self.heaps[role]
+        # Short-haul flights use unqualified crew first and keep qualified crew for long-haul
+        sources = (heaps[1],) if long_haul else (heaps[0], heaps[1])
+        taken = []
+        for heap in sources:
+            while len(taken) < count and heap and heap[0][0] <= departure:
+                taken.append((heap, heapq.heappop(heap)))
+        return taken
+
+    def assign(self, departure, arrival, long_haul, crew_size):
+        """(pilot ids, attendant ids) free at `departure` - None if not enough crew is free"""
+        pilots = self.take(0, crew_size[0], departure, long_haul)
+        attendants = self.take(1, crew_size[1], departure, long_haul)
+        if len(pilots) < crew_size[0] or len(attendants) < crew_size[1]:
+            # Put them back unchanged - the flight stays without crew
+            for heap, entry in pilots + attendants:
+                heapq.heappush(heap, entry)
+            self.unassigned += 1
+            return None
+        available_at = arrival + self.rest
+        for heap, (_, member) in pilots + attendants:
+            heapq.heappush(heap, (available_at, member))
+        return [member for _, (_, member) in pilots], [member for _, (_, member) in attendants]
+
+def generate_data(options, use_infile=False, batch_size=1000):
+    """Generate a data set with `options` into the configured database"""
+    connection = get_db_connection(allow_local_infile=True) if use_infile else get_db_connection()
+    try:
+        cursor = connection.cursor()
+        # The generator writes parents before children and never duplicates keys
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        loader = (InfileLoader if use_infile else InsertLoader)(connection, batch_size)
+        return DataGenerator(connection, loader, options).generate()
+    finally:
+        connection.close()
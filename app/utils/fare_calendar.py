@@ -0,0 +1,69 @@
+"""
+Fare calendar
+Cheapest economy/business fare and seats left per day on a route, for the
+days around the searched date. One grouped query per route and window (on
+idx_flight_route_departure), cached for a short time so neighbouring
+searches on the same route share it.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from config import Config
+from database import execute_query
+from utils.cache import LRUCache
+
+FareDay = namedtuple('FareDay', 'day flights min_economy min_business seats_left')
+
+_calendars = LRUCache('fare_calendar', maxsize=Config.FARE_CALENDAR_CACHE_SIZE, ttl=Config.FARE_CALENDAR_TTL)
+
+# Params: origin, destination, first day, day after the last day
+FARE_CALENDAR_QUERY = """
+    SELECT DATE(f.departure_datetime) AS flight_day,
+           COUNT(*) AS flights,
+           MIN(CASE WHEN f.status = 'Active' THEN f.price_economy END) AS min_economy,
+           MIN(CASE WHEN f.status = 'Active' THEN f.price_business END) AS min_business,
+           SUM(CASE WHEN f.status = 'Active' THEN f.seats_total - f.seats_booked ELSE 0 END) AS seats_left
+    FROM Flight f
+    WHERE f.origin_airport = %s AND f.destination_airport = %s
+      AND f.departure_datetime >= %s AND f.departure_datetime < %s
+      AND f.departure_datetime > NOW()
+      AND f.status IN ('Active', 'Full')
+    GROUP BY DATE(f.departure_datetime)
+"""
+
+def _load_calendar(origin, destination, first_day, last_day):
+    rows = execute_query(FARE_CALENDAR_QUERY, (origin, destination, first_day, last_day + timedelta(days=1)),
+                         fetch_all=True) or []
+    by_day = {row['flight_day']: row for row in rows}
+
+    days = []
+    day = first_day
+    while day <= last_day:
+        row = by_day.get(day.date())
+        if row:
+            days.append(FareDay(day, row['flights'], row['min_economy'], row['min_business'],
+                                int(row['seats_left'] or 0)))
+        else:
+            days.append(FareDay(day, 0, None, None, 0))
+        day += timedelta(days=1)
+    return days
+
+def fare_calendar(origin, destination, day=None, days=None):
+    """
+    FareDay rows for `day` +/- `days` (today onwards). `day` is a datetime at
+    midnight; without one the calendar starts today.
+    """
+    days = Config.FARE_CALENDAR_DAYS if days is None else days
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if day:
+        first_day, last_day = max(day - timedelta(days=days), today), day + timedelta(days=days)
+    else:
+        first_day, last_day = today, today + timedelta(days=2 * days)
+    if last_day < first_day:
+        return []
+
+    key = (origin, destination, first_day, last_day)
+    return _calendars.get_or_load(key, lambda: _load_calendar(origin, destination, first_day, last_day))
+
+def invalidate_fare_calendars():
+    """Drop all cached calendars - call after flights are created or canceled"""
+    _calendars.clear()
@@ -0,0 +1,124 @@
+"""
+Flight cancellation by the company
+Canceling a flight refunds every active order in full. The refunds are one
+set-based UPDATE ... JOIN over the orders summed per customer (a single
+statement however many orders the flight has), then the orders are closed
+with one UPDATE. Bulk cancellations - all flights of a grounded plane, or of
+a route in a date window - run in batches of flights, each batch in its own
+short transaction.
+"""
+from datetime import datetime, timedelta
+from mysql.connector import Error
+from database import db_transaction, execute_query
+from utils.seat_inventory import invalidate_seat_inventory
+from utils.route_graph import invalidate_route_graph
+from utils.fare_calendar import invalidate_fare_calendars
+from utils.crew_availability import invalidate_crew_availability
+
+# Flights can only be canceled this long before departure
+CANCEL_NOTICE = timedelta(hours=72)
+
+def cancel_flights(db, flight_ids):
+    """Cancel flights and refund their active orders, in the caller's transaction - returns orders canceled"""
+    placeholders = ', '.join(['%s'] * len(flight_ids))
+    params = tuple(flight_ids)
+    db.execute(f"""
+        UPDATE Flight SET status = 'Canceled', seats_booked = 0
+        WHERE flight_id IN ({placeholders})
+    """, params)
+
+    # Full refund to registered customers - guests have no balance
+    db.execute(f"""
+        UPDATE RegisteredCustomer rc
+        JOIN (
+            SELECT customer_email, SUM(total_payment) AS refund
+            FROM FlightOrder
+            WHERE flight_id IN ({placeholders}) AND order_status = 'Active'
+            GROUP BY customer_email
+        ) refunds ON refunds.customer_email = rc.email
+        SET rc.balance = rc.balance + refunds.refund
+    """, params)
+
+    db.execute(f"""
+        UPDATE FlightOrder
+        SET order_status = 'Canceled_By_Company', total_payment = 0
+        WHERE flight_id IN ({placeholders}) AND order_status = 'Active'
+    """, params)
+    return db.rowcount
+
+def invalidate_flight_caches(flight_ids):
+    """Drop the cached seat maps, route graph, fare calendars and crew availability of canceled flights"""
+    for flight_id in flight_ids:
+        invalidate_seat_inventory(flight_id)
+    invalidate_route_graph()
+    invalidate_fare_calendars()
+    invalidate_crew_availability()
+
+def find_cancelable_flights(plane_id=None, origin=None, destination=None, date_from=None, date_to=None):
+    """
+    Active/Full flights of a plane or a route (optionally within a date window).
+    Returns (flights that can be canceled, count of those departing too soon).
+    """
+    conditions = ["status IN ('Active', 'Full')", "departure_datetime > NOW()"]
+    params = []
+    if plane_id:
+        conditions.append("plane_id = %s")
+        params.append(plane_id)
+    if origin:
+        conditions.append("origin_airport = %s")
+        params.append(origin)
+    if destination:
+        conditions.append("destination_airport = %s")
+        params.append(destination)
+    if date_from:
+        conditions.append("departure_datetime >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("departure_datetime < %s")
+        params.append(date_to + timedelta(days=1))
+
+    flights = execute_query(f"""
+        SELECT flight_id, origin_airport, destination_airport, plane_id, departure_datetime,
+               status, seats_booked
+        FROM Flight
+        WHERE {' AND '.join(conditions)}
+        ORDER BY departure_datetime
+    """, tuple(params), fetch_all=True)
+    cutoff = datetime.now() + CANCEL_NOTICE
+    cancelable = [flight for flight in flights if flight['departure_datetime'] >= cutoff]
+    return cancelable, len(flights) - len(cancelable)
+
+def cancel_flights_in_batches(flight_ids, batch_size=50):
+    """
+    Cancel many flights, `batch_size` per transaction. Flights that stopped
+    being cancelable meanwhile are skipped. A failing batch stops the run;
+    the batches before it stay committed.
+    """
+    result = {'flights': 0, 'orders': 0, 'skipped': 0, 'error': None}
+    canceled = []
+    try:
+        for start in range(0, len(flight_ids), batch_size):
+            batch = flight_ids[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            with db_transaction(commit=True) as db:
+                # Lock the flights - a booking's seat count UPDATE (orders.create) waits for this
+                # transaction and then finds the flight Canceled, so no order lands unrefunded
+                db.execute(f"""
+                    SELECT flight_id FROM Flight
+                    WHERE flight_id IN ({placeholders})
+                      AND status IN ('Active', 'Full')
+                      AND departure_datetime >= %s
+                    FOR UPDATE
+                """, tuple(batch) + (datetime.now() + CANCEL_NOTICE,))
+                locked = [row['flight_id'] for row in db.fetchall()]
+                orders = cancel_flights(db, locked) if locked else 0
+            canceled.extend(locked)
+            result['orders'] += orders
+            result['flights'] += len(locked)
+            result['skipped'] += len(batch) - len(locked)
+    except Error as e:
+        result['error'] = str(e)
+    finally:
+        if canceled:
+            invalidate_flight_caches(canceled)
+    return result
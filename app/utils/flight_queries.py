@@ -0,0 +1,74 @@
+"""
+Shared flight queries
+The search and flight board queries used by both the HTML pages and the
+JSON API, plus the change version of a flight set: the latest
+Flight.updated_at (bumped by every booking, cancellation and status change)
+and the row count, which is all a conditional GET needs to compare.
+"""
+from datetime import timedelta
+from database import execute_query
+from utils.flight_status import EFFECTIVE_FLIGHT_STATUS_SQL
+
+FLIGHT_LIST_SELECT = """
+    SELECT f.flight_id, f.origin_airport, f.destination_airport,
+           f.departure_datetime, f.status, f.plane_id,
+           f.price_economy, f.price_business, f.seats_total, f.seats_booked,
+           p.manufacturer, p.size_category,
+           fl.flight_duration
+    FROM Flight f
+    JOIN Plane p ON f.plane_id = p.plane_id
+    JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                      AND f.destination_airport = fl.destination_airport
+"""
+
+# Manager flight list - every flight, with its effective status
+MANAGER_FLIGHT_SELECT = f"""
+    SELECT f.*, p.manufacturer, p.size_category,
+           m.first_name_hebrew, m.last_name_hebrew,
+           fl.flight_duration,
+           {EFFECTIVE_FLIGHT_STATUS_SQL} AS effective_status
+    FROM Flight f
+    JOIN Plane p ON f.plane_id = p.plane_id
+    JOIN Manager m ON f.manager_id = m.id_number
+    JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                      AND f.destination_airport = fl.destination_airport
+"""
+
+# Flights customers can book
+BOOKABLE_CONDITIONS = ["f.status = 'Active'", "f.departure_datetime > NOW()"]
+
+def search_conditions(origin=None, destination=None, day=None):
+    """WHERE conditions and params of a flight search - `day` is a datetime at midnight"""
+    conditions = list(BOOKABLE_CONDITIONS)
+    params = []
+    if origin:
+        conditions.append("f.origin_airport = %s")
+        params.append(origin)
+    if destination:
+        conditions.append("f.destination_airport = %s")
+        params.append(destination)
+    # Half-open range on the raw column so the departure_datetime indexes can be used
+    if day:
+        conditions.append("f.departure_datetime >= %s AND f.departure_datetime < %s")
+        params.extend([day, day + timedelta(days=1)])
+    return conditions, params
+
+def search_query(origin=None, destination=None, day=None):
+    """(query, params) of a flight search"""
+    conditions, params = search_conditions(origin, destination, day)
+    query = FLIGHT_LIST_SELECT + " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY f.departure_datetime ASC"
+    return query, params
+
+def search_flights(origin=None, destination=None, day=None):
+    """Bookable flights matching the search, earliest first"""
+    query, params = search_query(origin, destination, day)
+    return execute_query(query, tuple(params) if params else None, fetch_all=True)
+
+def flights_version(conditions, params):
+    """(latest updated_at, row count) of the flights matching `conditions`"""
+    query = "SELECT MAX(f.updated_at) AS last_modified, COUNT(*) AS flights FROM Flight f"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    row = execute_query(query, tuple(params) if params else None, fetch_one=True)
+    return (row['last_modified'], row['flights']) if row else (None, 0)
@@ -0,0 +1,135 @@
+"""
+Flight status engine
+Moves departed flights to 'Landed' and their orders to 'Completed' in the
+background, so read pages never have to write. Also clears expired seat holds.
+
+Until the engine has processed a flight, read paths derive the
+"effective" status from departure_datetime using the helpers below.
+"""
+import threading
+import time
+from datetime import datetime
+from database import db_transaction
+from utils.seat_holds import purge_expired_holds
+
+# SQL fragments for filtering on the effective status (expects aliases f / fo)
+EFFECTIVE_FLIGHT_STATUS_SQL = """
+    CASE WHEN f.status IN ('Active', 'Full') AND f.departure_datetime < NOW()
+         THEN 'Landed' ELSE f.status END
+"""
+
+EFFECTIVE_ORDER_STATUS_SQL = """
+    CASE WHEN fo.order_status = 'Active'
+              AND (f.status = 'Landed'
+                   OR (f.status IN ('Active', 'Full') AND f.departure_datetime < NOW()))
+         THEN 'Completed' ELSE fo.order_status END
+"""
+
+def effective_flight_status(status, departure_datetime, now=None):
+    """Flight status as the status engine will eventually store it"""
+    now = now or datetime.now()
+    if status in ('Active', 'Full') and departure_datetime < now:
+        return 'Landed'
+    return status
+
+def effective_order_status(order_status, flight_status):
+    """Order status as the status engine will eventually store it"""
+    if order_status == 'Active' and flight_status == 'Landed':
+        return 'Completed'
+    return order_status
+
+def apply_effective_status(order):
+    """Update an order row (with departure_datetime and flight_status) in place"""
+    order['flight_status'] = effective_flight_status(order['flight_status'], order['departure_datetime'])
+    order['order_status'] = effective_order_status(order['order_status'], order['flight_status'])
+    return order
+
+# Oldest departed flights not marked Landed yet - params: batch size
+DEPARTED_FLIGHTS_QUERY = """
+    SELECT flight_id FROM Flight
+    WHERE status IN ('Active', 'Full')
+      AND departure_datetime < NOW()
+    ORDER BY departure_datetime
+    LIMIT %s
+"""
+
+def land_departed_flights(batch_size=500):
+    """Mark departed flights as 'Landed', one bounded batch per transaction"""
+    total = 0
+    while True:
+        with db_transaction(commit=True) as db:
+            db.execute(DEPARTED_FLIGHTS_QUERY, (batch_size,))
+            flight_ids = [row['flight_id'] for row in db.fetchall()]
+            if flight_ids:
+                placeholders = ', '.join(['%s'] * len(flight_ids))
+                db.execute(f"""
+                    UPDATE Flight SET status = 'Landed'
+                    WHERE flight_id IN ({placeholders})
+                      AND status IN ('Active', 'Full')
+                """, tuple(flight_ids))
+        total += len(flight_ids)
+        if len(flight_ids) < batch_size:
+            return total
+
+def complete_landed_orders(batch_size=500):
+    """Mark active orders of landed flights as 'Completed', in bounded batches"""
+    total = 0
+    while True:
+        with db_transaction(commit=True) as db:
+            db.execute("""
+                SELECT fo.order_id
+                FROM FlightOrder fo
+                JOIN Flight f ON fo.flight_id = f.flight_id
+                WHERE fo.order_status = 'Active'
+                  AND f.status = 'Landed'
+                LIMIT %s
+            """, (batch_size,))
+            order_ids = [row['order_id'] for row in db.fetchall()]
+            if order_ids:
+                placeholders = ', '.join(['%s'] * len(order_ids))
+                db.execute(f"""
+                    UPDATE FlightOrder SET order_status = 'Completed'
+                    WHERE order_id IN ({placeholders})
+                      AND order_status = 'Active'
+                """, tuple(order_ids))
+        total += len(order_ids)
+        if len(order_ids) < batch_size:
+            return total
+
+def run_status_engine(batch_size=500):
+    """Run one full pass of the status engine, returns counts of updated rows"""
+    flights = land_departed_flights(batch_size)
+    orders = complete_landed_orders(batch_size)
+    holds = purge_expired_holds()
+    return {'flights_landed': flights, 'orders_completed': orders, 'holds_expired': holds}
+
+def start_status_scheduler(interval, batch_size=500):
+    """Run the status engine every `interval` seconds in a daemon thread"""
+    def loop():
+        while True:
+            try:
+                run_status_engine(batch_size)
+            except Exception as e:
+                print(f"Status engine error: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='flight-status-engine', daemon=True)
+    thread.start()
+    return thread
+
+def init_status_engine(app):
+    """Start the in-process scheduler with the first request (not for CLI runs)"""
+    interval = app.config.get('STATUS_ENGINE_INTERVAL', 0)
+    if not interval:
+        return
+    started = []
+    lock = threading.Lock()
+
+    @app.before_request
+    def ensure_status_scheduler():
+        if started:
+            return
+        with lock:
+            if not started:
+                start_status_scheduler(interval, app.config.get('STATUS_ENGINE_BATCH_SIZE', 500))
+                started.append(True)
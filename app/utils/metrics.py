@@ -0,0 +1,118 @@
+"""
+Prometheus metrics
+Request latency and DB time per endpoint, booking outcomes, seat conflicts,
+cache hit/miss counts and connection pool counters, exposed at /metrics in the Prometheus text format
+to the scrapers allowed by METRICS_ALLOWED_IPS / METRICS_TOKEN.
+
+Uses the optional prometheus_client package (not in requirements.txt) - without it the helpers below
+do nothing and /metrics is not registered. With several worker processes
+set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers
+(cleared on every deploy) so /metrics aggregates all of them.
+"""
+import hmac
+import os
+import time
+from flask import g, request, Response, current_app, abort
+from database import pool_stats
+from utils.cache import cache_stats
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, multiprocess
+except ImportError:
+    prometheus_client = None
+
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+# Cache and pool counters are copied into the gauges at most this often (and on every scrape)
+GAUGE_SYNC_INTERVAL = 15
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+if prometheus_client:
+    REQUEST_LATENCY = Histogram('flytau_request_duration_seconds', 'Request latency',
+                                ['endpoint', 'method'], buckets=LATENCY_BUCKETS)
+    REQUESTS = Counter('flytau_requests_total', 'Requests by response status',
+                       ['endpoint', 'method', 'status'])
+    DB_TIME = Histogram('flytau_request_db_seconds', 'Time spent in SQL per request',
+                        ['endpoint'], buckets=LATENCY_BUCKETS)
+    DB_QUERIES = Counter('flytau_db_queries_total', 'SQL statements run', ['endpoint'])
+    BOOKINGS = Counter('flytau_bookings_total', 'Booking attempts by outcome', ['result'])
+    SEAT_CONFLICTS = Counter('flytau_seat_conflicts_total',
+                             'Bookings rejected because a seat was taken or held', ['stage'])
+    CACHE_HITS = Gauge('flytau_cache_hits', 'Cache hits', ['cache'], multiprocess_mode='livesum')
+    CACHE_MISSES = Gauge('flytau_cache_misses', 'Cache misses', ['cache'], multiprocess_mode='livesum')
+    CACHE_SIZE = Gauge('flytau_cache_entries', 'Cached entries', ['cache'], multiprocess_mode='livesum')
+    DB_POOL = Gauge('flytau_db_pool', 'Connection pool counters (size, checked_out, idle, waiting, '
+                    'created, recycled)', ['counter'], multiprocess_mode='livesum')
+
+_last_gauge_sync = [0.0]
+
+def count_booking(result):
+    """Count a booking attempt - result is 'success', 'conflict' or 'failure'"""
+    if prometheus_client:
+        BOOKINGS.labels(result).inc()
+
+def count_seat_conflict(stage):
+    """Count a booking stopped by a taken or held seat - stage is 'inventory', 'hold' or 'insert'"""
+    if prometheus_client:
+        SEAT_CONFLICTS.labels(stage).inc()
+
+def sync_gauges():
+    """Copy this process's cache and connection pool counters into the gauges"""
+    _last_gauge_sync[0] = time.monotonic()
+    for name, stats in cache_stats().items():
+        CACHE_HITS.labels(name).set(stats['hits'])
+        CACHE_MISSES.labels(name).set(stats['misses'])
+        CACHE_SIZE.labels(name).set(stats['size'])
+    for counter, value in pool_stats().items():
+        DB_POOL.labels(counter).set(value)
+
+def scrape_allowed():
+    """The request comes from an allowed address or carries the metrics token"""
+    if request.remote_addr in current_app.config['METRICS_ALLOWED_IPS']:
+        return True
+    token = current_app.config['METRICS_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+def metrics_view():
+    """All metrics in the Prometheus text format"""
+    if not scrape_allowed():
+        abort(403)
+    sync_gauges()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(prometheus_client.generate_latest(registry),
+                    mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """Time every request and register /metrics (needs prometheus_client)"""
+    if not prometheus_client or not app.config.get('METRICS_ENABLED'):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started_at = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started_at = g.get('metrics_started_at')
+        endpoint = request.endpoint or 'unmatched'
+        if started_at is None or endpoint == 'metrics':
+            return response
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started_at)
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+
+        stats = g.get('query_stats')
+        if stats is not None:
+            DB_TIME.labels(endpoint).observe(stats.total)
+            DB_QUERIES.labels(endpoint).inc(stats.count)
+
+        if time.monotonic() - _last_gauge_sync[0] > GAUGE_SYNC_INTERVAL:
+            sync_gauges()
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
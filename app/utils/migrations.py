@@ -0,0 +1,52 @@
+"""
+Schema migrations
+Applies the versioned scripts in db/migrations/ to an existing database.
+db/schema.sql always has the latest schema and records every migration as
+applied, so fresh installs skip them.
+"""
+import os
+from datetime import datetime
+from database import db_transaction
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'db', 'migrations')
+
+def split_sql_statements(sql):
+    """Split a SQL script into statements, dropping -- comment lines"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+def available_migrations():
+    """(version, path) of every migration script, in order"""
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return []
+    return [(name[:-len('.sql')], os.path.join(MIGRATIONS_DIR, name))
+            for name in sorted(os.listdir(MIGRATIONS_DIR)) if name.endswith('.sql')]
+
+def applied_migrations():
+    """Versions recorded in SchemaMigration (the table is created if missing)"""
+    with db_transaction(commit=True) as db:
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS SchemaMigration (
+                version VARCHAR(100) PRIMARY KEY,
+                applied_at DATETIME NOT NULL
+            )
+        """)
+        db.execute("SELECT version FROM SchemaMigration")
+        return {row['version'] for row in db.fetchall()}
+
+def run_migrations():
+    """Apply pending migrations in order - returns the versions applied"""
+    applied = applied_migrations()
+    newly_applied = []
+    for version, path in available_migrations():
+        if version in applied:
+            continue
+        with open(path, encoding='utf-8') as f:
+            statements = split_sql_statements(f.read())
+        with db_transaction(commit=True) as db:
+            for statement in statements:
+                db.execute(statement)
+            db.execute("INSERT INTO SchemaMigration (version, applied_at) VALUES (%s, %s)",
+                       (version, datetime.now()))
+        newly_applied.append(version)
+    return newly_applied
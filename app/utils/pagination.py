@@ -0,0 +1,123 @@
+"""
+Keyset pagination for flight lists
+Pages are addressed by a cursor on (departure_datetime, flight_id) instead
+of an OFFSET, so every page costs the same however many flights are stored.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from database import execute_query
+
+Page = namedtuple('Page', 'rows next_cursor prev_cursor')
+
+CURSOR_FORMAT = '%Y%m%d%H%M%S'
+
+def encode_cursor(row):
+    return f"{row['departure_datetime'].strftime(CURSOR_FORMAT)}-{row['flight_id']}"
+
+def decode_cursor(cursor):
+    """Parse a cursor from the query string - None if missing or malformed"""
+    try:
+        timestamp, flight_id = cursor.split('-')
+        return datetime.strptime(timestamp, CURSOR_FORMAT), int(flight_id)
+    except (AttributeError, ValueError):
+        return None
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD filter value - None if missing or malformed"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+def flight_filters(args):
+    """
+    Build WHERE conditions for the route / plane / date range filters in `args`.
+    Returns (conditions, params, filters) where filters echo the valid values back.
+    """
+    conditions = []
+    params = []
+    filters = {}
+
+    origin = args.get('origin', '').strip()
+    if origin:
+        conditions.append("f.origin_airport = %s")
+        params.append(origin)
+        filters['origin'] = origin
+
+    destination = args.get('destination', '').strip()
+    if destination:
+        conditions.append("f.destination_airport = %s")
+        params.append(destination)
+        filters['destination'] = destination
+
+    plane_id = args.get('plane_id', '').strip()
+    if plane_id.isdigit():
+        conditions.append("f.plane_id = %s")
+        params.append(int(plane_id))
+        filters['plane_id'] = plane_id
+
+    # Half-open date range so the index on departure_datetime can be used
+    date_from = parse_date(args.get('date_from'))
+    if date_from:
+        conditions.append("f.departure_datetime >= %s")
+        params.append(date_from)
+        filters['date_from'] = args.get('date_from')
+
+    date_to = parse_date(args.get('date_to'))
+    if date_to:
+        conditions.append("f.departure_datetime < %s")
+        params.append(date_to + timedelta(days=1))
+        filters['date_to'] = args.get('date_to')
+
+    return conditions, params, filters
+
+def flight_page_query(query, conditions, params, page_size,
+                      after=None, before=None, descending=False):
+    """
+    (query, params, backwards) of one page of `query` (SELECT ... FROM Flight f ...,
+    without WHERE/ORDER BY). `after` / `before` are cursors from a previous page.
+    """
+    conditions = list(conditions)
+    params = list(params)
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if not after and before else None
+
+    # Walking backwards = scan in the opposite order and flip the rows afterwards
+    backwards = before is not None
+    cursor = after or before
+    if cursor:
+        forward_op = '<' if descending else '>'
+        op = {'>': '<', '<': '>'}[forward_op] if backwards else forward_op
+        conditions.append(f"(f.departure_datetime {op} %s OR (f.departure_datetime = %s AND f.flight_id {op} %s))")
+        params.extend([cursor[0], cursor[0], cursor[1]])
+
+    scan_descending = descending != backwards
+    direction = 'DESC' if scan_descending else 'ASC'
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY f.departure_datetime {direction}, f.flight_id {direction} LIMIT %s"
+    params.append(page_size + 1)
+    return query, params, backwards
+
+def fetch_flight_page(query, conditions, params, page_size,
+                      after=None, before=None, descending=False):
+    """Run `query` for one page - see flight_page_query()"""
+    query, params, backwards = flight_page_query(query, conditions, params, page_size,
+                                                 after, before, descending)
+    rows = execute_query(query, tuple(params), fetch_all=True)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows, None, None)
+
+    if backwards:
+        next_cursor = encode_cursor(rows[-1])
+        prev_cursor = encode_cursor(rows[0]) if has_more else None
+    else:
+        next_cursor = encode_cursor(rows[-1]) if has_more else None
+        prev_cursor = encode_cursor(rows[0]) if after else None
+    return Page(rows, next_cursor, prev_cursor)
@@ -0,0 +1,44 @@
+"""
+Plane capability index
+Maps plane_id -> classes and seat capacity, filled with a single query and
+cached until plane_add / plane_classes change the fleet - in this worker
+only, so it is for display; write paths read PlaneClass directly.
+"""
+from collections import namedtuple
+from config import Config
+from database import execute_query
+from utils.cache import LRUCache
+
+PlaneCapability = namedtuple('PlaneCapability', 'classes capacity')
+
+NO_CAPABILITY = PlaneCapability(frozenset(), 0)
+
+_index = LRUCache('plane_capabilities', maxsize=1, ttl=Config.CACHE_TTL)
+
+def _load_index():
+    query = """
+        SELECT plane_id, class_type, rows_count * cols_count AS seats
+        FROM PlaneClass
+    """
+    classes = {}
+    capacity = {}
+    for row in execute_query(query, fetch_all=True):
+        classes.setdefault(row['plane_id'], set()).add(row['class_type'])
+        capacity[row['plane_id']] = capacity.get(row['plane_id'], 0) + int(row['seats'])
+    return {plane_id: PlaneCapability(frozenset(classes[plane_id]), capacity[plane_id])
+            for plane_id in classes}
+
+def get_plane_capabilities():
+    """plane_id -> PlaneCapability for the whole fleet (cached)"""
+    return _index.get_or_load('all', _load_index)
+
+def get_plane_capability(plane_id):
+    try:
+        plane_id = int(plane_id)
+    except (TypeError, ValueError):
+        return NO_CAPABILITY
+    return get_plane_capabilities().get(plane_id, NO_CAPABILITY)
+
+def invalidate_plane_capabilities():
+    """Call after planes or plane classes are added"""
+    _index.invalidate('all')
@@ -0,0 +1,89 @@
+"""
+Query plan checks
+EXPLAINs the hot queries of the app and verifies each one can use the index
+meant for it, so a rewrite that makes a predicate non-sargable (or a missing
+migration) is caught before it shows up as latency on a big table. The
+queries are built by the same helpers and query constants the pages run.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from database import execute_query
+from utils.flight_queries import FLIGHT_LIST_SELECT, MANAGER_FLIGHT_SELECT, BOOKABLE_CONDITIONS, search_query
+from utils.pagination import flight_filters, flight_page_query, encode_cursor
+from utils.fare_calendar import FARE_CALENDAR_QUERY
+from utils.flight_status import DEPARTED_FLIGHTS_QUERY
+from utils.seat_inventory import OCCUPIED_SEATS_QUERY
+from utils.report_tables import CHANGED_FLIGHTS_QUERY, REVENUE_MONTH_INSERT, month_range
+
+PlanCheck = namedtuple('PlanCheck', 'name query params expected')
+
+def plan_checks():
+    """
+    The checks, built with the same helpers and query constants the app runs -
+    expected = {table alias in EXPLAIN: index the predicate must be able to use}
+    """
+    tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    cursor = encode_cursor({'departure_datetime': tomorrow, 'flight_id': 0})
+
+    def page(query, conditions, params, **options):
+        query, params, _ = flight_page_query(query, conditions, params, 50, **options)
+        return query, params
+
+    board_conditions, board_params, _ = flight_filters({})
+    plane_conditions, plane_params, _ = flight_filters({'plane_id': '1', 'date_from': tomorrow.strftime('%Y-%m-%d')})
+    order_month = tomorrow.strftime('%Y-%m')
+
+    return [
+        PlanCheck('search by route and date', *search_query('TLV', 'JFK', tomorrow),
+                  {'f': 'idx_flight_route_departure'}),
+        PlanCheck('search by date', *search_query(day=tomorrow), {'f': 'idx_flight_status_departure'}),
+        PlanCheck('fare calendar', FARE_CALENDAR_QUERY, ('TLV', 'JFK', tomorrow, tomorrow + timedelta(days=7)),
+                  {'f': 'idx_flight_route_departure'}),
+        PlanCheck('flight board page',
+                  *page(FLIGHT_LIST_SELECT, BOOKABLE_CONDITIONS + board_conditions, board_params, after=cursor),
+                  {'f': 'idx_flight_status_departure'}),
+        PlanCheck('manager flight list page',
+                  *page(MANAGER_FLIGHT_SELECT, board_conditions, board_params, after=cursor, descending=True),
+                  {'f': 'idx_flight_departure'}),
+        PlanCheck('flights of a plane',
+                  *page(MANAGER_FLIGHT_SELECT, plane_conditions, plane_params, descending=True),
+                  {'f': 'idx_flight_plane_departure'}),
+        PlanCheck('status engine', DEPARTED_FLIGHTS_QUERY, (500,), {'Flight': 'idx_flight_status_departure'}),
+        PlanCheck('seat inventory', OCCUPIED_SEATS_QUERY, (1, 1), {'fo': 'idx_order_flight_status'}),
+        PlanCheck('customer orders', """
+            SELECT fo.order_id FROM FlightOrder fo
+            WHERE fo.customer_email = %s AND fo.order_status = 'Active'
+        """, ('customer@example.com',), {'fo': 'idx_order_customer_date'}),
+        PlanCheck('customer login', """
+            SELECT email, account_password FROM RegisteredCustomer WHERE email = %s
+        """, ('customer@example.com',), {'RegisteredCustomer': 'PRIMARY'}),
+        PlanCheck('report refresh - changed flights', CHANGED_FLIGHTS_QUERY, (tomorrow, tomorrow),
+                  {'Flight': 'idx_flight_updated', 'FlightOrder': 'idx_order_updated'}),
+        PlanCheck('report refresh - order month', REVENUE_MONTH_INSERT, (order_month, *month_range(order_month)),
+                  {'fo': 'idx_order_date'}),
+    ]
+
+def check_plan(check, strict=False):
+    """
+    EXPLAIN one query. Returns (ok, plan rows). The expected index must be
+    usable (possible_keys); with strict it must also be the one chosen - on a
+    nearly empty table the optimizer may rightly prefer a full scan.
+    """
+    plan = execute_query("EXPLAIN " + check.query, tuple(check.params) or None, fetch_all=True)
+    ok = True
+    for table, index in check.expected.items():
+        rows = [row for row in plan if row.get('table') == table]
+        if not rows:
+            ok = False
+            continue
+        for row in rows:
+            possible = (row.get('possible_keys') or '').split(',')
+            if index not in possible or (strict and row.get('key') != index):
+                ok = False
+    return ok, plan
+
+def check_plans(strict=False):
+    """Run all plan checks - yields (check, ok, plan rows)"""
+    for check in plan_checks():
+        ok, plan = check_plan(check, strict)
+        yield check, ok, plan
@@ -0,0 +1,87 @@
+"""
+Per-request SQL statistics
+Every statement run through database.py is timed. Inside a request the
+count, total time and slowest statement are collected in `g.query_stats`
+and reported in a Server-Timing header; statements slower than
+SLOW_QUERY_MS are logged wherever they run. A route issuing more than
+QUERY_COUNT_WARN statements is reported too - with QUERY_COUNT_STRICT the
+request fails instead, so tests catch N+1 loops.
+"""
+import re
+import time
+from flask import g, has_request_context, request
+from config import Config
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+class TooManyQueries(Exception):
+    """Raised (with QUERY_COUNT_STRICT) when a request exceeds QUERY_COUNT_WARN statements"""
+
+class QueryStats:
+    """Statements run during one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+        self.started_at = time.perf_counter()
+
+    def add(self, sql, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed >= self.slowest:
+            self.slowest = elapsed
+            self.slowest_sql = sql
+
+def short_sql(sql, length=200):
+    """Statement on one line, cut to `length` characters"""
+    sql = WHITESPACE_RE.sub(' ', sql).strip()
+    return sql if len(sql) <= length else sql[:length] + '...'
+
+def record_query(sql, elapsed):
+    """Account one statement that took `elapsed` seconds"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is None:
+            stats = g.query_stats = QueryStats()
+        stats.add(sql, elapsed)
+    if Config.SLOW_QUERY_MS and elapsed * 1000 >= Config.SLOW_QUERY_MS:
+        where = f" [{request.method} {request.path}]" if has_request_context() else ''
+        print(f"Slow query ({elapsed * 1000:.1f} ms){where}: {short_sql(sql)}")
+
+def current_query_stats():
+    """QueryStats of the current request (None outside requests / before any query)"""
+    return g.get('query_stats') if has_request_context() else None
+
+def server_timing(stats):
+    """Server-Timing header value for a request's statistics"""
+    app_ms = (time.perf_counter() - stats.started_at) * 1000
+    return (f'db;dur={stats.total * 1000:.1f};desc="{stats.count} queries", '
+            f'db-slowest;dur={stats.slowest * 1000:.1f}, app;dur={app_ms:.1f}')
+
+def init_query_stats(app):
+    """Collect statistics per request and report them on the response"""
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = current_query_stats()
+        if stats is None:
+            return response
+        if app.config.get('SERVER_TIMING'):
+            response.headers['Server-Timing'] = server_timing(stats)
+
+        limit = app.config.get('QUERY_COUNT_WARN')
+        if limit and stats.count > limit:
+            message = (f"{request.method} {request.path} ran {stats.count} queries (limit {limit}), "
+                       f"slowest {stats.slowest * 1000:.1f} ms: {short_sql(stats.slowest_sql or '')}")
+            if app.config.get('QUERY_COUNT_STRICT'):
+                raise TooManyQueries(message)
+            print(f"Too many queries: {message}")
+        return response
@@ -0,0 +1,133 @@
+"""
+Report registry
+Loads and parses every db/reports_sql/*.sql file once, when the app is
+created, so report requests do no file I/O. In debug mode changed files
+are picked up again on the next request.
+
+Each file starts with a header of `-- key: value` comment lines:
+    -- name: occupancy
+    -- title: Report 1: average occupancy of landed flights
+    -- columns: average_system_occupancy
+    -- params: month                      (optional, used as %(month)s)
+A report with params must write literal percent signs as %%.
+"""
+import os
+import re
+from collections import namedtuple
+from flask import current_app
+from database import execute_query
+from utils.sql_text import mask_literals, strip_sql_comments, find_top_level, split_top_level
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'db', 'reports_sql')
+
+Report = namedtuple('Report', 'name title filename sql columns params')
+
+HEADER_RE = re.compile(r'^--\s*(\w+)\s*:\s*(.*?)\s*$')
+PARAM_RE = re.compile(r'%\((\w+)\)s')
+
+def select_columns(sql):
+    """
+    Output column names of a query's (first) SELECT list - the alias, or the
+    column of a plain `t.column`. None for an item without a name (an
+    expression without AS, or *).
+    """
+    masked, _ = mask_literals(sql)
+    select_at = find_top_level(masked, r'^\s*SELECT\b')
+    if not select_at:
+        return []
+    from_at = find_top_level(masked, r'\bFROM\b', select_at[1])
+    items = masked[select_at[1]:from_at[0] if from_at else len(masked)]
+    columns = []
+    for item in split_top_level(items):
+        match = re.search(r'(?:\bAS\s+|^\s*(?:\w+\.)?)(\w+)\s*$', item, re.IGNORECASE)
+        columns.append(match.group(1) if match else None)
+    return columns
+
+def split_list(value):
+    return tuple(item.strip() for item in value.split(',') if item.strip())
+
+def parse_report(filename, text):
+    """Build a Report from a SQL file's header and body"""
+    meta = {}
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        match = HEADER_RE.match(stripped)
+        if not match:
+            if stripped.startswith('--'):
+                continue
+            break
+        meta[match.group(1).lower()] = match.group(2)
+
+    sql = strip_sql_comments(text).strip().rstrip(';').strip()
+    sql = '\n'.join(line.rstrip() for line in sql.splitlines() if line.strip())
+
+    params = split_list(meta.get('params', ''))
+    used = set(PARAM_RE.findall(sql))
+    if used != set(params):
+        raise ValueError(f"{filename}: params header {sorted(params)} does not match the query's {sorted(used)}")
+
+    # The columns header names the export columns - it must match what the query returns
+    columns = split_list(meta.get('columns', ''))
+    if columns and tuple(select_columns(sql)) != columns:
+        raise ValueError(f"{filename}: columns header {list(columns)} does not match the query's "
+                         f"{select_columns(sql)}")
+
+    name = meta.get('name') or os.path.splitext(filename)[0]
+    return Report(name, meta.get('title', name), filename, sql, columns, params)
+
+class ReportRegistry:
+    """Parsed report queries by name"""
+
+    def __init__(self, directory=REPORTS_DIR):
+        self.directory = directory
+        self.reports = {}
+        self._mtimes = {}
+
+    def _scan(self):
+        return {name: os.path.getmtime(os.path.join(self.directory, name))
+                for name in sorted(os.listdir(self.directory)) if name.endswith('.sql')}
+
+    def load(self):
+        reports = {}
+        mtimes = self._scan()
+        for filename in mtimes:
+            with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                report = parse_report(filename, f.read())
+            if report.name in reports:
+                raise ValueError(f"{filename}: report name '{report.name}' already used by {reports[report.name].filename}")
+            reports[report.name] = report
+        self.reports = reports
+        self._mtimes = mtimes
+        return self
+
+    def reload_if_changed(self):
+        if self._scan() != self._mtimes:
+            self.load()
+
+    def get(self, name):
+        return self.reports[name]
+
+    def names(self):
+        return sorted(self.reports)
+
+def init_report_registry(app):
+    """Load (and check) all report queries when the app is created - a broken file stops the app"""
+    app.extensions['report_registry'] = ReportRegistry().load()
+
+def get_report(name):
+    """Report by name - files are re-read only in debug mode, and only when changed"""
+    registry = current_app.extensions['report_registry']
+    if current_app.debug:
+        registry.reload_if_changed()
+    return registry.get(name)
+
+def run_report(name, params=None, fetch_one=False):
+    """Run a report query and return its row(s)"""
+    report = get_report(name)
+    missing = [param for param in report.params if not params or param not in params]
+    if missing:
+        raise ValueError(f"Report '{name}' is missing params: {', '.join(missing)}")
+
+    return execute_query(report.sql, params or None, fetch_one=fetch_one, fetch_all=not fetch_one)
@@ -0,0 +1,290 @@
+"""
+Materialized report tables
+The management reports read small summary tables instead of aggregating
+every flight, order and ticket on each page view. A refresh only recomputes
+what changed since the last watermark: flights and orders carry an
+updated_at column, and only their flights / order months are rebuilt.
+
+Tables (see db/schema.sql):
+    ReportFlightFact    one row per flight (occupancy, month, route)  -> reports 1, 5
+    ReportPlaneMonth    per plane and departure month                  -> report 5
+    ReportCrewFlight    crew members of landed flights                 -> report 3
+    ReportCrewHours     per crew member                                -> report 3
+    ReportRevenueMonth  per order month, plane and class               -> report 2
+    ReportOrderMonth    per order month                                -> report 4
+    ReportRefresh       watermark of the last refresh
+
+A refresh runs in one transaction, so report pages keep reading the previous
+figures until it commits (never empty or half-built tables), and refreshes
+are serialized with the named lock REFRESH_LOCK.
+"""
+from datetime import datetime, timedelta
+from database import db_transaction, execute_query, insert_rows
+
+REFRESH_NAME = 'reports'
+REFRESH_LOCK = 'flytau_report_refresh'
+EPOCH = datetime(1970, 1, 1)
+
+def month_key(value):
+    return value.strftime('%Y-%m')
+
+def month_range(month):
+    """Half-open [start, end) datetime range of a 'YYYY-MM' month"""
+    start = datetime.strptime(month, '%Y-%m')
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+class RefreshInProgress(Exception):
+    """Another refresh holds REFRESH_LOCK"""
+
+def in_list(values):
+    return ', '.join(['%s'] * len(values))
+
+def last_refresh():
+    """ReportRefresh row ({'watermark', 'refreshed_at'}) or None if never refreshed"""
+    return execute_query("SELECT watermark, refreshed_at FROM ReportRefresh WHERE name = %s",
+                         (REFRESH_NAME,), fetch_one=True)
+
+# ---------------------------------------------------------------------------
+# Flights: reports 1, 3 and 5
+# ---------------------------------------------------------------------------
+
+def refresh_flights(db, flight_ids):
+    """Rebuild the per-flight facts of `flight_ids` and everything aggregated from them"""
+    ids = in_list(flight_ids)
+
+    db.execute(f"SELECT month_year, plane_id FROM ReportFlightFact WHERE flight_id IN ({ids})", tuple(flight_ids))
+    plane_months = {(row['month_year'], row['plane_id']) for row in db.fetchall()}
+    db.execute(f"SELECT role, id_number FROM ReportCrewFlight WHERE flight_id IN ({ids})", tuple(flight_ids))
+    crew = {(row['role'], row['id_number']) for row in db.fetchall()}
+
+    db.execute(f"""
+        SELECT f.flight_id, f.plane_id, f.departure_datetime, f.origin_airport, f.destination_airport,
+               f.status, fl.flight_duration,
+               (SELECT SUM(pc.rows_count * pc.cols_count) FROM PlaneClass pc
+                WHERE pc.plane_id = f.plane_id) AS seats_total,
+               (SELECT COUNT(DISTINCT t.ticket_id)
+                FROM FlightOrder fo JOIN Ticket t ON fo.order_id = t.order_id
+                WHERE fo.flight_id = f.flight_id
+                  AND fo.order_status IN ('Active', 'Completed')) AS tickets_sold
+        FROM Flight f
+        LEFT JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                               AND f.destination_airport = fl.destination_airport
+        WHERE f.flight_id IN ({ids})
+    """, tuple(flight_ids))
+    flights = db.fetchall()
+
+    db.execute(f"DELETE FROM ReportFlightFact WHERE flight_id IN ({ids})", tuple(flight_ids))
+    insert_rows(db, """ReportFlightFact (flight_id, plane_id, month_year, departure_date, origin_airport,
+                                         destination_airport, status, flight_duration, seats_total, tickets_sold)""",
+                [(f['flight_id'], f['plane_id'], month_key(f['departure_datetime']), f['departure_datetime'].date(),
+                  f['origin_airport'], f['destination_airport'], f['status'], f['flight_duration'],
+                  f['seats_total'], f['tickets_sold']) for f in flights])
+    plane_months.update((month_key(f['departure_datetime']), f['plane_id']) for f in flights)
+
+    # Crew hours only count landed flights
+    db.execute(f"DELETE FROM ReportCrewFlight WHERE flight_id IN ({ids})", tuple(flight_ids))
+    db.execute(f"""
+        SELECT 'Pilot' AS role, fpa.pilot_id AS id_number, rf.flight_id, rf.flight_duration
+        FROM FlightPilotAssignment fpa
+        JOIN ReportFlightFact rf ON fpa.flight_id = rf.flight_id
+        WHERE rf.flight_id IN ({ids}) AND rf.status = 'Landed'
+        UNION ALL
+        SELECT 'Flight Attendant' AS role, faa.flight_attendant_id AS id_number, rf.flight_id, rf.flight_duration
+        FROM FlightAttendantAssignment faa
+        JOIN ReportFlightFact rf ON faa.flight_id = rf.flight_id
+        WHERE rf.flight_id IN ({ids}) AND rf.status = 'Landed'
+    """, tuple(flight_ids) * 2)
+    crew_flights = db.fetchall()
+    insert_rows(db, "ReportCrewFlight (flight_id, role, id_number, flight_duration)",
+                [(c['flight_id'], c['role'], c['id_number'], c['flight_duration']) for c in crew_flights])
+    crew.update((c['role'], c['id_number']) for c in crew_flights)
+
+    refresh_plane_months(db, sorted(plane_months))
+    refresh_crew_hours(db, sorted(crew))
+
+def refresh_plane_months(db, keys):
+    """Recompute ReportPlaneMonth rows for (month_year, plane_id) keys from the flight facts"""
+    if not keys:
+        return
+    pairs = ', '.join(['(%s, %s)'] * len(keys))
+    params = tuple(value for key in keys for value in key)
+    db.execute(f"""
+        SELECT month_year, plane_id, status, departure_date, origin_airport, destination_airport, flight_duration
+        FROM ReportFlightFact
+        WHERE (month_year, plane_id) IN ({pairs})
+    """, params)
+
+    stats = {}
+    for f in db.fetchall():
+        key = (f['month_year'], f['plane_id'])
+        s = stats.setdefault(key, {'performed': 0, 'canceled': 0, 'days': set(), 'routes': {}})
+        if f['status'] in ('Active', 'Landed'):
+            s['performed'] += 1
+            s['days'].add(f['departure_date'])
+            route = s['routes'].setdefault((f['origin_airport'], f['destination_airport']), [0, 0])
+            route[0] += 1
+            route[1] += f['flight_duration'] or 0
+        elif f['status'] == 'Canceled':
+            s['canceled'] += 1
+
+    rows = []
+    for (month_year, plane_id), s in stats.items():
+        # Dominant route = most flights, then most flight hours
+        dominant = max(s['routes'].items(), key=lambda item: tuple(item[1]))[0] if s['routes'] else None
+        rows.append((month_year, plane_id, s['performed'], s['canceled'], len(s['days']),
+                     f"{dominant[0]} -> {dominant[1]}" if dominant else None))
+
+    db.execute(f"DELETE FROM ReportPlaneMonth WHERE (month_year, plane_id) IN ({pairs})", params)
+    insert_rows(db, """ReportPlaneMonth (month_year, plane_id, flights_performed, flights_canceled,
+                                         days_active, dominant_route)""", rows)
+
+def refresh_crew_hours(db, keys):
+    """Recompute ReportCrewHours rows for (role, id_number) keys"""
+    if not keys:
+        return
+    pairs = ', '.join(['(%s, %s)'] * len(keys))
+    params = tuple(value for key in keys for value in key)
+    db.execute(f"DELETE FROM ReportCrewHours WHERE (role, id_number) IN ({pairs})", params)
+    db.execute(f"""
+        INSERT INTO ReportCrewHours (role, id_number, long_haul_hours, short_haul_hours)
+        SELECT role, id_number,
+               COALESCE(SUM(CASE WHEN flight_duration > 6 THEN flight_duration ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN flight_duration <= 6 THEN flight_duration ELSE 0 END), 0)
+        FROM ReportCrewFlight
+        WHERE (role, id_number) IN ({pairs})
+        GROUP BY role, id_number
+    """, params)
+
+# ---------------------------------------------------------------------------
+# Order months: reports 2 and 4
+# ---------------------------------------------------------------------------
+
+# Params: month ('YYYY-MM'), month start, next month start
+REVENUE_MONTH_INSERT = """
+    INSERT INTO ReportRevenueMonth (order_month, plane_id, class_type, total_revenue, tickets_sold_count)
+    SELECT %s, t.plane_id, t.class_type,
+           SUM(CASE
+                   WHEN fo.order_status IN ('Active', 'Completed') THEN t.price
+                   WHEN fo.order_status = 'Canceled_By_Client' THEN t.price * 0.05
+                   ELSE 0
+               END),
+           COUNT(t.seat_number)
+    FROM Ticket t
+    JOIN FlightOrder fo ON t.order_id = fo.order_id
+    WHERE fo.order_date >= %s AND fo.order_date < %s
+    GROUP BY t.plane_id, t.class_type
+"""
+
+def refresh_order_month(db, month):
+    """Recompute revenue and cancellation figures of orders placed in `month`"""
+    start, end = month_range(month)
+
+    db.execute("DELETE FROM ReportRevenueMonth WHERE order_month = %s", (month,))
+    db.execute(REVENUE_MONTH_INSERT, (month, start, end))
+
+    db.execute("DELETE FROM ReportOrderMonth WHERE order_month = %s", (month,))
+    db.execute("""
+        INSERT INTO ReportOrderMonth (order_month, total_orders, canceled_orders_count)
+        SELECT %s, COUNT(order_id),
+               SUM(CASE WHEN order_status = 'Canceled_By_Client' THEN 1 ELSE 0 END)
+        FROM FlightOrder
+        WHERE order_date >= %s AND order_date < %s
+        HAVING COUNT(order_id) > 0
+    """, (month, start, end))
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+# Params: since, since
+CHANGED_FLIGHTS_QUERY = """
+    SELECT flight_id FROM Flight WHERE updated_at > %s
+    UNION
+    SELECT flight_id FROM FlightOrder WHERE updated_at > %s
+"""
+
+def changed_flight_ids(db, since, batch_size):
+    """Flights changed since `since` - their own row or one of their orders"""
+    db.execute(CHANGED_FLIGHTS_QUERY, (since, since))
+    ids = sorted(row['flight_id'] for row in db.fetchall())
+    return [ids[start:start + batch_size] for start in range(0, len(ids), batch_size)]
+
+def all_flight_ids(db, batch_size):
+    """All flight ids, in batches (keyset scan on the primary key)"""
+    last_id = 0
+    while True:
+        db.execute("SELECT flight_id FROM Flight WHERE flight_id > %s ORDER BY flight_id LIMIT %s",
+                   (last_id, batch_size))
+        rows = db.fetchall()
+        if not rows:
+            return
+        yield [row['flight_id'] for row in rows]
+        last_id = rows[-1]['flight_id']
+
+def changed_order_months(db, since):
+    db.execute("SELECT DISTINCT order_date FROM FlightOrder WHERE updated_at > %s", (since,))
+    return sorted({month_key(row['order_date']) for row in db.fetchall()})
+
+def all_order_months(db):
+    db.execute("SELECT MIN(order_date) AS first, MAX(order_date) AS last FROM FlightOrder")
+    bounds = db.fetchone()
+    if not bounds or not bounds['first']:
+        return []
+    months = []
+    month = month_key(bounds['first'])
+    while month <= month_key(bounds['last']):
+        months.append(month)
+        month = month_key(month_range(month)[1])
+    return months
+
+def refresh_reports(full=False, batch_size=500, lag=60, wait=0):
+    """
+    Bring the report tables up to date. Incremental unless `full` (or never refreshed).
+    `lag` seconds are re-read on the next run so rows committed late are not missed.
+    Waits up to `wait` seconds for a running refresh, then raises RefreshInProgress.
+    """
+    # The lock is held on its own connection until the refresh has committed
+    with db_transaction() as lock:
+        lock.execute("SELECT GET_LOCK(%s, %s) AS acquired", (REFRESH_LOCK, wait))
+        if not lock.fetchone()['acquired']:
+            raise RefreshInProgress("A report refresh is already running")
+        try:
+            with db_transaction(commit=True) as db:
+                return _refresh(db, full, batch_size, lag)
+        finally:
+            lock.execute("SELECT RELEASE_LOCK(%s)", (REFRESH_LOCK,))
+            lock.fetchall()
+
+def _refresh(db, full, batch_size, lag):
+    db.execute("SELECT NOW(6) AS now")
+    db_now = db.fetchone()['now']
+    previous = None
+    if not full:
+        db.execute("SELECT watermark FROM ReportRefresh WHERE name = %s", (REFRESH_NAME,))
+        previous = db.fetchone()
+    since = previous['watermark'] if previous else EPOCH
+
+    if previous is None:
+        for table in ('ReportFlightFact', 'ReportPlaneMonth', 'ReportCrewFlight', 'ReportCrewHours',
+                      'ReportRevenueMonth', 'ReportOrderMonth'):
+            db.execute(f"DELETE FROM {table}")
+        flight_batches = list(all_flight_ids(db, batch_size))
+        months = all_order_months(db)
+    else:
+        flight_batches = changed_flight_ids(db, since, batch_size)
+        months = changed_order_months(db, since)
+
+    flights = 0
+    for flight_ids in flight_batches:
+        refresh_flights(db, flight_ids)
+        flights += len(flight_ids)
+
+    for month in months:
+        refresh_order_month(db, month)
+
+    watermark = max(since, db_now - timedelta(seconds=lag))
+    db.execute("DELETE FROM ReportRefresh WHERE name = %s", (REFRESH_NAME,))
+    db.execute("INSERT INTO ReportRefresh (name, watermark, refreshed_at) VALUES (%s, %s, %s)",
+               (REFRESH_NAME, watermark, db_now))
+    return {'full': previous is None, 'flights': flights, 'order_months': len(months)}
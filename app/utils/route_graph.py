@@ -0,0 +1,145 @@
+"""
+Connecting-flight search
+Keeps the FlightLine network and every upcoming bookable flight in memory:
+one time-sorted departure list per airport. Itineraries with 1-2
+connections are found by walking the network and picking onward flights
+inside the layover window with a binary search - no SQL per request.
+The graph is rebuilt after a flight is created, canceled or changes status.
+"""
+from bisect import bisect_left
+from collections import namedtuple, deque
+from datetime import datetime, timedelta
+from config import Config
+from database import execute_query
+from utils.cache import LRUCache
+
+Leg = namedtuple('Leg', 'flight_id origin_airport destination_airport departure_datetime arrival_datetime flight_duration')
+Itinerary = namedtuple('Itinerary', 'legs departure_datetime arrival_datetime total_hours layovers')
+
+_graphs = LRUCache('route_graph', maxsize=1, ttl=Config.CACHE_TTL)
+
+class RouteGraph:
+    """FlightLine edges plus a departure list per airport"""
+
+    def __init__(self, lines, flights):
+        self.lines = {}
+        self.reverse = {}
+        for line in lines:
+            self.lines.setdefault(line['origin_airport'], set()).add(line['destination_airport'])
+            self.reverse.setdefault(line['destination_airport'], set()).add(line['origin_airport'])
+
+        departures = {}
+        for f in flights:
+            departure = f['departure_datetime']
+            arrival = departure + timedelta(hours=float(f['flight_duration']))
+            departures.setdefault(f['origin_airport'], []).append(
+                Leg(f['flight_id'], f['origin_airport'], f['destination_airport'],
+                    departure, arrival, f['flight_duration']))
+        self.departures = {}
+        self.departure_times = {}
+        for airport, legs in departures.items():
+            legs.sort(key=lambda leg: (leg.departure_datetime, leg.flight_id))
+            self.departures[airport] = legs
+            self.departure_times[airport] = [leg.departure_datetime for leg in legs]
+
+    def departures_between(self, airport, start, end):
+        """Flights leaving `airport` in [start, end)"""
+        times = self.departure_times.get(airport)
+        if not times:
+            return []
+        legs = self.departures[airport]
+        first = bisect_left(times, start)
+        last = bisect_left(times, end, first)
+        return legs[first:last]
+
+    def hops_to(self, destination, max_hops):
+        """Fewest FlightLine hops from each airport to `destination` (up to max_hops)"""
+        hops = {destination: 0}
+        queue = deque([destination])
+        while queue:
+            airport = queue.popleft()
+            if hops[airport] == max_hops:
+                continue
+            for previous in self.reverse.get(airport, ()):
+                if previous not in hops:
+                    hops[previous] = hops[airport] + 1
+                    queue.append(previous)
+        return hops
+
+    def itineraries(self, origin, destination, start, end, max_connections=2,
+                    min_layover=timedelta(hours=1), max_layover=timedelta(hours=12), limit=20):
+        """
+        Itineraries from origin to destination whose first flight leaves in
+        [start, end), with 1..max_connections connections. Sorted by departure,
+        then total travel time.
+        """
+        max_legs = max_connections + 1
+        hops = self.hops_to(destination, max_legs)
+        if origin not in hops or origin == destination:
+            return []
+
+        found = []
+
+        def extend(path, visited):
+            leg = path[-1]
+            if leg.destination_airport == destination:
+                if len(path) > 1:
+                    found.append(path)
+                return
+            legs_left = max_legs - len(path)
+            if hops.get(leg.destination_airport, max_legs + 1) > legs_left:
+                return
+            window_start = leg.arrival_datetime + min_layover
+            for next_leg in self.departures_between(leg.destination_airport, window_start,
+                                                    leg.arrival_datetime + max_layover):
+                if next_leg.destination_airport not in visited and \
+                        hops.get(next_leg.destination_airport, max_legs + 1) <= legs_left - 1:
+                    extend(path + [next_leg], visited | {next_leg.destination_airport})
+
+        for first_leg in self.departures_between(origin, start, end):
+            if first_leg.destination_airport != destination and \
+                    hops.get(first_leg.destination_airport, max_legs + 1) <= max_legs - 1:
+                extend([first_leg], {origin, first_leg.destination_airport})
+
+        results = []
+        for path in found:
+            layovers = [(path[i + 1].departure_datetime - path[i].arrival_datetime).total_seconds() / 3600
+                        for i in range(len(path) - 1)]
+            total = (path[-1].arrival_datetime - path[0].departure_datetime).total_seconds() / 3600
+            results.append(Itinerary(tuple(path), path[0].departure_datetime, path[-1].arrival_datetime,
+                                     round(total, 2), [round(hours, 2) for hours in layovers]))
+        results.sort(key=lambda it: (it.departure_datetime, it.total_hours))
+        return results[:limit]
+
+def _load_graph():
+    lines = execute_query("SELECT origin_airport, destination_airport FROM FlightLine", fetch_all=True)
+    flights = execute_query("""
+        SELECT f.flight_id, f.origin_airport, f.destination_airport, f.departure_datetime, fl.flight_duration
+        FROM Flight f
+        JOIN FlightLine fl ON f.origin_airport = fl.origin_airport
+                          AND f.destination_airport = fl.destination_airport
+        WHERE f.status = 'Active' AND f.departure_datetime > NOW()
+    """, fetch_all=True)
+    return RouteGraph(lines, flights)
+
+def get_route_graph():
+    """The route graph of this process (cached)"""
+    return _graphs.get_or_load('graph', _load_graph)
+
+def invalidate_route_graph():
+    """Rebuild the graph on next use - call after flights are created or canceled"""
+    _graphs.invalidate('graph')
+
+def find_connections(origin, destination, day=None):
+    """Connecting itineraries leaving on `day` (a datetime at midnight), or the next ones from now"""
+    now = datetime.now()
+    if day:
+        start, end = max(day, now), day + timedelta(days=1)
+    else:
+        start, end = now, now + timedelta(days=Config.CONNECTION_SEARCH_DAYS)
+    return get_route_graph().itineraries(
+        origin, destination, start, end,
+        max_connections=Config.CONNECTION_MAX_STOPS,
+        min_layover=timedelta(minutes=Config.CONNECTION_MIN_LAYOVER_MINUTES),
+        max_layover=timedelta(minutes=Config.CONNECTION_MAX_LAYOVER_MINUTES),
+        limit=Config.CONNECTION_MAX_RESULTS)
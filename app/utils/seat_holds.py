@@ -0,0 +1,90 @@
+"""
+Seat holds
+Selecting a seat on the seat map holds it for SEAT_HOLD_TTL seconds so no one
+else can book it meanwhile. Holds live in the SeatHold table (shared by all
+workers) and stop counting once expires_at has passed; the status engine
+deletes the leftovers.
+"""
+import secrets
+from datetime import datetime, timedelta
+from config import Config
+from database import db_transaction, execute_query, insert_rows, IntegrityError
+
+def get_hold_token(session):
+    """Hold owner id of the current browser session (created on first use)"""
+    token = session.get('seat_hold_token')
+    if not token:
+        token = secrets.token_hex(16)
+        session['seat_hold_token'] = token
+    return token
+
+def active_holds(flight_id):
+    """{seat_number: hold_token} of the unexpired holds on a flight"""
+    rows = execute_query("""
+        SELECT seat_number, hold_token FROM SeatHold
+        WHERE flight_id = %s AND expires_at > %s
+    """, (flight_id, datetime.now()), fetch_all=True)
+    return {row['seat_number']: row['hold_token'] for row in rows}
+
+def hold_seats(flight_id, seat_numbers, token, ttl=None):
+    """
+    Hold seats for `token`, extending the holds it already has on the flight.
+    Returns the seats held by someone else - nothing is held if that is not empty.
+    """
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=ttl or Config.SEAT_HOLD_TTL)
+    seat_numbers = sorted(set(seat_numbers))
+    placeholders = ', '.join(['%s'] * len(seat_numbers))
+    try:
+        with db_transaction(commit=True) as db:
+            db.execute(f"""
+                SELECT seat_number, hold_token, expires_at FROM SeatHold
+                WHERE flight_id = %s AND seat_number IN ({placeholders})
+            """, (flight_id, *seat_numbers))
+            existing = {row['seat_number']: row for row in db.fetchall()}
+
+            conflicts = [seat for seat, hold in existing.items()
+                         if hold['hold_token'] != token and hold['expires_at'] > now]
+            if conflicts:
+                return sorted(conflicts)
+
+            expired = [seat for seat, hold in existing.items() if hold['hold_token'] != token]
+            if expired:
+                expired_placeholders = ', '.join(['%s'] * len(expired))
+                db.execute(f"""
+                    DELETE FROM SeatHold
+                    WHERE flight_id = %s AND seat_number IN ({expired_placeholders}) AND expires_at <= %s
+                """, (flight_id, *expired, now))
+
+            db.execute("""
+                UPDATE SeatHold SET expires_at = %s
+                WHERE flight_id = %s AND hold_token = %s
+            """, (expires_at, flight_id, token))
+
+            new_holds = [(flight_id, seat, token, expires_at) for seat in seat_numbers
+                         if seat in expired or seat not in existing]
+            insert_rows(db, "SeatHold (flight_id, seat_number, hold_token, expires_at)", new_holds)
+    except IntegrityError:
+        # Another customer grabbed one of the seats between our SELECT and INSERT
+        holds = active_holds(flight_id)
+        return [seat for seat in seat_numbers if holds.get(seat, token) != token] or seat_numbers
+    return []
+
+def release_seats(flight_id, seat_numbers, token):
+    """Drop some of `token`'s holds on a flight"""
+    if not seat_numbers:
+        return 0
+    placeholders = ', '.join(['%s'] * len(seat_numbers))
+    return execute_query(f"""
+        DELETE FROM SeatHold
+        WHERE flight_id = %s AND hold_token = %s AND seat_number IN ({placeholders})
+    """, (flight_id, token, *seat_numbers), commit=True)
+
+def release_all_seats(flight_id, token):
+    """Drop all of `token`'s holds on a flight (after the order is placed)"""
+    return execute_query("DELETE FROM SeatHold WHERE flight_id = %s AND hold_token = %s",
+                         (flight_id, token), commit=True)
+
+def purge_expired_holds():
+    """Delete expired holds - returns how many were removed"""
+    return execute_query("DELETE FROM SeatHold WHERE expires_at <= %s", (datetime.now(),), commit=True)
@@ -0,0 +1,93 @@
+"""
+Per-flight seat inventory
+One bit per seat, indexed by the seat's position in the plane layout
+(see utils/seat_map.py). Kept up to date on booking and cancellation and
+rebuilt from the DB when it is not cached.
+
+Every worker process has its own cache and only sees its own bookings, so a
+cached bitmap is checked against the flight's seats_booked counter (kept in
+the booking transaction) on every use and rebuilt when they differ.
+"""
+import threading
+from config import Config
+from database import execute_query
+from utils.cache import LRUCache
+from utils.seat_map import get_seat_layout
+
+_inventories = LRUCache('seat_inventory', maxsize=Config.SEAT_INVENTORY_CACHE_SIZE, ttl=Config.CACHE_TTL)
+
+class SeatInventory:
+    """Bitset of occupied seats of a single flight"""
+
+    def __init__(self, flight_id, plane_id, capacity):
+        self.flight_id = flight_id
+        self.plane_id = plane_id
+        self.capacity = capacity
+        self._bits = bytearray((capacity + 7) // 8)
+        self._lock = threading.Lock()
+
+    def is_taken(self, index):
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def take(self, indexes):
+        with self._lock:
+            for index in indexes:
+                self._bits[index >> 3] |= 1 << (index & 7)
+
+    def release(self, indexes):
+        with self._lock:
+            for index in indexes:
+                self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def taken_count(self):
+        return sum(bin(byte).count('1') for byte in self._bits)
+
+# Sold seats of a flight - params: flight_id, plane_id
+OCCUPIED_SEATS_QUERY = """
+    SELECT t.class_type, t.seat_number
+    FROM Ticket t
+    JOIN FlightOrder fo ON t.order_id = fo.order_id
+    WHERE fo.flight_id = %s
+      AND fo.order_status IN ('Active', 'Completed')
+      AND t.plane_id = %s
+"""
+
+def _load_inventory(flight_id, plane_id):
+    layout = get_seat_layout(plane_id)
+    inventory = SeatInventory(flight_id, plane_id, layout.capacity)
+
+    occupied = execute_query(OCCUPIED_SEATS_QUERY, (flight_id, plane_id), fetch_all=True)
+    inventory.take(index for index in (layout.index_of.get((s['class_type'], s['seat_number']))
+                                       for s in occupied) if index is not None)
+    return inventory
+
+def get_seat_inventory(flight_id, plane_id, seats_booked):
+    """Occupied-seat bitmap of a flight (cached, rebuilt when it disagrees with Flight.seats_booked)"""
+    inventory = _inventories.get(flight_id)
+    if inventory is None or inventory.plane_id != plane_id or \
+            inventory.capacity != get_seat_layout(plane_id).capacity or \
+            inventory.taken_count() != seats_booked:
+        inventory = _load_inventory(flight_id, plane_id)
+        _inventories.put(flight_id, inventory)
+    return inventory
+
+def seat_indexes(plane_id, seats):
+    """Layout positions of (class_type, seat_number) pairs - None for unknown seats"""
+    index_of = get_seat_layout(plane_id).index_of
+    return [index_of.get(seat) for seat in seats]
+
+def mark_seats_booked(flight_id, plane_id, seats):
+    """Record newly booked (class_type, seat_number) seats in the cached inventory"""
+    inventory = _inventories.get(flight_id)
+    if inventory is not None and inventory.plane_id == plane_id:
+        inventory.take(index for index in seat_indexes(plane_id, seats) if index is not None)
+
+def mark_seats_released(flight_id, plane_id, seats):
+    """Free canceled (class_type, seat_number) seats in the cached inventory"""
+    inventory = _inventories.get(flight_id)
+    if inventory is not None and inventory.plane_id == plane_id:
+        inventory.release(index for index in seat_indexes(plane_id, seats) if index is not None)
+
+def invalidate_seat_inventory(flight_id):
+    """Drop a flight's inventory so it is rebuilt from the DB on next use"""
+    _inventories.invalidate(flight_id)
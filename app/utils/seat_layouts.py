@@ -0,0 +1,49 @@
+"""
+Seat generation for plane classes
+Creates a class and all of its seats in one transaction using multi-row
+INSERTs, and provides reusable layout templates for common cabins.
+"""
+import string
+from collections import namedtuple
+from database import insert_rows
+
+LayoutTemplate = namedtuple('LayoutTemplate', 'key title class_type rows_count cols_count')
+
+LAYOUT_TEMPLATES = {t.key: t for t in [
+    LayoutTemplate('a320_economy', 'A320 economy 30×6', 'Economy', 30, 6),
+    LayoutTemplate('a320_business', 'A320 business 3×4', 'Business', 3, 4),
+    LayoutTemplate('b737_economy', 'Boeing 737 economy 28×6', 'Economy', 28, 6),
+    LayoutTemplate('b787_economy', 'Boeing 787 economy 32×9', 'Economy', 32, 9),
+    LayoutTemplate('b787_business', 'Boeing 787 business 6×4', 'Business', 6, 4),
+    LayoutTemplate('regional_economy', 'Regional jet economy 20×4', 'Economy', 20, 4),
+]}
+
+MAX_COLS = len(string.ascii_uppercase)
+
+# Rows per INSERT statement
+SEAT_INSERT_BATCH = 500
+
+def generate_seat_numbers(rows_count, cols_count):
+    """Seat numbers in layout order: 1A, 1B, ..., 2A, ..."""
+    cols = string.ascii_uppercase[:cols_count]
+    return [f"{row}{col}" for row in range(1, rows_count + 1) for col in cols]
+
+def add_plane_class(db, plane_id, class_type, rows_count, cols_count):
+    """Insert a PlaneClass row and all of its seats (inside the caller's transaction)"""
+    db.execute("""
+        INSERT INTO PlaneClass (plane_id, class_type, rows_count, cols_count)
+        VALUES (%s, %s, %s, %s)
+    """, (plane_id, class_type, rows_count, cols_count))
+
+    seats = [(plane_id, class_type, seat_number)
+             for seat_number in generate_seat_numbers(rows_count, cols_count)]
+    insert_rows(db, "Seat (plane_id, class_type, seat_number)", seats, SEAT_INSERT_BATCH)
+
+    # Upcoming flights on this plane gain the new seats - past ones keep the totals they flew with
+    db.execute("""
+        UPDATE Flight
+        SET status = CASE WHEN status = 'Full' THEN 'Active' ELSE status END,
+            seats_total = seats_total + %s
+        WHERE plane_id = %s AND status IN ('Active', 'Full') AND departure_datetime > NOW()
+    """, (len(seats), plane_id))
+    return len(seats)
@@ -0,0 +1,90 @@
+"""
+Seat layout cache
+A plane's seat layout only changes when a class is added, so it is loaded
+once per plane and kept as an immutable structure grouped by class.
+"""
+import re
+from collections import namedtuple
+from types import MappingProxyType
+from config import Config
+from database import execute_query
+from utils.cache import LRUCache
+
+# index = position of the seat in the plane's layout, used by per-flight seat inventories
+SeatInfo = namedtuple('SeatInfo', 'plane_id class_type seat_number row col index')
+SeatLayout = namedtuple('SeatLayout', 'plane_id size_category classes capacity index_of')
+
+CLASS_ORDER = ('Business', 'Economy')
+SEAT_NUMBER_RE = re.compile(r'^(\d+)([A-Z])$')
+
+_layouts = LRUCache('seat_layout', maxsize=Config.SEAT_LAYOUT_CACHE_SIZE, ttl=Config.CACHE_TTL)
+
+def parse_seat_number(seat_number):
+    """Split '12C' into (12, 2) - row number and zero based column"""
+    match = SEAT_NUMBER_RE.match(seat_number or '')
+    if not match:
+        return None
+    return int(match.group(1)), ord(match.group(2)) - ord('A')
+
+def _load_layout(plane_id):
+    query = """
+        SELECT s.class_type, s.seat_number, pc.rows_count, pc.cols_count, p.size_category
+        FROM Seat s
+        JOIN PlaneClass pc ON s.plane_id = pc.plane_id AND s.class_type = pc.class_type
+        JOIN Plane p ON s.plane_id = p.plane_id
+        WHERE s.plane_id = %s
+    """
+    rows = execute_query(query, (plane_id,), fetch_all=True)
+    if not rows:
+        return SeatLayout(plane_id, None, MappingProxyType({}), 0, MappingProxyType({}))
+
+    size_category = rows[0]['size_category']
+    by_class = {}
+    dims = {}
+    for row in rows:
+        # Small planes never sell Business class
+        if row['class_type'] == 'Business' and size_category == 'Small':
+            continue
+        by_class.setdefault(row['class_type'], []).append(row['seat_number'])
+        dims[row['class_type']] = (row['rows_count'], row['cols_count'])
+
+    classes = {}
+    index_of = {}
+    offset = 0
+    extra = []
+    for class_type in sorted(by_class, key=lambda c: CLASS_ORDER.index(c) if c in CLASS_ORDER else len(CLASS_ORDER)):
+        rows_count, cols_count = dims[class_type]
+        seats = []
+        for seat_number in by_class[class_type]:
+            position = parse_seat_number(seat_number)
+            if position and 1 <= position[0] <= rows_count and position[1] < cols_count:
+                row_number, col = position
+                index = offset + (row_number - 1) * cols_count + col
+                seats.append(SeatInfo(plane_id, class_type, seat_number, row_number, col, index))
+            else:
+                # Seat outside the class grid - give it a slot after the grid
+                extra.append((class_type, seat_number, position))
+        seats.sort(key=lambda s: s.index)
+        classes[class_type] = seats
+        offset += rows_count * cols_count
+
+    for class_type, seat_number, position in extra:
+        row_number, col = position if position else (0, 0)
+        seat = SeatInfo(plane_id, class_type, seat_number, row_number, col, offset)
+        classes[class_type].append(seat)
+        offset += 1
+
+    for class_type in classes:
+        classes[class_type] = tuple(classes[class_type])
+        for seat in classes[class_type]:
+            index_of[(class_type, seat.seat_number)] = seat.index
+
+    return SeatLayout(plane_id, size_category, MappingProxyType(classes), offset, MappingProxyType(index_of))
+
+def get_seat_layout(plane_id):
+    """Seat layout of a plane, grouped by class (cached)"""
+    return _layouts.get_or_load(plane_id, lambda: _load_layout(plane_id))
+
+def invalidate_seat_layout(plane_id):
+    """Drop a plane's cached layout - call after its classes/seats change"""
+    _layouts.invalidate(plane_id)
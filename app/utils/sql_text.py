@@ -0,0 +1,94 @@
+"""
+SQL text scanning
+Finds the string literals, quoted names and comments of a SQL text so it can
+be searched and split without looking inside them: mask_literals() swaps
+each one for a \\x00n\\x00 marker. Used by the SQLite stand-in's translator
+and by the report registry.
+"""
+import re
+
+MASK_RE = re.compile(r'\x00(\d+)\x00')
+
+def mask_literals(sql):
+    """Replace string literals, quoted names and comments with \\x00n\\x00 markers"""
+    parts = []
+    out = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if char in ("'", '"', '`'):
+            end = i + 1
+            while end < length:
+                if sql[end] == '\\':
+                    end += 2
+                    continue
+                if sql[end] == char:
+                    if end + 1 < length and sql[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            token = sql[i:end + 1]
+        elif sql.startswith('--', i) and (i + 2 == length or sql[i + 2].isspace()):
+            end = sql.find('\n', i)
+            end = length if end == -1 else end
+            token = sql[i:end]
+            end -= 1
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = length - 1 if end == -1 else end + 1
+            token = sql[i:end + 1]
+        else:
+            out.append(char)
+            i += 1
+            continue
+        out.append(f'\x00{len(parts)}\x00')
+        parts.append(token)
+        i = end + 1
+    return ''.join(out), parts
+
+def strip_comments(masked, parts):
+    """Drop the comment markers of a masked statement"""
+    def restore(match):
+        token = parts[int(match.group(1))]
+        return ' ' if token.startswith('--') or token.startswith('/*') else match.group(0)
+    return MASK_RE.sub(restore, masked)
+
+def restore_literals(masked, parts):
+    """Put the masked literals back (comments included, unless stripped)"""
+    return MASK_RE.sub(lambda match: parts[int(match.group(1))], masked)
+
+def strip_sql_comments(sql):
+    """Remove -- and /* */ comments, leaving string literals and quoted names untouched"""
+    masked, parts = mask_literals(sql)
+    return restore_literals(strip_comments(masked, parts), parts)
+
+def paren_depths(sql):
+    depths = []
+    depth = 0
+    for char in sql:
+        if char == '(':
+            depth += 1
+        depths.append(depth)
+        if char == ')':
+            depth -= 1
+    return depths
+
+def find_top_level(sql, pattern, start=0, depths=None):
+    """First match of `pattern` outside parentheses, at or after `start`"""
+    depths = depths or paren_depths(sql)
+    for match in re.finditer(pattern, sql[start:], re.IGNORECASE):
+        if depths[start + match.start()] == 0:
+            return start + match.start(), start + match.end()
+    return None
+
+def split_top_level(sql, separator=','):
+    depths = paren_depths(sql)
+    items, start = [], 0
+    for i, char in enumerate(sql):
+        if char == separator and depths[i] == 0:
+            items.append(sql[start:i])
+            start = i + 1
+    items.append(sql[start:])
+    return items
@@ -0,0 +1,470 @@
+"""
+SQLite stand-in for MySQL
+Lets the whole app (and its benchmarks) run without a MySQL server: set
+DB_BACKEND=sqlite and database.py hands out connections from here instead of
+mysql.connector. The connection and cursor objects mimic the parts of the
+mysql.connector API the app uses (dictionary cursors, lastrowid, rowcount,
+ping, IntegrityError), and every statement is translated on the fly:
+
+    %s / %(name)s placeholders          -> ? / :name
+    NOW(), NOW(6), CURRENT_TIMESTAMP(6) -> NOW() function (local time, like MySQL)
+    UPDATE t JOIN x ON ... SET ...      -> UPDATE t SET ... FROM x WHERE ...
+    (a, b) IN ((?, ?), ...)             -> (a, b) IN (VALUES (?, ?), ...)
+    INSERT IGNORE                       -> INSERT OR IGNORE
+    TIMESTAMPADD(unit, n, t)            -> TIMESTAMPADD('unit', n, t) function
+    SELECT ... FOR UPDATE               -> BEGIN IMMEDIATE + SELECT
+    SET SESSION ...                     -> ignored
+DATE_FORMAT, IF, CONCAT, GREATEST, LEAST, YEAR, MONTH, DAY, HOUR, CURDATE
+and DATEDIFF are provided as functions. db/schema.sql is translated too
+(ENUM, AUTO_INCREMENT, inline indexes, ON UPDATE CURRENT_TIMESTAMP via a
+trigger) and loaded with db/seed.sql into an empty database on first use.
+
+Dates are stored as 'YYYY-MM-DD HH:MM:SS[.ffffff]' text and come back as
+datetime/date objects, DECIMAL columns as Decimal. Not supported: EXPLAIN
+plans (check-plans) and LOAD DATA (generate-data --infile).
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from mysql.connector import Error, IntegrityError
+from utils.sql_text import MASK_RE, mask_literals, strip_comments, find_top_level, split_top_level
+
+DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'db')
+
+TIMESTAMPADD_UNITS = {'MICROSECOND': 'microseconds', 'SECOND': 'seconds', 'MINUTE': 'minutes', 'HOUR': 'hours',
+                      'DAY': 'days', 'WEEK': 'weeks'}
+
+DATETIME_RE = re.compile(r'^\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2}(\.\d{1,6})?)?$')
+
+# MySQL DATE_FORMAT specifiers -> strftime
+DATE_FORMAT_CODES = {'Y': '%Y', 'y': '%y', 'm': '%m', 'c': '{month}', 'd': '%d', 'e': '{day}', 'H': '%H',
+                     'k': '{hour}', 'i': '%M', 's': '%S', 'S': '%S', 'f': '%f', 'p': '%p', 'M': '%B',
+                     'b': '%b', 'W': '%A', 'a': '%a', 'j': '%j', 'T': '%H:%M:%S', '%': '%%'}
+
+# --- Values ------------------------------------------------------------------
+
+def to_datetime(value):
+    """datetime of a stored date/time value (None if it is not one)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def convert_value(value):
+    """Computed columns have no declared type - turn date-like text back into dates"""
+    if isinstance(value, str) and value[:1].isdigit() and DATETIME_RE.match(value):
+        parsed = datetime.fromisoformat(value)
+        return parsed if ' ' in value else parsed.date()
+    return value
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter('DATETIME', lambda raw: datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter('DATE', lambda raw: date.fromisoformat(raw.decode()[:10]))
+sqlite3.register_converter('DECIMAL', lambda raw: Decimal(raw.decode()))
+
+# --- MySQL functions -----------------------------------------------------------
+
+def sql_now(precision=0):
+    return datetime.now().isoformat(' ', timespec='microseconds' if precision else 'seconds')
+
+def sql_date_format(value, fmt):
+    value = to_datetime(value)
+    if value is None or fmt is None:
+        return None
+    out = []
+    i = 0
+    while i < len(fmt):
+        if fmt[i] == '%' and i + 1 < len(fmt):
+            out.append(DATE_FORMAT_CODES.get(fmt[i + 1], fmt[i + 1]))
+            i += 2
+        else:
+            out.append(fmt[i].replace('{', '{{').replace('}', '}}'))
+            i += 1
+    return value.strftime(''.join(out)).format(month=value.month, day=value.day, hour=value.hour)
+
+def sql_concat(*values):
+    if any(value is None for value in values):
+        return None
+    return ''.join(str(value) for value in values)
+
+def sql_greatest(*values):
+    return None if any(value is None for value in values) else max(values)
+
+def sql_least(*values):
+    return None if any(value is None for value in values) else min(values)
+
+def date_part(name):
+    def part(value):
+        value = to_datetime(value)
+        return getattr(value, name) if value else None
+    return part
+
+def sql_timestampadd(unit, amount, value):
+    value = to_datetime(value)
+    if value is None or amount is None:
+        return None
+    value += timedelta(**{TIMESTAMPADD_UNITS[unit.upper()]: float(amount)})
+    return value.isoformat(' ', timespec='microseconds' if value.microsecond else 'seconds')
+
+def sql_datediff(first, second):
+    first, second = to_datetime(first), to_datetime(second)
+    if first is None or second is None:
+        return None
+    return (first.date() - second.date()).days
+
+# GET_LOCK / RELEASE_LOCK: named locks of this process (MySQL's are per server)
+_named_locks = {}
+_named_locks_guard = threading.Lock()
+
+def sql_get_lock(name, timeout):
+    with _named_locks_guard:
+        lock = _named_locks.setdefault(name, threading.Lock())
+    return int(lock.acquire(timeout=timeout if timeout is not None and timeout >= 0 else -1))
+
+def sql_release_lock(name):
+    lock = _named_locks.get(name)
+    if lock is None or not lock.locked():
+        return None
+    lock.release()
+    return 1
+
+FUNCTIONS = [
+    ('NOW', -1, sql_now),
+    ('CURDATE', 0, lambda: date.today().isoformat()),
+    ('DATE_FORMAT', 2, sql_date_format),
+    ('IF', 3, lambda condition, yes, no: yes if condition else no),
+    ('CONCAT', -1, sql_concat),
+    ('GREATEST', -1, sql_greatest),
+    ('LEAST', -1, sql_least),
+    ('YEAR', 1, date_part('year')),
+    ('MONTH', 1, date_part('month')),
+    ('DAY', 1, date_part('day')),
+    ('HOUR', 1, date_part('hour')),
+    ('DATEDIFF', 2, sql_datediff),
+    ('TIMESTAMPADD', 3, sql_timestampadd),
+    ('GET_LOCK', 2, sql_get_lock),
+    ('RELEASE_LOCK', 1, sql_release_lock),
+]
+
+# --- SQL translation ---------------------------------------------------------------
+
+def unmask(sql, parts, percent_escapes=False):
+    def restore(match):
+        token = parts[int(match.group(1))]
+        if token.startswith('--') or token.startswith('/*'):
+            return ' '
+        # Backslash escapes are MySQL only
+        if token[0] == "'":
+            token = token.replace("\\'", "''").replace('\\\\', '\\')
+        return token.replace('%%', '%') if percent_escapes else token
+    return MASK_RE.sub(restore, sql)
+
+UPDATE_RE = re.compile(r'^\s*UPDATE\s+(\w+)(?:\s+(?:AS\s+)?(?!JOIN\b|INNER\b|LEFT\b|SET\b)(\w+))?\s+(.*)$',
+                       re.IGNORECASE | re.DOTALL)
+
+def unqualify_assignments(assignments, table, alias):
+    """SET a.col = ... -> SET col = ... (SQLite takes bare column names)"""
+    qualifier = re.compile(rf'^\s*(?:{re.escape(alias)}|{re.escape(table)})\.(\w+)\s*=', re.IGNORECASE)
+    return ','.join(qualifier.sub(r' \1 =', item) for item in split_top_level(assignments)).strip()
+
+def rewrite_update(sql):
+    """
+    UPDATE t a JOIN x ON c SET a.col = ... [WHERE w] -> UPDATE t AS a SET col = ... FROM x WHERE c AND w,
+    UPDATE t a SET a.col = ... -> UPDATE t AS a SET col = ...
+    """
+    match = UPDATE_RE.match(sql)
+    if not match:
+        return sql
+    table, alias, rest = match.group(1), match.group(2) or match.group(1), match.group(3)
+    target = f"{table} AS {alias}" if match.group(2) else table
+    set_at = find_top_level(rest, r'\bSET\b')
+    if not set_at:
+        return sql
+    where_at = find_top_level(rest, r'\bWHERE\b', set_at[1])
+    assignments = unqualify_assignments(rest[set_at[1]:where_at[0] if where_at else len(rest)], table, alias)
+    where = rest[where_at[1]:].strip() if where_at else None
+
+    joins = rest[:set_at[0]]
+    if not joins.strip():
+        return f"UPDATE {target} SET {assignments}" + (f" WHERE {where}" if where else '')
+
+    on_at = find_top_level(joins, r'\bON\b')
+    if not on_at:
+        return sql
+    first_source = re.sub(r'^\s*(?:INNER\s+|LEFT\s+)?JOIN\b', '', joins[:on_at[0]], flags=re.IGNORECASE)
+    after_on = joins[on_at[1]:]
+    next_join = find_top_level(after_on, r'\b(?:INNER\s+|LEFT\s+)?JOIN\b')
+    condition = after_on[:next_join[0]] if next_join else after_on
+    other_joins = after_on[next_join[0]:] if next_join else ''
+    condition = f"({condition.strip()})" + (f" AND ({where})" if where else '')
+    return (f"UPDATE {target} SET {assignments} "
+            f"FROM {first_source.strip()} {other_joins.strip()} WHERE {condition}")
+
+@lru_cache(maxsize=1024)
+def translate(sql, named=False, with_params=False):
+    """
+    MySQL statement -> (SQLite statement, kind). kind is 'noop' for statements
+    to skip, 'lock' for SELECT ... FOR UPDATE, otherwise None.
+    """
+    masked, parts = mask_literals(sql)
+    stripped = masked.strip().rstrip(';')
+    upper = stripped.upper()
+    if re.match(r'^SET\s', upper):
+        return None, 'noop'
+    if upper.startswith('LOAD DATA'):
+        raise Error(msg="LOAD DATA is not supported by the SQLite backend")
+
+    kind = None
+    if re.search(r'\bFOR\s+UPDATE\s*$', stripped, re.IGNORECASE):
+        stripped = re.sub(r'\bFOR\s+UPDATE\s*$', '', stripped, flags=re.IGNORECASE)
+        kind = 'lock'
+    stripped = re.sub(r'\bLOCK\s+IN\s+SHARE\s+MODE\s*$', '', stripped, flags=re.IGNORECASE)
+
+    stripped = re.sub(r'\bCURRENT_TIMESTAMP\s*\(\s*(\d)\s*\)', r'NOW(\1)', stripped, flags=re.IGNORECASE)
+    stripped = re.sub(r'\bCURRENT_TIMESTAMP\b(?!\s*\()', 'NOW()', stripped, flags=re.IGNORECASE)
+    stripped = re.sub(r'\bINSERT\s+IGNORE\b', 'INSERT OR IGNORE', stripped, flags=re.IGNORECASE)
+    stripped = re.sub(r'\bTIMESTAMPADD\s*\(\s*(\w+)\s*,', r"TIMESTAMPADD('\1',", stripped, flags=re.IGNORECASE)
+    stripped = re.sub(r'(\([\w.\s,]+,[\w.\s]+\)\s+IN\s+\()\s*\(', r'\1VALUES (', stripped, flags=re.IGNORECASE)
+    if upper.startswith('UPDATE'):
+        stripped = rewrite_update(stripped)
+
+    if with_params:
+        stripped = re.sub(r'%\((\w+)\)s', r':\1', stripped) if named else stripped.replace('%s', '?')
+        stripped = stripped.replace('%%', '%')
+    return unmask(stripped, parts, percent_escapes=with_params), kind
+
+def translate_schema(sql):
+    """db/schema.sql (MySQL DDL) -> list of SQLite statements"""
+    masked, parts = mask_literals(sql)
+    masked = strip_comments(masked, parts)
+    statements = []
+    for statement in split_top_level(masked, ';'):
+        statement = statement.strip()
+        if not statement:
+            continue
+        match = re.match(r'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)\s*$', statement,
+                         re.IGNORECASE | re.DOTALL)
+        if not match:
+            statements.append(translate(unmask(statement, parts))[0])
+            continue
+
+        table, body = match.group(1), match.group(2)
+        columns, indexes, triggers = [], [], []
+        for item in split_top_level(body):
+            item = ' '.join(item.split())
+            if not item:
+                continue
+            index = re.match(r'^(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*(\(.*\))$', item, re.IGNORECASE)
+            if index:
+                unique = 'UNIQUE ' if index.group(1) else ''
+                indexes.append(f"CREATE {unique}INDEX {index.group(2)} ON {table} {index.group(3)}")
+                continue
+            column = item.split(' ', 1)[0]
+            item = re.sub(r'\bENUM\s*\(([^)]*)\)', rf'TEXT CHECK ({column} IN (\1))', item, flags=re.IGNORECASE)
+            item = re.sub(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY AUTOINCREMENT',
+                          item, flags=re.IGNORECASE)
+            item = re.sub(r'\b(DATETIME|TIMESTAMP)\s*\(\s*\d\s*\)', r'\1', item, flags=re.IGNORECASE)
+            if re.search(r'\bON\s+UPDATE\s+CURRENT_TIMESTAMP', item, re.IGNORECASE):
+                item = re.sub(r'\s*\bON\s+UPDATE\s+CURRENT_TIMESTAMP(\s*\(\s*\d\s*\))?', '', item,
+                              flags=re.IGNORECASE)
+                triggers.append(f"CREATE TRIGGER {table}_{column}_on_update AFTER UPDATE ON {table} "
+                                f"FOR EACH ROW WHEN NEW.{column} IS OLD.{column} "
+                                f"BEGIN UPDATE {table} SET {column} = NOW(6) WHERE rowid = NEW.rowid; END")
+            item = re.sub(r'\bDEFAULT\s+CURRENT_TIMESTAMP\s*\(\s*(\d)\s*\)', r'DEFAULT (NOW(\1))', item,
+                          flags=re.IGNORECASE)
+            item = re.sub(r'\bDEFAULT\s+CURRENT_TIMESTAMP\b(?!\s*\()', 'DEFAULT (NOW())', item, flags=re.IGNORECASE)
+            columns.append(item)
+        statements.append(unmask(f"CREATE TABLE {table} (\n    " + ',\n    '.join(columns) + "\n)", parts))
+        statements.extend(unmask(statement, parts) for statement in indexes + triggers)
+    return statements
+
+def translate_script(sql):
+    """A MySQL data script (db/seed.sql) -> list of SQLite statements"""
+    masked, parts = mask_literals(sql)
+    masked = strip_comments(masked, parts)
+    statements = []
+    for statement in split_top_level(masked, ';'):
+        if statement.strip():
+            translated, kind = translate(unmask(statement, parts))
+            if kind != 'noop':
+                statements.append(translated)
+    return statements
+
+# --- Connection / cursor -----------------------------------------------------------
+
+def map_error(error):
+    if isinstance(error, sqlite3.IntegrityError):
+        return IntegrityError(msg=str(error))
+    return Error(msg=str(error))
+
+class SQLiteCursor:
+    """mysql.connector style cursor over a sqlite3 cursor"""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self.dictionary = dictionary
+        self._skipped = False
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, operation, params=()):
+        if isinstance(operation, bytes):
+            operation = operation.decode('utf-8')
+        named = isinstance(params, dict)
+        statement, kind = translate(operation, named, bool(params))
+        self._skipped = kind == 'noop'
+        if self._skipped:
+            return
+        try:
+            if kind == 'lock' and not self._connection.raw.in_transaction:
+                # Locking read - take the write lock now, as InnoDB would for these rows
+                self._connection.raw.execute("BEGIN IMMEDIATE")
+            self._cursor.execute(statement, params or ())
+        except sqlite3.Error as e:
+            raise map_error(e) from e
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        if not seq_params:
+            return
+        statement, kind = translate(operation, isinstance(seq_params[0], dict), True)
+        if kind == 'noop':
+            return
+        try:
+            self._cursor.executemany(statement, seq_params)
+        except sqlite3.Error as e:
+            raise map_error(e) from e
+
+    def _row(self, row):
+        if row is None:
+            return None
+        values = [convert_value(value) for value in row]
+        if self.dictionary:
+            return dict(zip(self.column_names, values))
+        return tuple(values)
+
+    def fetchone(self):
+        if self._skipped:
+            return None
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        if self._skipped:
+            return []
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        if self._skipped:
+            return []
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """mysql.connector style connection"""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, dictionary=False, buffered=False, **options):
+        return SQLiteCursor(self, dictionary)
+
+    def commit(self):
+        try:
+            self.raw.commit()
+        except sqlite3.Error as e:
+            raise map_error(e) from e
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        try:
+            self.raw.execute("SELECT 1")
+        except sqlite3.Error as e:
+            raise map_error(e) from e
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.raw.close()
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+def read_db_file(name):
+    with open(os.path.join(DB_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+def init_database(connection, seed=True):
+    """Create the schema (and load the seed data) in an empty database - in one transaction"""
+    statements = translate_schema(read_db_file('schema.sql'))
+    if seed:
+        statements += translate_script(read_db_file('seed.sql'))
+    raw = connection.raw
+    try:
+        # Other processes wait on the write lock until the database is complete
+        raw.execute("BEGIN IMMEDIATE")
+        if not raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Flight'").fetchone():
+            for statement in statements:
+                raw.execute(statement)
+        raw.commit()
+    except sqlite3.Error as e:
+        raw.rollback()
+        raise map_error(e) from e
+
+def reset_database(path, seed=True):
+    """Delete the database file and create it again"""
+    with _init_lock:
+        _initialized.discard(path)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    connect(path, seed=seed).close()
+
+def connect(path, seed=True, **options):
+    """Open a connection - the schema is created on first use of an empty database"""
+    raw = sqlite3.connect(path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    for name, arity, function in FUNCTIONS:
+        raw.create_function(name, arity, function)
+    raw.execute("PRAGMA foreign_keys = ON")
+    connection = SQLiteConnection(raw)
+
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                raw.execute("PRAGMA journal_mode = WAL")
+                init_database(connection, seed)
+                _initialized.add(path)
+    return connection
@@ -72,6 +72,14 @@ CREATE TABLE Flight (
     status ENUM('Active', 'Full', 'Landed', 'Canceled') NOT NULL DEFAULT 'Active', -- סטטוס טיסה
     price_economy DECIMAL(10, 2) NOT NULL DEFAULT 800.00, -- מחיר מחלקה רגילה
     price_business DECIMAL(10, 2) DEFAULT NULL, -- מחיר מחלקה עסקים (NULL למטוס קטן)
+    seats_total INT NOT NULL DEFAULT 0, -- קיבולת המטוס (סה"כ מושבים)
+    seats_booked INT NOT NULL DEFAULT 0, -- מושבים שהוזמנו (הזמנות פעילות/שהושלמו)
+    updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6), -- שינוי אחרון (לרענון דוחות)
+    INDEX idx_flight_status_departure (status, departure_datetime, flight_id),
+    INDEX idx_flight_route_departure (origin_airport, destination_airport, departure_datetime),
+    INDEX idx_flight_plane_departure (plane_id, departure_datetime),
+    INDEX idx_flight_departure (departure_datetime, flight_id),
+    INDEX idx_flight_updated (updated_at),
     FOREIGN KEY (plane_id) REFERENCES Plane(plane_id),
     FOREIGN KEY (manager_id) REFERENCES Manager(id_number),
     FOREIGN KEY (origin_airport, destination_airport)
@@ -131,6 +139,13 @@ CREATE TABLE FlightOrder (
     order_date DATETIME NOT NULL, -- תאריך ביצוע הזמנה
     order_status ENUM('Active', 'Completed', 'Canceled_By_Client', 'Canceled_By_Company') NOT NULL, -- סטטוס הזמנה
     total_payment DECIMAL(10, 2) NOT NULL DEFAULT 0.00, -- סכום לתשלום
+    customer_order_number INT NULL, -- מספר ההזמנה של הלקוח (1, 2, ...)
+    updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6), -- שינוי אחרון (לרענון דוחות)
+    INDEX idx_order_customer_date (customer_email, order_date),
+    UNIQUE INDEX uq_customer_order_number (customer_email, customer_order_number),
+    INDEX idx_order_flight_status (flight_id, order_status),
+    INDEX idx_order_date (order_date),
+    INDEX idx_order_updated (updated_at),
     FOREIGN KEY (customer_email) REFERENCES Customer(email),
     FOREIGN KEY (flight_id) REFERENCES Flight(flight_id)
 );
@@ -169,6 +184,105 @@ CREATE TABLE FlightAttendantAssignment (
     FOREIGN KEY (flight_id) REFERENCES Flight(flight_id)
 );
 
+-- החזקת מושבים זמנית בזמן בחירה (פגה אוטומטית)
+CREATE TABLE SeatHold (
+    flight_id INT NOT NULL, -- מזהה טיסה(F)
+    seat_number VARCHAR(10) NOT NULL, -- מספר מושב
+    hold_token CHAR(32) NOT NULL, -- מזהה הגלישה המחזיקה
+    expires_at DATETIME NOT NULL, -- מועד פקיעה
+    PRIMARY KEY (flight_id, seat_number),
+    INDEX idx_seathold_token (hold_token),
+    INDEX idx_seathold_expires (expires_at),
+    FOREIGN KEY (flight_id) REFERENCES Flight(flight_id) ON DELETE CASCADE
+);
+
+-- =============================================
+-- טבלאות דוחות (מחושבות מראש, flask --app main refresh-reports)
+-- =============================================
+
+-- עובדות לכל טיסה (דוחות 1, 5)
+CREATE TABLE ReportFlightFact (
+    flight_id INT PRIMARY KEY, -- מזהה טיסה
+    plane_id INT NOT NULL, -- מזהה מטוס
+    month_year CHAR(7) NOT NULL, -- חודש ההמראה (YYYY-MM)
+    departure_date DATE NOT NULL, -- תאריך ההמראה
+    origin_airport VARCHAR(50) NOT NULL, -- שדה מקור
+    destination_airport VARCHAR(50) NOT NULL, -- שדה יעד
+    status VARCHAR(20) NOT NULL, -- סטטוס טיסה
+    flight_duration DECIMAL(4,2), -- משך טיסה (בשעות)
+    seats_total INT, -- קיבולת המטוס
+    tickets_sold INT NOT NULL DEFAULT 0, -- כרטיסים שנמכרו
+    INDEX idx_reportflight_plane_month (month_year, plane_id)
+);
+
+-- פעילות מטוס לפי חודש (דוח 5)
+CREATE TABLE ReportPlaneMonth (
+    month_year CHAR(7) NOT NULL, -- חודש (YYYY-MM)
+    plane_id INT NOT NULL, -- מזהה מטוס
+    flights_performed INT NOT NULL, -- טיסות שבוצעו
+    flights_canceled INT NOT NULL, -- טיסות שבוטלו
+    days_active INT NOT NULL, -- ימי פעילות
+    dominant_route VARCHAR(110), -- מסלול דומיננטי
+    PRIMARY KEY (month_year, plane_id)
+);
+
+-- אנשי צוות בטיסות שנחתו (דוח 3)
+CREATE TABLE ReportCrewFlight (
+    flight_id INT NOT NULL, -- מזהה טיסה
+    role VARCHAR(20) NOT NULL, -- Pilot / Flight Attendant
+    id_number VARCHAR(9) NOT NULL, -- תעודת זהות
+    flight_duration DECIMAL(4,2), -- משך טיסה (בשעות)
+    PRIMARY KEY (flight_id, role, id_number),
+    INDEX idx_reportcrew_member (role, id_number)
+);
+
+-- שעות טיסה מצטברות לאיש צוות (דוח 3)
+CREATE TABLE ReportCrewHours (
+    role VARCHAR(20) NOT NULL, -- Pilot / Flight Attendant
+    id_number VARCHAR(9) NOT NULL, -- תעודת זהות
+    long_haul_hours DECIMAL(10,2) NOT NULL, -- שעות בטיסות ארוכות
+    short_haul_hours DECIMAL(10,2) NOT NULL, -- שעות בטיסות קצרות
+    PRIMARY KEY (role, id_number)
+);
+
+-- הכנסות לפי חודש הזמנה, מטוס ומחלקה (דוח 2)
+CREATE TABLE ReportRevenueMonth (
+    order_month CHAR(7) NOT NULL, -- חודש ההזמנה (YYYY-MM)
+    plane_id INT NOT NULL, -- מזהה מטוס
+    class_type ENUM('Economy', 'Business') NOT NULL, -- סוג מחלקה
+    total_revenue DECIMAL(14,4) NOT NULL, -- הכנסה
+    tickets_sold_count INT NOT NULL, -- מספר כרטיסים
+    PRIMARY KEY (order_month, plane_id, class_type)
+);
+
+-- הזמנות וביטולים לפי חודש (דוח 4)
+CREATE TABLE ReportOrderMonth (
+    order_month CHAR(7) PRIMARY KEY, -- חודש ההזמנה (YYYY-MM)
+    total_orders INT NOT NULL, -- סה"כ הזמנות
+    canceled_orders_count INT NOT NULL -- הזמנות שבוטלו ע"י הלקוח
+);
+
+-- סימן המים של הרענון האחרון
+CREATE TABLE ReportRefresh (
+    name VARCHAR(50) PRIMARY KEY, -- שם
+    watermark DATETIME(6) NOT NULL, -- שינויים עד מועד זה כבר חושבו
+    refreshed_at DATETIME(6) NOT NULL -- מועד הרענון האחרון
+);
+
+-- גרסאות סכמה (db/migrations)
+CREATE TABLE SchemaMigration (
+    version VARCHAR(100) PRIMARY KEY, -- שם קובץ המיגרציה
+    applied_at DATETIME NOT NULL -- מועד ההחלה
+);
+
+INSERT INTO SchemaMigration (version, applied_at) VALUES
+('001_flight_seat_counters', NOW()),
+('002_seat_holds', NOW()),
+('003_customer_order_number', NOW()),
+('004_report_tables', NOW()),
+('005_hot_path_indexes', NOW()),
+('006_customer_order_number_unique', NOW());
+
 -- =============================================
 -- SEED DATA - Initial Data
 -- =============================================
@@ -259,13 +373,13 @@ INSERT INTO RegisteredCustomer (email, registration_date, birth_date, passport_n
 ('c2@test.com', '2023-01-01', '1990-01-01', 'P2', 'pass', 1000);
 
 -- Flights
-INSERT INTO Flight VALUES (101, 'TLV', 'JFK', 1, '2025-11-10 08:00:00', '100000001', 'Landed', 500, 1000);
-INSERT INTO Flight VALUES (102, 'TLV', 'LHR', 3, '2025-12-15 09:00:00', '100000001', 'Landed', 400, 900);
-INSERT INTO Flight VALUES (103, 'TLV', 'ETM', 4, '2026-01-20 10:00:00', '100000001', 'Landed', 200, NULL);
-INSERT INTO Flight VALUES (104, 'ETM', 'TLV', 5, '2026-02-10 11:00:00', '100000002', 'Active', 300, NULL);
-INSERT INTO Flight VALUES (105, 'LHR', 'TLV', 1, '2026-03-05 14:00:00', '100000002', 'Active', 600, 1200);
-INSERT INTO Flight VALUES (106, 'TLV', 'JFK', 2, '2026-04-15 10:00:00', '100000001', 'Active', 550, 1100);
-INSERT INTO Flight VALUES (107, 'JFK', 'TLV', 6, '2026-05-20 08:00:00', '100000002', 'Active', 600, 1200);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (101, 'TLV', 'JFK', 1, '2025-11-10 08:00:00', '100000001', 'Landed', 500, 1000);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (102, 'TLV', 'LHR', 3, '2025-12-15 09:00:00', '100000001', 'Landed', 400, 900);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (103, 'TLV', 'ETM', 4, '2026-01-20 10:00:00', '100000001', 'Landed', 200, NULL);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (104, 'ETM', 'TLV', 5, '2026-02-10 11:00:00', '100000002', 'Active', 300, NULL);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (105, 'LHR', 'TLV', 1, '2026-03-05 14:00:00', '100000002', 'Active', 600, 1200);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (106, 'TLV', 'JFK', 2, '2026-04-15 10:00:00', '100000001', 'Active', 550, 1100);
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status, price_economy, price_business) VALUES (107, 'JFK', 'TLV', 6, '2026-05-20 08:00:00', '100000002', 'Active', 600, 1200);
 
 -- Crew Assignments
 INSERT INTO FlightPilotAssignment (flight_id, pilot_id) VALUES
@@ -326,3 +440,33 @@ INSERT INTO FlightOrder (order_id, customer_email, flight_id, order_date, order_
 VALUES (8, 'c5@test.com', 105, '2026-03-02 10:00:00', 'Active', 1200);
 INSERT INTO Ticket (flight_id, order_id, plane_id, class_type, seat_number, price)
 VALUES (105, 8, 1, 'Business', '1B', 1200);
+
+-- =============================================
+-- SEAT COUNTERS
+-- =============================================
+UPDATE Flight f
+JOIN (
+    SELECT plane_id, SUM(rows_count * cols_count) AS total_seats
+    FROM PlaneClass
+    GROUP BY plane_id
+) pc ON f.plane_id = pc.plane_id
+SET f.seats_total = pc.total_seats;
+
+UPDATE Flight f
+JOIN (
+    SELECT fo.flight_id, COUNT(*) AS booked_seats
+    FROM Ticket t
+    JOIN FlightOrder fo ON t.order_id = fo.order_id
+    WHERE fo.order_status IN ('Active', 'Completed')
+    GROUP BY fo.flight_id
+) b ON f.flight_id = b.flight_id
+SET f.seats_booked = b.booked_seats;
+
+-- Per-customer order numbers, in order of order_date
+UPDATE FlightOrder fo
+JOIN (
+    SELECT order_id,
+           ROW_NUMBER() OVER (PARTITION BY customer_email ORDER BY order_date, order_id) AS order_number
+    FROM FlightOrder
+) numbered ON fo.order_id = numbered.order_id
+SET fo.customer_order_number = numbered.order_number;
@@ -0,0 +1,25 @@
+-- Maintained seat counters on Flight
+-- orders.create updates seats_booked in the booking transaction instead of
+-- recounting PlaneClass capacity and all of the flight's tickets.
+
+ALTER TABLE Flight
+    ADD COLUMN seats_total INT NOT NULL DEFAULT 0,
+    ADD COLUMN seats_booked INT NOT NULL DEFAULT 0;
+
+UPDATE Flight f
+JOIN (
+    SELECT plane_id, SUM(rows_count * cols_count) AS total_seats
+    FROM PlaneClass
+    GROUP BY plane_id
+) pc ON f.plane_id = pc.plane_id
+SET f.seats_total = pc.total_seats;
+
+UPDATE Flight f
+JOIN (
+    SELECT fo.flight_id, COUNT(*) AS booked_seats
+    FROM Ticket t
+    JOIN FlightOrder fo ON t.order_id = fo.order_id
+    WHERE fo.order_status IN ('Active', 'Completed')
+    GROUP BY fo.flight_id
+) b ON f.flight_id = b.flight_id
+SET f.seats_booked = b.booked_seats;
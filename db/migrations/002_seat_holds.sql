@@ -0,0 +1,14 @@
+-- Seat holds
+-- Seats selected on the seat map are held for a few minutes so that two
+-- customers never book the same seat; expired rows are ignored and purged.
+
+CREATE TABLE SeatHold (
+    flight_id INT NOT NULL,
+    seat_number VARCHAR(10) NOT NULL,
+    hold_token CHAR(32) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (flight_id, seat_number),
+    INDEX idx_seathold_token (hold_token),
+    INDEX idx_seathold_expires (expires_at),
+    FOREIGN KEY (flight_id) REFERENCES Flight(flight_id) ON DELETE CASCADE
+);
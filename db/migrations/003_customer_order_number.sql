@@ -0,0 +1,16 @@
+-- Per-customer order numbers
+-- Stored when the order is inserted so order pages no longer scan the
+-- customer's whole order history to number them.
+
+ALTER TABLE FlightOrder
+    ADD COLUMN customer_order_number INT NOT NULL DEFAULT 0,
+    ADD INDEX idx_order_customer_date (customer_email, order_date);
+
+-- Per-customer order numbers, in order of order_date
+UPDATE FlightOrder fo
+JOIN (
+    SELECT order_id,
+           ROW_NUMBER() OVER (PARTITION BY customer_email ORDER BY order_date, order_id) AS order_number
+    FROM FlightOrder
+) numbered ON fo.order_id = numbered.order_id
+SET fo.customer_order_number = numbered.order_number;
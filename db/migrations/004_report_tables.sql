@@ -0,0 +1,74 @@
+-- Materialized report tables
+-- The /reports pages read these summary tables; `flask --app main refresh-reports`
+-- updates them from the flights and orders changed since the last refresh.
+
+ALTER TABLE Flight
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_flight_updated (updated_at);
+
+ALTER TABLE FlightOrder
+    ADD COLUMN updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_order_date (order_date),
+    ADD INDEX idx_order_updated (updated_at);
+
+CREATE TABLE ReportFlightFact (
+    flight_id INT PRIMARY KEY,
+    plane_id INT NOT NULL,
+    month_year CHAR(7) NOT NULL,
+    departure_date DATE NOT NULL,
+    origin_airport VARCHAR(50) NOT NULL,
+    destination_airport VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    flight_duration DECIMAL(4,2),
+    seats_total INT,
+    tickets_sold INT NOT NULL DEFAULT 0,
+    INDEX idx_reportflight_plane_month (month_year, plane_id)
+);
+
+CREATE TABLE ReportPlaneMonth (
+    month_year CHAR(7) NOT NULL,
+    plane_id INT NOT NULL,
+    flights_performed INT NOT NULL,
+    flights_canceled INT NOT NULL,
+    days_active INT NOT NULL,
+    dominant_route VARCHAR(110),
+    PRIMARY KEY (month_year, plane_id)
+);
+
+CREATE TABLE ReportCrewFlight (
+    flight_id INT NOT NULL,
+    role VARCHAR(20) NOT NULL,
+    id_number VARCHAR(9) NOT NULL,
+    flight_duration DECIMAL(4,2),
+    PRIMARY KEY (flight_id, role, id_number),
+    INDEX idx_reportcrew_member (role, id_number)
+);
+
+CREATE TABLE ReportCrewHours (
+    role VARCHAR(20) NOT NULL,
+    id_number VARCHAR(9) NOT NULL,
+    long_haul_hours DECIMAL(10,2) NOT NULL,
+    short_haul_hours DECIMAL(10,2) NOT NULL,
+    PRIMARY KEY (role, id_number)
+);
+
+CREATE TABLE ReportRevenueMonth (
+    order_month CHAR(7) NOT NULL,
+    plane_id INT NOT NULL,
+    class_type ENUM('Economy', 'Business') NOT NULL,
+    total_revenue DECIMAL(14,4) NOT NULL,
+    tickets_sold_count INT NOT NULL,
+    PRIMARY KEY (order_month, plane_id, class_type)
+);
+
+CREATE TABLE ReportOrderMonth (
+    order_month CHAR(7) PRIMARY KEY,
+    total_orders INT NOT NULL,
+    canceled_orders_count INT NOT NULL
+);
+
+CREATE TABLE ReportRefresh (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark DATETIME(6) NOT NULL,
+    refreshed_at DATETIME(6) NOT NULL
+);
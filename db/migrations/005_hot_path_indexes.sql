@@ -0,0 +1,12 @@
+-- Indexes for the hot query predicates
+-- Check the plans afterwards with `flask --app main check-plans`.
+-- (MySQL drops the implicit foreign key indexes these supersede.)
+
+ALTER TABLE Flight
+    ADD INDEX idx_flight_status_departure (status, departure_datetime, flight_id),
+    ADD INDEX idx_flight_route_departure (origin_airport, destination_airport, departure_datetime),
+    ADD INDEX idx_flight_plane_departure (plane_id, departure_datetime),
+    ADD INDEX idx_flight_departure (departure_datetime, flight_id);
+
+ALTER TABLE FlightOrder
+    ADD INDEX idx_order_flight_status (flight_id, order_status);
@@ -0,0 +1,22 @@
+-- One order number per customer
+-- Backs the MAX(customer_order_number) + 1 of orders.create with a unique
+-- index, so two concurrent orders of a customer cannot share a number (the
+-- loser retries). Orders are NULL until numbered, as bulk loads number them
+-- afterwards; existing orders are renumbered in case a race already
+-- duplicated a number.
+
+ALTER TABLE FlightOrder
+    MODIFY customer_order_number INT NULL;
+
+UPDATE FlightOrder SET customer_order_number = NULL;
+
+UPDATE FlightOrder fo
+JOIN (
+    SELECT order_id,
+           ROW_NUMBER() OVER (PARTITION BY customer_email ORDER BY order_date, order_id) AS order_number
+    FROM FlightOrder
+) numbered ON fo.order_id = numbered.order_id
+SET fo.customer_order_number = numbered.order_number;
+
+ALTER TABLE FlightOrder
+    ADD UNIQUE INDEX uq_customer_order_number (customer_email, customer_order_number);
@@ -0,0 +1,21 @@
+-- name: staff_hours_flights
+-- title: Report 3 details: landed flights per crew member
+-- columns: role, id_number, first_name_hebrew, last_name_hebrew, flight_id, departure_date, origin_airport, destination_airport, flight_duration
+-- Export only - one row per crew member and landed flight
+SELECT
+    c.role,
+    c.id_number,
+    COALESCE(p.first_name_hebrew, fa.first_name_hebrew) AS first_name_hebrew,
+    COALESCE(p.last_name_hebrew, fa.last_name_hebrew) AS last_name_hebrew,
+    c.flight_id,
+    f.departure_date,
+    f.origin_airport,
+    f.destination_airport,
+    c.flight_duration
+
+FROM ReportCrewFlight c
+JOIN ReportFlightFact f ON c.flight_id = f.flight_id
+LEFT JOIN Pilot p ON c.role = 'Pilot' AND c.id_number = p.id_number
+LEFT JOIN FlightAttendant fa ON c.role = 'Flight Attendant' AND c.id_number = fa.id_number
+
+ORDER BY c.role DESC, c.id_number ASC, f.departure_date ASC;
@@ -1,20 +1,12 @@
+-- name: cancellations
+-- title: Report 4: monthly customer cancellation rate
+-- columns: month_year, total_orders, canceled_orders_count, cancellation_rate_pct
+-- Reads ReportOrderMonth (refreshed by `flask --app main refresh-reports`)
 SELECT
-    DATE_FORMAT(order_date, '%Y-%m') AS month_year,
+    order_month AS month_year,
+    total_orders,
+    canceled_orders_count,
+    ROUND(canceled_orders_count * 100.0 / total_orders, 2) AS cancellation_rate_pct
 
-    COUNT(order_id) AS total_orders,
-
-    SUM(CASE
-        WHEN order_status = 'Canceled_By_Client' THEN 1
-        ELSE 0
-    END) AS canceled_orders_count,
-
-    ROUND(
-        (SUM(CASE
-            WHEN order_status = 'Canceled_By_Client' THEN 1
-            ELSE 0
-        END) * 100.0 / COUNT(order_id)),
-    2) AS cancellation_rate_pct
-
-FROM FlightOrder
-GROUP BY DATE_FORMAT(order_date, '%Y-%m')
-ORDER BY month_year DESC;
\ No newline at end of file
+FROM ReportOrderMonth
+ORDER BY month_year DESC;
@@ -0,0 +1,18 @@
+-- name: plane_activity_flights
+-- title: Report 5 details: flights per plane and month
+-- columns: month_year, plane_id, flight_id, departure_date, origin_airport, destination_airport, status, flight_duration, seats_total, tickets_sold
+-- Export only - one row per flight
+SELECT
+    month_year,
+    plane_id,
+    flight_id,
+    departure_date,
+    origin_airport,
+    destination_airport,
+    status,
+    flight_duration,
+    seats_total,
+    tickets_sold
+
+FROM ReportFlightFact
+ORDER BY month_year DESC, plane_id ASC, departure_date ASC;
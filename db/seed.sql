@@ -94,13 +94,13 @@ INSERT INTO RegisteredCustomer (email, registration_date, birth_date, passport_n
 -- =============================================
 -- FLIGHTS
 -- =============================================
-INSERT INTO Flight VALUES (101, 'TLV', 'JFK', 1, '2025-11-10 08:00:00', '100000001', 'Landed');
-INSERT INTO Flight VALUES (102, 'TLV', 'LHR', 3, '2025-12-15 09:00:00', '100000001', 'Landed');
-INSERT INTO Flight VALUES (103, 'TLV', 'ETM', 4, '2026-01-20 10:00:00', '100000001', 'Landed');
-INSERT INTO Flight VALUES (104, 'ETM', 'TLV', 5, '2026-02-10 11:00:00', '100000002', 'Active');
-INSERT INTO Flight VALUES (105, 'LHR', 'TLV', 1, '2026-03-05 14:00:00', '100000002', 'Active');
-INSERT INTO Flight VALUES (106, 'TLV', 'JFK', 2, '2026-04-15 10:00:00', '100000001', 'Active');
-INSERT INTO Flight VALUES (107, 'JFK', 'TLV', 6, '2026-05-20 08:00:00', '100000002', 'Active');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (101, 'TLV', 'JFK', 1, '2025-11-10 08:00:00', '100000001', 'Landed');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (102, 'TLV', 'LHR', 3, '2025-12-15 09:00:00', '100000001', 'Landed');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (103, 'TLV', 'ETM', 4, '2026-01-20 10:00:00', '100000001', 'Landed');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (104, 'ETM', 'TLV', 5, '2026-02-10 11:00:00', '100000002', 'Active');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (105, 'LHR', 'TLV', 1, '2026-03-05 14:00:00', '100000002', 'Active');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (106, 'TLV', 'JFK', 2, '2026-04-15 10:00:00', '100000001', 'Active');
+INSERT INTO Flight (flight_id, origin_airport, destination_airport, plane_id, departure_datetime, manager_id, status) VALUES (107, 'JFK', 'TLV', 6, '2026-05-20 08:00:00', '100000002', 'Active');
 
 -- =============================================
 -- CREW ASSIGNMENTS (With explicit column names to fix previous error)
@@ -172,4 +172,34 @@ VALUES (105, 7, 1, 'Economy', '10B', 600);
 INSERT INTO FlightOrder (order_id, customer_email, flight_id, order_date, order_status, total_payment) 
 VALUES (8, 'c5@test.com', 105, '2026-03-02 10:00:00', 'Active', 1200);
 INSERT INTO Ticket (flight_id, order_id, plane_id, class_type, seat_number, price) 
-VALUES (105, 8, 1, 'Business', '1B', 1200);
\ No newline at end of file
+VALUES (105, 8, 1, 'Business', '1B', 1200);
+
+-- =============================================
+-- SEAT COUNTERS
+-- =============================================
+UPDATE Flight f
+JOIN (
+    SELECT plane_id, SUM(rows_count * cols_count) AS total_seats
+    FROM PlaneClass
+    GROUP BY plane_id
+) pc ON f.plane_id = pc.plane_id
+SET f.seats_total = pc.total_seats;
+
+UPDATE Flight f
+JOIN (
+    SELECT fo.flight_id, COUNT(*) AS booked_seats
+    FROM Ticket t
+    JOIN FlightOrder fo ON t.order_id = fo.order_id
+    WHERE fo.order_status IN ('Active', 'Completed')
+    GROUP BY fo.flight_id
+) b ON f.flight_id = b.flight_id
+SET f.seats_booked = b.booked_seats;
+
+-- Per-customer order numbers, in order of order_date
+UPDATE FlightOrder fo
+JOIN (
+    SELECT order_id,
+           ROW_NUMBER() OVER (PARTITION BY customer_email ORDER BY order_date, order_id) AS order_number
+    FROM FlightOrder
+) numbered ON fo.order_id = numbered.order_id
+SET fo.customer_order_number = numbered.order_number;